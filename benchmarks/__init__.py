@@ -0,0 +1,7 @@
+# update path, src/lib is also imported as `lib`
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from benchmarks.suite import main
@@ -0,0 +1,167 @@
+"""Builds synthetic inboxes of tiny, silent mp3s for the benchmarks."""
+
+import random
+import shutil
+import subprocess
+import tempfile
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from mutagen.id3 import COMM, ID3, TALB, TDRC, TIT2, TPE1, TPE2, TPOS, TRCK
+
+# Inbox layouts, see `generate_inbox`
+SHAPES = ("flat", "multi_disc", "nested", "series", "standalone", "messy_tags")
+BOOKS_PER_SERIES = 3
+
+# An MPEG-1 Layer III frame header: 32 kb/s, 44.1 kHz, mono, no CRC. A frame with an all-zero body decodes
+# to 1152 samples of silence.
+_MP3_FRAME_HEADER = bytes([0xFF, 0xFB, 0x10, 0xC0])
+_MP3_FRAME_SIZE = 144 * 32_000 // 44_100
+_MP3_SAMPLES_PER_FRAME = 1152
+
+
+@dataclass
+class InboxSpec:
+    """How big an inbox to build: `books` books with `files_per_book` files each, spread evenly over
+    `shapes`. Standalone books are always a single file."""
+
+    books: int = 30
+    files_per_book: int = 6
+    shapes: Sequence[str] = field(default_factory=lambda: SHAPES)
+    seconds_per_file: float = 1.0
+    seed: int = 0
+
+
+def silent_mp3(path: Path, seconds: float = 1.0) -> Path:
+    """Writes `seconds` of silence to `path`, with ffmpeg if it's installed, otherwise as raw mp3 frames."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if ffmpeg := shutil.which("ffmpeg"):
+        subprocess.run(
+            [
+                ffmpeg,
+                *("-hide_banner", "-loglevel", "error", "-y"),
+                *("-f", "lavfi", "-i", "anullsrc=r=44100:cl=mono"),
+                *("-t", str(seconds), "-c:a", "libmp3lame", "-b:a", "32k", str(path)),
+            ],
+            check=True,
+        )
+    else:
+        frames = max(1, round(seconds * 44_100 / _MP3_SAMPLES_PER_FRAME))
+        frame = _MP3_FRAME_HEADER + bytes(_MP3_FRAME_SIZE - len(_MP3_FRAME_HEADER))
+        path.write_bytes(frame * frames)
+    return path
+
+
+def tag(path: Path, **tags: str | None):
+    """Writes ID3 tags, e.g. tag(path, title="Chapter 1", artist="Author")."""
+    frames = {
+        "title": TIT2,
+        "artist": TPE1,
+        "album": TALB,
+        "albumartist": TPE2,
+        "track": TRCK,
+        "disc": TPOS,
+        "date": TDRC,
+    }
+    id3 = ID3()
+    for key, value in tags.items():
+        if not value:
+            continue
+        if key == "comment":
+            id3.add(COMM(encoding=3, lang="eng", desc="", text=value))
+        else:
+            id3.add(frames[key](encoding=3, text=value))
+    id3.save(path)
+
+
+class _Writer:
+    def __init__(self, root: Path, spec: InboxSpec, template: Path):
+        self.root = root
+        self.spec = spec
+        self.rng = random.Random(spec.seed)
+        self.template = template
+        self.counts = {shape: 0 for shape in spec.shapes}
+
+    def file(self, path: Path, **tags: str | None):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(self.template, path)
+        tag(path, **tags)
+
+    def chapters(self, d: Path, author: str, title: str, *, n: int, disc: int | None = None, messy: bool = False):
+        for i in range(n):
+            name = f"{i + 1:02d} - {title} - Chapter {i + 1}.mp3"
+            if not messy:
+                self.file(
+                    d / name,
+                    title=f"Chapter {i + 1}",
+                    artist=author,
+                    album=title,
+                    albumartist=author,
+                    track=f"{i + 1}/{n}",
+                    disc=str(disc) if disc else None,
+                    date="2001",
+                )
+                continue
+            # Inconsistent, partial and misleading tags, like rips from many different sources
+            self.file(
+                d / name,
+                title=self.rng.choice([f"{title} {i + 1}", f"Track {i + 1:02d}", f"{author} - {title}", None]),
+                artist=self.rng.choice([author, author.upper(), f"Read by Narrator {i % 3}", None]),
+                album=self.rng.choice([title, f"{title} (Unabridged)", f"{title} Disc {i % 2 + 1}", None]),
+                albumartist=self.rng.choice([author, "Various Artists", None]),
+                track=self.rng.choice([str(i + 1), f"{n - i}/{n}", None]),
+                date=self.rng.choice(["2001", "2001-03-04", "03/04/2001", None]),
+                comment=self.rng.choice([f"Narrated by Narrator {i % 3}", "ripped by someone", None]),
+            )
+
+    def book(self, shape: str, i: int) -> Path:
+        n = self.spec.files_per_book
+        author, title = f"Author {i:04d}", f"Title {i:04d}"
+        k = self.counts[shape]
+        self.counts[shape] += 1
+        match shape:
+            case "flat":
+                d = self.root / f"{author} - {title}"
+                self.chapters(d, author, title, n=n)
+            case "multi_disc":
+                d = self.root / f"{author} - {title}"
+                for disc in (1, 2):
+                    self.chapters(d / f"Disc {disc}", author, title, n=max(1, n // 2), disc=disc)
+            case "nested":
+                d = self.root / author / title
+                self.chapters(d, author, title, n=n)
+            case "series":
+                author = f"Series Author {k // BOOKS_PER_SERIES:04d}"
+                d = self.root / f"{author} - Series {k // BOOKS_PER_SERIES:04d}" / f"Book {k % BOOKS_PER_SERIES + 1}"
+                self.chapters(d, author, title, n=n)
+            case "standalone":
+                d = self.root / f"{author} - {title}.mp3"
+                self.file(d, title=title, artist=author, album=title, date="2001")
+            case "messy_tags":
+                d = self.root / f"{title} by {author}"
+                self.chapters(d, author, title, n=n, messy=True)
+            case _:
+                raise ValueError(f"Unknown inbox shape: {shape}")
+        if d.is_dir() and i % 2 == 0:
+            (d / "cover.jpg").write_bytes(b"\xff\xd8\xff\xd9")
+        return d
+
+
+def generate_inbox(root: Path, spec: InboxSpec | None = None) -> list[Path]:
+    """Fills `root` with the books described by `spec` and returns their paths. Books take turns being each
+    of the `spec.shapes`:
+
+    - flat: one folder of chapters with clean tags
+    - multi_disc: a book split into Disc 1 and Disc 2 folders
+    - nested: the book's folder inside an author folder
+    - series: books grouped BOOKS_PER_SERIES at a time into series folders
+    - standalone: a single audio file in the root of the inbox
+    - messy_tags: chapters whose tags are inconsistent, missing or wrong
+    """
+    spec = spec or InboxSpec()
+    root.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Every file is a copy of the same few seconds of silence, only the tags differ
+        writer = _Writer(root, spec, silent_mp3(Path(tmp) / "silence.mp3", spec.seconds_per_file))
+        return [writer.book(spec.shapes[i % len(spec.shapes)], i) for i in range(spec.books)]
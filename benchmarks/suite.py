@@ -0,0 +1,279 @@
+"""Times the hot paths of a watch loop on a synthetic inbox, and compares them to saved baselines.
+
+Run from the root of the repo:
+
+    python -m benchmarks                   # small inbox, compared to benchmarks/baselines.json
+    python -m benchmarks --size large      # a bigger inbox
+    python -m benchmarks --save            # save the results as the new baselines
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+from benchmarks.inbox import generate_inbox, InboxSpec
+
+BASELINES_FILE = Path(__file__).parent / "baselines.json"
+SIZES = {
+    "small": InboxSpec(books=30, files_per_book=6),
+    "medium": InboxSpec(books=150, files_per_book=10),
+    "large": InboxSpec(books=600, files_per_book=12),
+}
+# A result is a regression if it's this much slower than its baseline (0.5 = 50%)...
+DEFAULT_TOLERANCE = 0.5
+# ...and at least this many seconds slower, so timer noise on very fast benchmarks isn't flagged
+NOISE_FLOOR_S = 0.005
+
+
+@dataclass
+class Context:
+    workdir: Path
+    inbox: Path
+    books: list[Path]
+    spec: InboxSpec
+
+
+@dataclass
+class Benchmark:
+    name: str
+    fn: Callable[[Context], float]
+    requires: Sequence[str] = ()
+
+
+@dataclass
+class Result:
+    name: str
+    runs: list[float]
+    skipped: str = ""
+
+    @property
+    def seconds(self) -> float:
+        return statistics.median(self.runs) if self.runs else 0.0
+
+
+BENCHMARKS: list[Benchmark] = []
+
+
+def benchmark(name: str, *, requires: Sequence[str] = ()):
+    """Registers a benchmark. It's called once per run, and returns the seconds taken by the part that
+    is being measured, so it can do its own setup first. `requires` are executables it needs on the PATH."""
+
+    def decorator(fn: Callable[[Context], float]) -> Callable[[Context], float]:
+        BENCHMARKS.append(Benchmark(name, fn, requires))
+        return fn
+
+    return decorator
+
+
+def timed(fn: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+@benchmark("inbox_scan")
+def bench_inbox_scan(ctx: Context) -> float:
+    from src.lib.inbox_state import InboxState
+
+    InboxState().destroy()  # type: ignore
+    inbox = InboxState()
+    return timed(lambda: inbox.scan(set_ready=True, force=True))
+
+
+@benchmark("determine_structure")
+def bench_determine_structure(ctx: Context) -> float:
+    from src.lib.books_tree import BooksTree
+    from src.lib.scorers import scorerCache
+
+    scorerCache.clear()
+    tree = BooksTree(ctx.inbox, scan=False).scan(scan_id3=True, determine_structure=False)
+    return timed(tree.determine_structure)
+
+
+@benchmark("hash_path")
+def bench_hash_path(ctx: Context) -> float:
+    from src.lib.fs_utils import hash_path
+
+    return timed(lambda: [hash_path(book) for book in ctx.books])
+
+
+def _audiobooks(ctx: Context, n: int):
+    from src.lib.audiobook import Audiobook
+    from src.lib.inbox_state import InboxState
+
+    InboxState().scan(set_ready=True, force=True)
+    return [Audiobook(path) for path in ctx.books[:n]]
+
+
+@benchmark("extract_metadata", requires=["ffprobe"])
+def bench_extract_metadata(ctx: Context) -> float:
+    from src.lib.id3_utils import extract_metadata
+
+    books = _audiobooks(ctx, 12)
+    for book in books:
+        book.extract_path_info()
+    return timed(lambda: [extract_metadata(book) for book in books])
+
+
+@benchmark("convert_book_native", requires=["ffmpeg", "ffprobe"])
+def bench_convert_book_native(ctx: Context) -> float:
+    from src.lib.config import cfg
+    from src.lib.converter import convert_book_native
+    from src.lib.fs_utils import cp_dir
+
+    book = next(b for b in _audiobooks(ctx, len(ctx.books)) if b.inbox_dir.is_dir())
+    shutil.rmtree(cfg.merge_dir, ignore_errors=True)
+    shutil.rmtree(cfg.build_dir, ignore_errors=True)
+    cp_dir(book.inbox_dir, book.merge_dir.parent, overwrite_mode="overwrite-silent")
+    book.set_active_dir("merge")
+    book.extract_path_info()
+    book.extract_metadata()
+    return timed(lambda: convert_book_native(book))
+
+
+@benchmark("log_global_results")
+def bench_log_global_results(ctx: Context) -> float:
+    from src.lib.logger import log_global_results, open_run_log
+
+    # A log that has been going for a while, with 20 entries for every book in the inbox
+    log_file = ctx.workdir / "bench-auto-m4b.log"
+    log_file.unlink(missing_ok=True)
+    log_file.with_suffix(".jsonl").unlink(missing_ok=True)
+    history = [
+        {"date": "2024-01-01 00:00:00+0000", "result": "SUCCESS", "book_name": f"{p.name} {i}", "elapsed_s": 60}
+        for i in range(20)
+        for p in ctx.books
+    ]
+    open_run_log(log_file).extend(history)
+
+    books = [
+        SimpleNamespace(
+            basename=p.name,
+            bitrate_friendly="32 kb/s",
+            samplerate_friendly="44.1 kHz",
+            orig_file_type="mp3",
+            num_files=lambda *_: ctx.spec.files_per_book,
+            size=lambda *_: "1 MB",
+            duration=lambda *_: "0h:01m:00s",
+            inbox_dir=p,
+        )
+        for p in ctx.books
+    ]
+    return timed(lambda: [log_global_results(b, "SUCCESS", 60, log_file) for b in books])  # type: ignore
+
+
+def configure(workdir: Path):
+    """Points the app's folders (and META_DIR, via HOME) at `workdir`. Must run before anything in src is
+    imported, since the config is read on first use."""
+    for var, name in [
+        ("INBOX_FOLDER", "inbox"),
+        ("CONVERTED_FOLDER", "converted"),
+        ("ARCHIVE_FOLDER", "archive"),
+        ("BACKUP_FOLDER", "backup"),
+        ("WORKING_FOLDER", "working"),
+        ("HOME", "home"),
+    ]:
+        (workdir / name).mkdir(parents=True, exist_ok=True)
+        os.environ[var] = str(workdir / name)
+    # Measure cold scans, not the scan cache
+    os.environ.setdefault("USE_SCAN_CACHE", "N")
+    os.environ.setdefault("METRICS", "N")
+
+
+def run_benchmarks(ctx: Context, *, only: Sequence[str] = (), repeat: int = 3) -> list[Result]:
+    results: list[Result] = []
+    for b in BENCHMARKS:
+        if only and b.name not in only:
+            continue
+        if missing := [exe for exe in b.requires if not shutil.which(exe)]:
+            results.append(Result(b.name, [], skipped=f"needs {', '.join(missing)}"))
+            continue
+        # The first run is a warm-up that pays for lazy imports, model loads, etc.
+        b.fn(ctx)
+        results.append(Result(b.name, [b.fn(ctx) for _ in range(repeat)]))
+    return results
+
+
+def load_baselines(path: Path = BASELINES_FILE) -> dict[str, dict[str, Any]]:
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def save_baselines(results: list[Result], size: str, path: Path = BASELINES_FILE):
+    baselines = load_baselines(path)
+    saved = baselines.setdefault(size, {})
+    for r in results:
+        if r.runs:
+            saved[r.name] = {
+                "seconds": round(r.seconds, 5),
+                "date": datetime.now().astimezone().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+            }
+    path.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+
+
+def compare(results: list[Result], baselines: dict[str, Any], tolerance: float) -> list[str]:
+    """Prints each result next to its baseline, and returns the names of the ones that regressed."""
+    regressions = []
+    print(f"\n{'benchmark':<22} {'median':>10} {'baseline':>10} {'change':>8}")
+    for r in results:
+        if r.skipped:
+            print(f"{r.name:<22} {'skipped':>10}  ({r.skipped})")
+            continue
+        base = baselines.get(r.name, {}).get("seconds")
+        if base is None:
+            print(f"{r.name:<22} {r.seconds:>9.4f}s {'-':>10}")
+            continue
+        change = (r.seconds - base) / base if base else 0
+        regressed = r.seconds > base * (1 + tolerance) and r.seconds - base > NOISE_FLOOR_S
+        flag = "  << REGRESSION" if regressed else ""
+        print(f"{r.name:<22} {r.seconds:>9.4f}s {base:>9.4f}s {change:>+7.0%}{flag}")
+        if regressed:
+            regressions.append(r.name)
+    return regressions
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark auto-m4b on a synthetic inbox")
+    parser.add_argument("--size", choices=SIZES, default="small", help="How big an inbox to generate")
+    parser.add_argument("--only", nargs="+", default=[], help="Only run these benchmarks")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs of each benchmark, the median is reported")
+    parser.add_argument("--save", action="store_true", help="Save the results as the baselines for this size")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown, 0.5 = 50%%")
+    parser.add_argument("--baselines", type=Path, default=BASELINES_FILE, help="Baselines file")
+    parser.add_argument("--keep", type=Path, help="Generate the inbox here and keep it, instead of in a temp dir")
+    args = parser.parse_args(argv)
+
+    workdir = args.keep or Path(tempfile.mkdtemp(prefix="auto-m4b-bench-"))
+    try:
+        configure(workdir)
+        spec = SIZES[args.size]
+        start = time.perf_counter()
+        books = generate_inbox(workdir / "inbox", spec)
+        print(f"Generated {len(books)} books in {workdir / 'inbox'} in {time.perf_counter() - start:.1f}s")
+
+        ctx = Context(workdir=workdir, inbox=workdir / "inbox", books=books, spec=spec)
+        results = run_benchmarks(ctx, only=args.only, repeat=args.repeat)
+        regressions = compare(results, load_baselines(args.baselines).get(args.size, {}), args.tolerance)
+        if args.save:
+            save_baselines(results, args.size, args.baselines)
+            print(f"\nSaved baselines to {args.baselines}")
+        elif regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}", file=sys.stderr)
+            return 1
+        return 0
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
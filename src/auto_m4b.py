@@ -3,10 +3,12 @@ import time
 import traceback
 from contextlib import contextmanager
 
+from src.import_debug import bug
 from src.lib import run
 from src.lib.config import AutoM4bArgs, cfg
 from src.lib.inbox_state import InboxState
-from src.lib.term import nl, print_error, print_red, was_prev_line_empty
+from src.lib.profiling import profiled
+from src.lib.term import nl, print_debug, print_error, print_red, was_prev_line_empty
 from src.lib.typing import copy_kwargs_omit_first_arg
 
 
@@ -33,6 +35,12 @@ def handle_err(e: Exception):
     time.sleep(cfg.SLEEP_TIME)
 
 
+def print_load_times():
+    """Prints how long the lazily loaded dependencies (NLP models etc.) took to load, once they've been used."""
+    if cfg.DEBUG and (times := bug.report()):
+        print_debug(f"Dependencies loaded in: {times}")
+
+
 @contextmanager
 def use_error_handler():
     try:
@@ -45,17 +53,27 @@ def use_error_handler():
 def app(**kwargs):
     with use_error_handler():
         args = AutoM4bArgs(**kwargs)
-        infinite_loop = args.max_loops == -1
         inbox = InboxState()
         cfg.startup(args)
+        if args.scan_only:
+            for loop in range(1, max(1, args.max_loops) + 1):
+                run.scan_inbox_only(loop)
+            print_load_times()
+            return
+        infinite_loop = args.max_loops == -1
+        inbox.start_watching()
         while infinite_loop or inbox.loop_counter < args.max_loops:
             try:
                 inbox.loop_counter += 1
-                run.process_inbox()
+                with profiled(f"loop-{inbox.loop_counter:04d}"):
+                    run.process_inbox()
+                if inbox.loop_counter == 1:
+                    print_load_times()
             finally:
                 # inbox.loop_counter += 1
                 if infinite_loop or inbox.loop_counter < args.max_loops:
-                    time.sleep(cfg.SLEEP_TIME)
+                    inbox.wait_for_changes(cfg.SLEEP_TIME)
+        inbox.stop_watching()
 
         if not was_prev_line_empty():
             nl()
@@ -1,8 +1,15 @@
-ENABLED = False
+import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+ENABLED = os.getenv("IMPORT_DEBUG", "").lower() in ("1", "y", "yes", "true", "on")
 
 
 class ImportDebug:
     IMPORTS: list[tuple[int, str]] = []
+    # Seconds spent importing/loading each heavy dependency that is loaded lazily, see `timed`
+    TIMINGS: dict[str, float] = {}
 
     def push(self, filename: str):
         # looks through imports and adds the import to the list, where the first element is the filename, and the second incrememnts the previous filename's count by 1. If not found, it adds the import to the list with a count of 0.
@@ -22,5 +29,19 @@ class ImportDebug:
                 self.IMPORTS.pop(len(self.IMPORTS) - i - 1)
                 break
 
+    @contextmanager
+    def timed(self, name: str) -> Iterator[None]:
+        """Times a lazy import or model load, so the cost of each heavy dependency can be reported."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.TIMINGS[name] = self.TIMINGS.get(name, 0) + time.perf_counter() - start
+            if ENABLED:
+                print(" " * (len(self.IMPORTS) * 2) + f" ⏱ {name} took {self.TIMINGS[name]:.2f}s")
+
+    def report(self) -> str:
+        return ", ".join(f"{name} {secs:.2f}s" for name, secs in sorted(self.TIMINGS.items(), key=lambda t: -t[1]))
+
 
 bug = ImportDebug()
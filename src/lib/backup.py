@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import NamedTuple
+
+from src.lib.fs_utils import reflink_file
+from src.lib.term import print_debug
+from src.lib.typing import CloneMode
+
+# Bump this to ignore manifests written by older versions, e.g. if the hash changes
+BACKUP_MANIFEST_VERSION = 1
+CHUNK_SIZE = 1024 * 1024
+
+
+class BackupResult(NamedTuple):
+    files: int
+    size: int
+    copied: int
+    # Already backed up and unchanged since, according to the manifest, or verified against the source
+    unchanged: int
+    # Files that were already in the backup dir, but differ from the source, so were left alone
+    kept: list[str]
+    # Files whose copy doesn't match the source
+    failed: list[str]
+
+
+def manifest_path(backup_dir: Path) -> Path:
+    """The manifest lives next to the backup dir rather than in it, so it doesn't count as part of the backup."""
+    return backup_dir.with_name(f"{backup_dir.name}.manifest.json")
+
+
+def _new_hash():
+    return hashlib.blake2b(digest_size=16)
+
+
+def hash_file(path: Path) -> str:
+    h = _new_hash()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _copy_and_hash(src: Path, dst: Path) -> str:
+    """Copies `src` to `dst` (with its metadata, like `shutil.copy2`), hashing it on the way through."""
+    h = _new_hash()
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        while chunk := s.read(CHUNK_SIZE):
+            h.update(chunk)
+            d.write(chunk)
+    shutil.copystat(src, dst)
+    return h.hexdigest()
+
+
+def _load_manifest(path: Path) -> dict[str, dict]:
+    try:
+        manifest = json.loads(path.read_text())
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print_debug(f"Could not read backup manifest {path}: {e}")
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("version") != BACKUP_MANIFEST_VERSION:
+        return {}
+    return manifest.get("files", {})
+
+
+def _save_manifest(path: Path, files: dict[str, dict]):
+    try:
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(json.dumps({"version": BACKUP_MANIFEST_VERSION, "files": files}, indent=1))
+        tmp.replace(path)
+    except OSError as e:
+        print_debug(f"Could not write backup manifest {path}: {e}")
+
+
+def _try_link(src: Path, dst: Path) -> bool:
+    try:
+        os.link(src, dst)
+        return True
+    except OSError:
+        return False
+
+
+def backup_files(src_dir: Path, dst_dir: Path, *, clone: CloneMode | None = None) -> BackupResult:
+    """Backs up every file under `src_dir` into `dst_dir` in a single walk, checksumming each file as it is
+    copied and checking the copy against it. The checksums go in a manifest next to `dst_dir` (see
+    `manifest_path`), so later runs skip files whose source and backup haven't changed since.
+
+    Files that are already in `dst_dir` are never overwritten: if one matches its source it is added to the
+    manifest, otherwise it is assumed to be a previous backup and kept. `clone` allows files to be reflinked
+    or hardlinked instead of copied, as in `fs_utils.clone_file`."""
+    manifest_file = manifest_path(dst_dir)
+    manifest = _load_manifest(manifest_file)
+    files: dict[str, dict] = {}
+    num_files = size = copied = unchanged = 0
+    kept: list[str] = []
+    failed: list[str] = []
+
+    for root, dirs, filenames in os.walk(src_dir):
+        dirs.sort()
+        for name in sorted(filenames):
+            src = Path(root) / name
+            rel = src.relative_to(src_dir).as_posix()
+            dst = dst_dir / rel
+            try:
+                st = src.stat()
+            except OSError:
+                continue
+            num_files += 1
+            size += st.st_size
+            try:
+                dst_st = dst.stat()
+            except OSError:
+                dst_st = None
+
+            entry = manifest.get(rel)
+            if (
+                entry
+                and dst_st
+                and entry.get("size") == st.st_size == dst_st.st_size
+                and entry.get("mtime_ns") == st.st_mtime_ns
+                and entry.get("dst_mtime_ns") == dst_st.st_mtime_ns
+            ):
+                files[rel] = entry
+                unchanged += 1
+                continue
+
+            try:
+                if dst_st:
+                    digest = hash_file(src)
+                    if dst_st.st_size != st.st_size or hash_file(dst) != digest:
+                        kept.append(rel)
+                        continue
+                    unchanged += 1
+                else:
+                    dst.parent.mkdir(parents=True, exist_ok=True)
+                    if clone and reflink_file(src, dst):
+                        # Shares the source's data, so there's nothing to compare
+                        digest = hash_file(src)
+                    elif clone == "hardlink" and _try_link(src, dst):
+                        digest = hash_file(src)
+                    else:
+                        digest = _copy_and_hash(src, dst)
+                        if hash_file(dst) != digest:
+                            # Don't leave it behind to be mistaken for a previous backup next time
+                            dst.unlink()
+                            failed.append(rel)
+                            continue
+                    copied += 1
+                dst_mtime_ns = dst.stat().st_mtime_ns
+            except OSError as e:
+                print_debug(f"Could not back up {src}: {e}")
+                failed.append(rel)
+                continue
+
+            files[rel] = {
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "dst_mtime_ns": dst_mtime_ns,
+                "blake2b": digest,
+            }
+
+    if files != manifest:
+        _save_manifest(manifest_file, files)
+
+    return BackupResult(num_files, size, copied, unchanged, kept, failed)
+
@@ -1,6 +1,6 @@
 import re
 import time
-from collections.abc import Callable, Sequence
+from collections.abc import Callable, Iterable, Sequence
 from functools import cached_property
 from pathlib import Path
 from typing import Any, cast, Literal, overload, Self, TYPE_CHECKING, TypeVar
@@ -22,6 +22,8 @@ from src.lib.typing import AudiobookFmt, BookStructure2, copy_kwargs
 
 if TYPE_CHECKING:
     from src.lib.audiobook import Audiobook
+    from src.lib.inbox_snapshot import InboxSnapshot
+    from src.lib.scan_cache import ScanCache
 
 
 F = TypeVar("F", bound="Callable[..., Any]")
@@ -57,6 +59,8 @@ class BooksTree(BaseModel):
     root: "BooksTree | None" = None
     _match_filter: list[Path] | str | None = None
     _last_scan: float | None = None
+    _generation: int = 0
+    _scores: dict[str, tuple[int, int, Any]] | None = None
     _i: "TreeNodeSummary" = None  # type: ignore
     id3_tags: Id3Tags | None = None
     start_time: float | None = None
@@ -155,6 +159,98 @@ class BooksTree(BaseModel):
             tree.scan(scan_id3=True)
         return tree
 
+    @classmethod
+    def _node(
+        cls,
+        path: Path,
+        *,
+        root: "BooksTree",
+        parent: "BooksTree",
+        match_filter: list[Path] | str | None,
+        is_dir: bool,
+    ):
+        """Builds a child node for `_scan` when its root and parent are already known. Unlike `cast`, this
+        skips validation and the O(n) `root.get_path`/`get_like` lookups that `__init__` uses to find them."""
+        # Pass every field so pydantic doesn't have to resolve the default factories for each node
+        node = cls.model_construct(
+            path=path, parent=parent, structure=(), root=None, id3_tags=None, start_time=None, ticks=[]
+        )
+        node.root = root
+        node._files = []
+        node._dirs = {}
+        node._match_filter = match_filter
+        node._is_dir = is_dir
+        node._is_file = not is_dir
+        return node
+
+    def _add_paths(
+        self,
+        rglob: list[Path],
+        is_dir: Callable[[Path], bool],
+        *,
+        root: "BooksTree",
+        mindepth: int | None = None,
+        maxdepth: int | None = None,
+    ):
+        """Adds the audio files in `rglob` (a sorted listing under `root`), and the dirs that contain them,
+        to this tree's existing `_files` and `_dirs`."""
+        from src.lib.fs_utils import filter_depth, filter_ignored, only_audio_files
+
+        match_filter = self.match_filter
+
+        # Group the audio files by their parent dir in a single pass, so each dir's files are a dict lookup
+        # instead of a re-filter of the whole rglob
+        audio_files_by_dir: dict[Path, list[Path]] = {}
+        for f in only_audio_files(filter_ignored(rglob)):
+            if filter_depth(f, root.path, mindepth=mindepth, maxdepth=maxdepth, offset=-1):
+                audio_files_by_dir.setdefault(f.parent, []).append(f)
+
+        # Add a dir's audio files to the tree, creating any missing dir nodes between it and the root
+        def _add_to_tree(at_path: Path, audio_files: Sequence[Path]):
+            # tick("adding to tree", at_path, len(audio_files))
+            parts = at_path.relative_to(root.path).parts
+            subtree = self
+            audio_files = match_filter_paths(audio_files, match_filter, root=root)
+            for i, part in enumerate(parts):
+                if part not in subtree._dirs:
+                    parent_p = Path(root.path, *parts[: i + 1])
+                    if not match_filter_path(parent_p, match_filter, root=root):
+                        continue
+                    subtree._dirs[part] = BooksTree._node(
+                        parent_p, root=root, parent=subtree, match_filter=match_filter, is_dir=True
+                    )
+                subtree = subtree._dirs[part]
+            if audio_files:
+                subtree._files = isorted(
+                    [
+                        *subtree._files,
+                        *(
+                            BooksTree._node(f, root=root, parent=subtree, match_filter=match_filter, is_dir=False)
+                            for f in audio_files
+                        ),
+                    ]
+                )
+
+        # tick("building tree of audio files and dirs")
+        # Build a tree of the audio files and dirs. rglob is sorted, so parents are always created before children.
+        for d in [x for x in rglob if is_dir(x) and x != root.path]:
+            # If d is not within the mindepth and maxdepth, skip it
+            if not filter_depth(d, root.path, mindepth=mindepth, maxdepth=maxdepth):
+                continue
+            if audio_files_in_dir := audio_files_by_dir.get(d):
+                _add_to_tree(d, audio_files_in_dir)
+
+        # Add files from the current level to self.files
+        self._files = isorted(
+            [
+                *self._files,
+                *(
+                    BooksTree._node(f, root=root, parent=self, match_filter=match_filter, is_dir=False)
+                    for f in match_filter_paths(audio_files_by_dir.get(self.path, []), match_filter, root=root)
+                ),
+            ]
+        )
+
     def _scan(
         self,
         *,
@@ -164,10 +260,10 @@ class BooksTree(BaseModel):
         allow_non_root: bool = False,
         determine_structure: bool = True,
         scan_id3: bool | None = None,
+        snapshot: "InboxSnapshot | None" = None,
+        scan_cache: "ScanCache | None" = None,
     ):
 
-        from src.lib.fs_utils import filter_depth, filter_ignored, only_audio_files
-
         self.start_time = time.time()
 
         root: Self | BooksTree = self if self.is_root or not self.root else self.root
@@ -183,70 +279,25 @@ class BooksTree(BaseModel):
             # tick("root.is_file() and allow_file_root, returning self")
             return self
 
-        # Do a recursive glob of all files in the directory, and prepend the root so we can get standalone files
+        # Do a recursive glob of all files in the directory, and prepend the root so we can get standalone files.
+        # If we were given a snapshot of the dir, use its listing instead of walking the filesystem again.
         # tick("getting rglob")
-        rglob = isorted([root.path, *root.path.rglob("*")])
+        if snapshot is not None and snapshot.covers(root.path):
+            rglob = isorted([root.path, *snapshot.paths(root.path)])
+            snapshot_dirs = {root.path, *snapshot.dirs(root.path)}
+            is_dir: Callable[[Path], bool] = lambda p: p in snapshot_dirs
+        else:
+            rglob = isorted([root.path, *root.path.rglob("*")])
+            is_dir = lambda p: p.is_dir()
         # tick("done getting rglob", len(rglob))
 
         self._files = []
         self._dirs = {}
-
-        # Function to recursively add keys to the tree dict
-        def _add_to_tree(at_path: Path, audio_files: Sequence[Path | BooksTree]):
-            # tick("adding to tree", at_path, len(audio_files))
-            rel_path = at_path.relative_to(root.path)
-            parts = rel_path.parts
-            subtree = self
-            audio_files = match_filter_paths(audio_files, self.match_filter, root=root)
-            for i, part in enumerate(parts):
-                if part not in subtree._dirs:
-                    parent_p = Path(root.path, *parts[: i + 1])
-                    # tick("part not in subtree._dirs, adding parent_p", parent_p)
-                    if not match_filter_path(parent_p, self.match_filter, root=root):
-                        # tick("parent_p not in match_filter, skipping")
-                        continue
-                    # tick("parent_p in match_filter, adding to subtree")
-                    subtree._dirs[part] = BooksTree.cast(parent_p, root=root, match_filter=self.match_filter)
-                # tick(f"subtree._dirs[{part}] =", subtree._dirs[part])
-                subtree = subtree._dirs[part]
-            if files := [*subtree._files, *audio_files]:
-                # tick(f"subtree has files, adding {len(files)} to subtree")
-                subtree._files = isorted([BooksTree.cast(p, root=root, match_filter=self.match_filter) for p in files])
-                # tick("done adding files to subtree", [f.rel_path for f in subtree._files])
-            # else:
-            # tick("subtree has no files, skipping")
-
-        # tick("building tree of audio files and dirs")
-        # Build a tree of the audio files and dirs
-        for d in [x for x in rglob if x.is_dir()]:
-            # If d is not within the mindepth and maxdepth, skip it
-            if not filter_depth(d, root.path, mindepth=mindepth, maxdepth=maxdepth):
-                # tick("d not in mindepth and maxdepth, skipping")
-                continue
-
-            # If x is a dir, make sure the path and its parents exists in the tree
-            # tick("d is a dir, getting audio files in dir")
-            audio_files_in_dir = [
-                f
-                for f in only_audio_files(filter_ignored(rglob))
-                if f.parent == d and filter_depth(f, root.path, mindepth=mindepth, maxdepth=maxdepth, offset=-1)
-            ]
-            # tick(f"done getting audio {len(audio_files_in_dir)} files in dir {d.relative_to(root.path)}")
-            if audio_files_in_dir:
-                # tick("about to call _add_to_tree(d)", d)
-                _add_to_tree(d, audio_files_in_dir)
-            # else:
-            # tick("no audio files in dir, skipping")
-
-        # Add files from the current level to self.files
-        # tick(f"adding files from current level to self.files, total is currently {len(self._files)}")
-        self._files = isorted(
-            [
-                BooksTree.cast(f, root=root, match_filter=self.match_filter)
-                for f in match_filter_paths(only_audio_files(filter_ignored(rglob)), self.match_filter, root=root)
-                if f.parent == self.path and filter_depth(f, root.path, mindepth=mindepth, maxdepth=maxdepth, offset=-1)
-            ]
-        )
+        self._add_paths(rglob, is_dir, root=root, mindepth=mindepth, maxdepth=maxdepth)
+        self._bump_generation()
+        # Restore the structures of any books that haven't changed since they were cached, so they aren't re-scored
+        if scan_cache is not None and determine_structure:
+            scan_cache.apply(self)
         # tick(f"done adding files from current level to self.files, total is now {len(self._files)}")
 
         self._last_scan = time.time()
@@ -256,10 +307,7 @@ class BooksTree(BaseModel):
             # tick(f"scanning id3 tags because scan_id3 is {scan_id3}")
             if self.is_root:
                 # tick(f"self is root, scanning id3 tags recurseively ({len(self.files_recursive)} files)")
-                for f in [f for f in self.files_recursive if not f.id3_tags]:
-                    # tick(f"(root-leaf) scanning id3 tags for file {f.rel_path}")
-                    f.id3_tags = t if (t := Id3Tags.from_file(f.path)) and not t.BAD else None
-                    # tick(f"(root-leaf) done scanning id3 tags for file {f.rel_path}")
+                self._scan_id3_tags(self.files_recursive)
             elif self.is_file() and not self.id3_tags:
                 # tick(f"(self-is_file) scanning id3 tags for direct file {self.rel_path}")
                 self.id3_tags = t if (t := Id3Tags.from_file(self.path)) and not t.BAD else None
@@ -275,6 +323,27 @@ class BooksTree(BaseModel):
         # print_debug(f"total time taken: {total_time} seconds", self.ticks)
         return self
 
+    @property
+    def generation(self) -> int:
+        """Bumped each time this node's subtree is scanned, so scores cached for the previous generation are
+        no longer used (see `scorers.ScorerCache`). Nodes that are rebuilt by a scan start over at 0."""
+        return self._generation
+
+    def _bump_generation(self):
+        """Marks this node's subtree as changed, and so also the subtrees of all of its ancestors."""
+        node: BooksTree | None = self
+        while node is not None:
+            node._generation += 1
+            node = node.parent
+
+    @staticmethod
+    def _scan_id3_tags(files: "Sequence[BooksTree]"):
+        """Reads the id3 tags of every file that doesn't have them yet, in one batch (see `Id3Tags.from_files`)."""
+        files = [f for f in files if not f.id3_tags]
+        tags = Id3Tags.from_files([f.path for f in files])
+        for f in files:
+            f.id3_tags = t if (t := tags.get(f.path)) and not t.BAD else None
+
     @copy_kwargs(_scan)
     def scan(self, *args, **kwargs) -> "BooksTree":
         """Given a path, returns a TreePath of all directories containing audio files, and their subdirectories, and the audio files within them.
@@ -310,6 +379,63 @@ class BooksTree(BaseModel):
         self._last_scan = time.time()
         return self
 
+    def rescan(
+        self,
+        names: "Iterable[str]",
+        *,
+        scan_id3: bool | None = None,
+        determine_structure: bool = True,
+        snapshot: "InboxSnapshot | None" = None,
+    ) -> "BooksTree":
+        """Rebuilds only the given top-level entries (book or series dirs, or standalone files) of an already
+        scanned root, leaving every other subtree - and its structure - untouched. Entries that no longer
+        exist are removed. Falls back to a full `scan()` if the tree has never been scanned."""
+
+        if not self.is_root:
+            raise RuntimeError("rescan() should only be called on the root of the tree")
+
+        if not self._last_scan:
+            return self.scan(scan_id3=scan_id3, determine_structure=determine_structure, snapshot=snapshot)
+
+        names = set(names)
+        for name in names:
+            self._dirs.pop(name, None)
+        self._files = [f for f in self._files if f.name not in names]
+
+        use_snapshot = bool(snapshot is not None and snapshot.covers(self.path))
+        rglob: list[Path] = []
+        for p in (self.path / name for name in names):
+            if use_snapshot:
+                if (p_is_dir := snapshot.is_dir(p)) is not None:  # type: ignore
+                    rglob.extend([p, *snapshot.paths(p)] if p_is_dir else [p])  # type: ignore
+            elif p.exists():
+                rglob.extend([p, *p.rglob("*")] if p.is_dir() else [p])
+        rglob = isorted(rglob)
+
+        if use_snapshot:
+            snapshot_dirs = {p for p in rglob if snapshot.is_dir(p)}  # type: ignore
+            is_dir: Callable[[Path], bool] = lambda p: p in snapshot_dirs
+        else:
+            is_dir = lambda p: p.is_dir()
+
+        self._add_paths(rglob, is_dir, root=self)
+        self._bump_generation()
+        # Keep _dirs in the same (sorted) order a full scan would have inserted them in
+        self._dirs = {d.name: d for d in isorted(list(self._dirs.values()))}
+        rebuilt = [c for c in (*self._files, *self._dirs.values()) if c.name in names]
+
+        if scan_id3 is True or (scan_id3 is None and determine_structure):
+            self._scan_id3_tags([f for c in rebuilt for f in ([c] if c.is_file() else c.files_recursive)])
+
+        if determine_structure:
+            for c in rebuilt:
+                c.determine_structure(parent=self)
+            for c in rebuilt:
+                [n.determine_if_book_root() for n in (c, *c.children_recursive)]
+
+        self._last_scan = time.time()
+        return self
+
     def get(self, rel: "str | Path | BooksTree"):
         """
         Gets a file or directory from the tree by its relative path (string), Path, or TreePath object.
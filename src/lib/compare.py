@@ -242,6 +242,9 @@ def get_size_similarity(
     curve_strength = max(3, curve_strength)
 
     sizes = [size * byte_multiplier for size in sizes if size >= ignore_smaller_than]
+    # Nothing left to compare once the small ones are ignored
+    if len(sizes) < 2:
+        return 1.0
 
     # Calculate the maximum absolute difference between any two sizes, ensuring it's at least 1
     max_diff = max(1, max(abs(a - b) for a, b in combinations(sizes, 2)))
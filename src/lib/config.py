@@ -34,7 +34,7 @@ from src.lib.misc import (
     to_json,
 )
 from src.lib.term import nl, print_amber, print_debug, print_error
-from src.lib.typing import OnComplete, OverwriteMode
+from src.lib.typing import OnComplete, OverwriteMode, WatchMode
 
 AUDIO_EXTS = AUDIO_EXTS
 
@@ -81,6 +81,21 @@ parser.add_argument(
     default=True,
     type=lambda x: False if str(x).lower() in ("off", "false", "no", "n", "0") else True,
 )
+parser.add_argument(
+    "--profile",
+    help="Enable/disable profiling each loop with cProfile, profiles are saved in META_DIR/profiles. Default is False.",
+    action="store",
+    nargs="?",
+    const=True,
+    default=None,
+    type=lambda x: False if str(x).lower() in ("off", "false", "no", "n", "0") else True,
+)
+parser.add_argument(
+    "--scan_only",
+    help="Only scan the inbox and determine the structure of each book, without converting anything. Runs once unless --max_loops is set.",
+    action="store_true",
+    default=False,
+)
 
 T = TypeVar("T", bound=object)
 D = TypeVar("D")
@@ -172,6 +187,8 @@ class AutoM4bArgs:
     max_loops: int
     match_filter: str | None
     crash_protection: bool | None
+    profile: bool | None
+    scan_only: bool
 
     def __init__(
         self,
@@ -181,6 +198,8 @@ class AutoM4bArgs:
         max_loops: int | None = None,
         match_filter: str | None = None,
         crash_protection: bool | None = None,
+        profile: bool | None = None,
+        scan_only: bool | None = None,
     ):
         args = parser.parse_known_args()[0]
 
@@ -190,6 +209,8 @@ class AutoM4bArgs:
         self.max_loops = pick(max_loops, args.max_loops, -1)
         self.match_filter = pick(match_filter, args.match_filter)
         self.crash_protection = pick(crash_protection, args.crash_protection, True)
+        self.profile = pick(profile, args.profile, None)
+        self.scan_only = pick(scan_only, args.scan_only, False)
 
     def __str__(self) -> str:
         return to_json(self.__dict__)
@@ -348,6 +369,23 @@ class Config:
 
     CPU_CORES = _CPU_CORES
 
+    @env_property(typ=int, default=1)
+    def _PARALLEL_BOOKS(self):
+        """Number of books to copy, convert, tag and move at the same time (native converter only). All books
+        share one budget of CPU_CORES ffmpeg processes. Default is 1, one book at a time."""
+        ...
+
+    PARALLEL_BOOKS = _PARALLEL_BOOKS
+
+    @env_property(typ=bool, default=False)
+    def _PIPELINE_BOOKS(self):
+        """Overlap the stages of consecutive books: while one book is encoding, the next is backed up and
+        copied to the working dir, and the previous one is moved and archived. Time spent in each stage is
+        printed at the end (native converter only). Not used when PARALLEL_BOOKS > 1. Default is False."""
+        ...
+
+    PIPELINE_BOOKS = _PIPELINE_BOOKS
+
     @env_property(typ=float, default=DEFAULT_SLEEP_TIME)
     def _SLEEP_TIME(self):
         """Time to sleep between loops, in seconds. Default is 10s."""
@@ -362,6 +400,36 @@ class Config:
 
     WAIT_TIME = _WAIT_TIME
 
+    @env_property(
+        typ=WatchMode,
+        default="poll",
+        on_get=lambda v: v if v in ("poll", "inotify", "auto") else "poll",
+    )
+    def _WATCH_MODE(self):
+        """How to detect changes in the inbox between loops. 'poll' (default) re-hashes the inbox every
+        SLEEP_TIME; 'inotify' waits for filesystem events and only re-checks the books that changed;
+        'auto' uses inotify if it is available and falls back to polling. inotify does not see changes
+        made by other hosts on network shares, so keep 'poll' if the inbox is on NFS/SMB."""
+        ...
+
+    WATCH_MODE = cast(WatchMode, _WATCH_MODE)
+
+    @env_property(typ=bool, default=True)
+    def _USE_SCAN_CACHE(self):
+        """Keep each book's structure and ID3 tags in a cache in META_DIR, so that books that haven't changed
+        since the last run aren't re-probed and re-scored on startup. Default is True."""
+        ...
+
+    USE_SCAN_CACHE = _USE_SCAN_CACHE
+
+    @env_property(typ=bool, default=False)
+    def _USE_PROBE_CACHE(self):
+        """Keep ffprobe results (durations, bitrates, tags) in a cache in META_DIR, so that audio files that
+        haven't changed since the last run aren't probed again. Default is False."""
+        ...
+
+    USE_PROBE_CACHE = _USE_PROBE_CACHE
+
     @property
     def sleeptime_friendly(self):
         """If it can be represented as a whole number, do so as {number}s
@@ -384,6 +452,40 @@ class Config:
 
     OPEN_LIBRARY_USER_AGENT = _OPEN_LIBRARY_USER_AGENT
 
+    @env_property(typ=bool, default=True)
+    def _OPEN_LIBRARY_INDEX(self):
+        """Look up authors and titles in a local Open Library index (ol_index.db in META_DIR) instead of the
+        Open Library API, if one has been built with `build-ol-index` from the Open Library dumps. Needs no
+        user agent and makes no requests. Default is True."""
+        ...
+
+    OPEN_LIBRARY_INDEX = _OPEN_LIBRARY_INDEX
+
+    @env_property(typ=float, default=3.0)
+    def _OPEN_LIBRARY_RATE_LIMIT(self):
+        """The most requests per second to make to the Open Library API, on average. Cached responses don't
+        count. Open Library allows 3/s with a user agent. Default is 3."""
+        ...
+
+    OPEN_LIBRARY_RATE_LIMIT = _OPEN_LIBRARY_RATE_LIMIT
+
+    @env_property(typ=bool, default=True)
+    def _METRICS(self):
+        """Time each stage of every book (backup, copy, convert, tagging, Open Library lookups, moves, etc.) and
+        write the totals per book and per loop to metrics.jsonl in META_DIR, and as Prometheus metrics to
+        metrics.prom. Default is True."""
+        ...
+
+    METRICS = _METRICS
+
+    @env_property(typ=bool, default=False)
+    def _PROFILE(self):
+        """Profile each loop (and each inbox scan between loops) with cProfile, and save the profiles and a
+        summary of the slowest functions in META_DIR/profiles. Same as --profile. Default is False."""
+        ...
+
+    PROFILE = _PROFILE
+
     @env_property(
         typ=str,
         default="15,30",
@@ -413,6 +515,35 @@ class Config:
 
     USE_NATIVE_CONVERTER = _USE_NATIVE_CONVERTER
 
+    @env_property(typ=bool, default=False)
+    def _STREAM_ENCODE(self):
+        """With the native converter, encode all of a book's files in a single ffmpeg pass straight to the
+        final m4b, instead of converting each file to a temp MP4 and concatenating them. Uses about a third
+        of the disk I/O and scratch space, but chapter times come from the source files' durations, which
+        can be less exact for VBR mp3s. Only used when every file has the same codec, sample rate and
+        channels; otherwise the per-file path is used. Default is False."""
+        ...
+
+    STREAM_ENCODE = _STREAM_ENCODE
+
+    @env_property(typ=bool, default=True)
+    def _RESUME_CONVERSIONS(self):
+        """With the native converter, keep each book's converted intermediate files (and a checkpoint of
+        which source files they came from) until the book is done, so that if auto-m4b is stopped or crashes
+        mid-conversion, only the files that weren't finished are converted again. Default is True."""
+        ...
+
+    RESUME_CONVERSIONS = _RESUME_CONVERSIONS
+
+    @env_property(typ=bool, default=True)
+    def _USE_NLP(self):
+        """Use spaCy, a transformer model and NLTK to find author and narrator names in file and folder names.
+        The models are only loaded the first time a name needs parsing. Set USE_NLP=N to skip loading them
+        entirely and only parse names with patterns, which is faster but less accurate. Default is True."""
+        ...
+
+    USE_NLP = _USE_NLP
+
     @env_property(typ=bool, default="pytest" in sys.modules)
     def _TEST(self): ...
 
@@ -428,6 +559,24 @@ class Config:
 
     BACKUP = _BACKUP
 
+    @env_property(typ=bool, default=False)
+    def _BACKUP_HARDLINKS(self):
+        """Allow backup files to be hardlinks to the inbox files, when both are on the same filesystem. A
+        hardlink survives the original being moved or deleted, but not being changed in place. Reflinks
+        (copy-on-write clones, e.g. on btrfs/xfs) are real copies, so they're always used when possible.
+        Default is False."""
+        ...
+
+    BACKUP_HARDLINKS = _BACKUP_HARDLINKS
+
+    @env_property(typ=bool, default=True)
+    def _LINK_WORKING_FILES(self):
+        """Hardlink (or reflink) inbox files into the working folder instead of copying them, when both are
+        on the same filesystem. The working copy is only ever read from. Default is True."""
+        ...
+
+    LINK_WORKING_FILES = _LINK_WORKING_FILES
+
     @env_property(typ=bool, default=True)
     def _CRASH_PROTECTION(self): ...
 
@@ -604,11 +753,12 @@ class Config:
         return fatal_file
 
     def clean(self):
+        from src.lib.converter.checkpoint import resumable_tmp_dirs
         from src.lib.fs_utils import clean_dir
 
-        # Pre-clean working folders
+        # Pre-clean working folders, but keep any conversions that can be resumed
         clean_dir(self.merge_dir)
-        clean_dir(self.build_dir)
+        clean_dir(self.build_dir, keep=resumable_tmp_dirs(self.build_dir))
         clean_dir(self.trash_dir)
 
     def check_dirs(self):
@@ -810,6 +960,9 @@ class Config:
         if self.args.match_filter:
             self.MATCH_FILTER = self.args.match_filter
 
+        if self.args.profile is not None:
+            self.PROFILE = self.args.profile
+
         yield "" if quiet else msg
 
     @overload
@@ -0,0 +1,88 @@
+"""Checkpoint manifest for resuming a book's per-file conversions after a crash or restart."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+CHECKPOINT_FILE = "checkpoint.json"
+# Bump this to ignore checkpoints written by older versions
+CHECKPOINT_VERSION = 1
+
+
+def resumable_tmp_dirs(build_root: Path) -> list[Path]:
+    """Every temp dir under *build_root* with a checkpoint, i.e. that should
+    survive cleaning the build folder so its book can pick up where it left off."""
+    from src.lib.config import cfg
+
+    if not cfg.RESUME_CONVERSIONS or not build_root.is_dir():
+        return []
+    return [f.parent for f in build_root.rglob(CHECKPOINT_FILE)]
+
+
+class Checkpoint:
+    """Records which source files in a book already have a finished intermediate
+    MP4 in *tmp_dir*, and how long it is.
+
+    An entry is only reused if the source file's size and mtime, the encoding
+    options, and the intermediate's size are all unchanged; anything else is
+    converted again. Entries are written as soon as each file finishes, so a
+    killed process loses at most the files that were in flight.
+    """
+
+    def __init__(self, tmp_dir: Path, src_root: Path, options: dict[str, Any]):
+        self.path = tmp_dir / CHECKPOINT_FILE
+        self.src_root = src_root
+        self.options = options
+        self._lock = threading.Lock()
+        self._files: dict[str, dict[str, Any]] = {}
+        try:
+            data = json.loads(self.path.read_text())
+            if data.get("version") == CHECKPOINT_VERSION and data.get("options") == options:
+                self._files = data.get("files", {})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def __len__(self):
+        return len(self._files)
+
+    def _rel(self, src: Path) -> str:
+        return src.relative_to(self.src_root).as_posix()
+
+    def get(self, src: Path, dst: Path) -> Optional[int]:
+        """The duration (ms) of *src*'s finished intermediate at *dst*, or None
+        if it needs converting."""
+        entry = self._files.get(self._rel(src))
+        if not entry or entry.get("dst") != dst.name:
+            return None
+        try:
+            src_st, dst_st = src.stat(), dst.stat()
+        except OSError:
+            return None
+        if (entry.get("size"), entry.get("mtime_ns"), entry.get("dst_size")) != (
+            src_st.st_size,
+            src_st.st_mtime_ns,
+            dst_st.st_size,
+        ):
+            return None
+        return entry.get("duration_ms")
+
+    def done(self, src: Path, dst: Path, duration_ms: int) -> None:
+        """Records that *src* has been converted to *dst*."""
+        src_st = src.stat()
+        entry = {
+            "size": src_st.st_size,
+            "mtime_ns": src_st.st_mtime_ns,
+            "dst": dst.name,
+            "dst_size": dst.stat().st_size,
+            "duration_ms": duration_ms,
+        }
+        with self._lock:
+            self._files[self._rel(src)] = entry
+            data = {"version": CHECKPOINT_VERSION, "options": self.options, "files": self._files}
+            tmp = self.path.with_name(f".{CHECKPOINT_FILE}.tmp")
+            tmp.write_text(json.dumps(data, indent=1))
+            os.replace(tmp, self.path)
@@ -7,16 +7,21 @@ import tempfile
 import time
 from concurrent.futures import as_completed, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, TYPE_CHECKING
+from typing import Optional, Sequence, TYPE_CHECKING
 
 from src.lib.converter.chapters import (
     build_chapters_from_files,
     dedupe_names,
     parse_chapters_txt,
 )
+from src.lib.converter.checkpoint import Checkpoint
 from src.lib.converter.encoder import detect_aac_codec, CODEC_AAC
 from src.lib.converter.ffmetadata import write_ffmetadata
 from src.lib.converter.naturalsort import natural_sort_files
+from src.lib.ffmpeg_utils import get_file_durations, remember_file_durations
+from src.lib.metrics import metrics
+from src.lib.scheduler import ffmpeg_slot
+from src.lib.term import print_debug
 
 if TYPE_CHECKING:
     from src.lib.audiobook import Audiobook
@@ -25,9 +30,9 @@ if TYPE_CHECKING:
 def _ffprobe_duration_ms(path: Path) -> int:
     """Return the exact duration of *path* in milliseconds via ffprobe."""
     try:
-        import ffmpeg as _ffmpeg
+        from src.lib.ffprobe_utils import probeCache
 
-        duration_s = float(_ffmpeg.probe(str(path))["format"]["duration"])
+        duration_s = float(probeCache.probe(path)["format"]["duration"])
         return round(duration_s * 1000)
     except Exception:
         # fall back to subprocess ffprobe
@@ -55,9 +60,9 @@ def _ffprobe_duration_ms(path: Path) -> int:
 def _ffprobe_title_tag(path: Path) -> Optional[str]:
     """Return the 'title' tag from *path*, or None."""
     try:
-        import ffmpeg as _ffmpeg
+        from src.lib.ffprobe_utils import probeCache
 
-        tags = _ffmpeg.probe(str(path))["format"].get("tags", {}) or {}
+        tags = probeCache.probe(path)["format"].get("tags", {}) or {}
         return tags.get("title") or tags.get("Title")
     except Exception:
         return None
@@ -125,9 +130,24 @@ def _write_concat_list(tmp_files: list[Path], list_path: Path) -> None:
     list_path.write_text("".join(lines), encoding="utf-8")
 
 
-def _concat_to_m4b(list_path: Path, output: Path, *, debug: bool = False) -> None:
-    """Concatenate the temp MP4 files listed in *list_path* into a single MP4."""
+def _concat_to_m4b(
+    list_path: Path,
+    meta: Path,
+    output: Path,
+    cover: Optional[Path] = None,
+    *,
+    audio_args: Sequence[str] = ("-c:a", "copy"),
+    debug: bool = False,
+) -> None:
+    """Concatenate the files listed in *list_path* straight into *output*.
+
+    The ffmetadata *meta* (tags + chapters) and optional *cover* are mapped in
+    as extra inputs, so the book is written (and faststart-relocated) once.
+    *audio_args* are the audio codec options, stream copy by default.
+    """
     output.parent.mkdir(parents=True, exist_ok=True)
+    has_cover = bool(cover and cover.is_file())
+
     cmd = [
         "ffmpeg",
         "-hide_banner",
@@ -140,77 +160,72 @@ def _concat_to_m4b(list_path: Path, output: Path, *, debug: bool = False) -> Non
         "0",
         "-i",
         str(list_path),
-        "-vn",
-        "-c",
-        "copy",
-        "-max_muxing_queue_size",
-        "9999",
-        "-movflags",
-        "+faststart",
-        str(output),
+        "-i",
+        str(meta),
     ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    if has_cover:
+        cmd += ["-i", str(cover)]
+
+    cmd += ["-map", "0:a"]
+    if has_cover:
+        cmd += ["-map", "2:v"]
+    cmd += ["-map_metadata", "1", "-map_chapters", "1", *audio_args]
+    if has_cover:
+        cmd += ["-c:v", "mjpeg", "-disposition:v", "attached_pic"]
+
+    cmd += ["-max_muxing_queue_size", "9999", "-movflags", "+faststart", str(output)]
+
+    with ffmpeg_slot():
+        result = subprocess.run(cmd, capture_output=True, text=True)
     if result.returncode != 0:
         raise RuntimeError(f"ffmpeg concat failed:\n{result.stderr}")
 
 
-def _embed_metadata_and_cover(
-    audio: Path,
+def _stream_encode_to_m4b(
+    src_files: list[Path],
+    list_path: Path,
     meta: Path,
     output: Path,
     cover: Optional[Path] = None,
     *,
+    copy: bool,
+    codec: str,
+    bitrate: int,
+    samplerate: int,
     debug: bool = False,
 ) -> None:
-    """Remux *audio* with ffmetadata *meta* (and optional *cover*) into *output*."""
-    output.parent.mkdir(parents=True, exist_ok=True)
-    cmd = [
-        "ffmpeg",
-        "-hide_banner",
-        "-loglevel",
-        "error" if not debug else "verbose",
-        "-y",
-        "-i",
-        str(audio),
-        "-i",
-        str(meta),
-    ]
+    """Encode *src_files* straight into *output* in one ffmpeg pass.
 
-    if cover and cover.is_file():
-        cmd += ["-i", str(cover)]
-        cmd += [
-            "-map",
-            "0:a",
-            "-map",
-            "2:v",
-            "-map_metadata",
-            "1",
-            "-map_chapters",
-            "1",
-            "-c",
-            "copy",
-            "-c:v",
-            "mjpeg",
-            "-disposition:v",
-            "attached_pic",
-        ]
+    The concat demuxer feeds the sources in order, so there are no per-file
+    temp MP4s; see ``_concat_to_m4b``.
+    """
+    if copy:
+        audio_args = ["-c:a", "copy"]
     else:
-        cmd += [
-            "-map",
-            "0:a",
-            "-map_metadata",
-            "1",
-            "-map_chapters",
-            "1",
-            "-c",
-            "copy",
-        ]
+        audio_args = ["-c:a", codec, "-b:a", f"{bitrate}k", "-ar", str(samplerate)]
+        if codec == CODEC_AAC:
+            audio_args += ["-strict", "experimental"]
 
-    cmd += ["-movflags", "+faststart", str(output)]
+    _write_concat_list(src_files, list_path)
+    _concat_to_m4b(list_path, meta, output, cover, audio_args=audio_args, debug=debug)
 
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise RuntimeError(f"ffmpeg metadata embed failed:\n{result.stderr}")
+
+def _audio_stream_params(path: Path) -> Optional[tuple]:
+    """(codec, sample rate, channels) of the first audio stream in *path*, or None."""
+    from src.lib.ffprobe_utils import probeCache
+
+    try:
+        streams = probeCache.probe(path).get("streams", [])
+    except Exception:
+        return None
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    return None if audio is None else (audio.get("codec_name"), audio.get("sample_rate"), audio.get("channels"))
+
+
+def _can_stream_encode(src_files: list[Path]) -> bool:
+    """The concat demuxer needs every input to share codec, sample rate and channels."""
+    params = {_audio_stream_params(f) for f in src_files}
+    return len(params) == 1 and None not in params
 
 
 def _find_chapters_txt(directory: Path) -> Optional[Path]:
@@ -228,6 +243,13 @@ def _collect_audio_files(directory: Path) -> list[Path]:
     return natural_sort_files(files)
 
 
+def _inbox_originals(book: "Audiobook", merge_dir: Path, src_files: list[Path]) -> list[Path]:
+    """The inbox files that *src_files* were copied from (see ``run.copy_to_working_dir``)."""
+    if book.inbox_dir.is_file():
+        return [book.inbox_dir] if len(src_files) == 1 else []
+    return [book.inbox_dir / f.relative_to(merge_dir) for f in src_files]
+
+
 def convert_book_native(book: "Audiobook") -> int:
     """Native Python implementation of ``m4b-tool merge``.
 
@@ -260,32 +282,68 @@ def convert_book_native(book: "Audiobook") -> int:
     bitrate: int = book.bitrate_target
     samplerate: int = book.samplerate
 
-    # ── 3. Per-file convert to temp MP4 (parallel) ────────────────────────────
-    def _convert_one(i: int, src: Path) -> tuple[int, Path]:
-        dst = tmp_dir / f"{i:05d}_{src.stem}.mp4"
-        _convert_file_to_mp4(
-            src,
-            dst,
-            copy=should_copy,
-            codec=codec,
-            bitrate=bitrate,
-            samplerate=samplerate,
-            debug=debug,
-        )
-        return i, dst
-
-    ordered: dict[int, Path] = {}
     max_workers = max(1, cfg.CPU_CORES)
-    with ThreadPoolExecutor(max_workers=max_workers) as pool:
-        futures = {pool.submit(_convert_one, i, f): i for i, f in enumerate(src_files)}
-        for fut in as_completed(futures):
-            idx, dst_path = fut.result()  # propagates exceptions
-            ordered[idx] = dst_path
-
-    tmp_files = [ordered[i] for i in sorted(ordered)]
+    stream = bool(cfg.STREAM_ENCODE) and _can_stream_encode(src_files)
+    if cfg.STREAM_ENCODE and not stream:
+        print_debug("Source files don't share codec/sample rate/channels, converting them one at a time")
+
+    if stream:
+        # ── 3+4. Streaming: no temp files, chapter durations come from the sources
+        tmp_files: list[Path] = []
+        with metrics.span("convert.probe", book):
+            durations_ms = [round(d * 1000) for d in get_file_durations(src_files)]
+    else:
+        # ── 3. Per-file convert to temp MP4 + measure durations (parallel) ─
+        checkpoint = (
+            Checkpoint(
+                tmp_dir,
+                merge_dir,
+                {"copy": should_copy, "codec": codec, "bitrate": bitrate, "samplerate": samplerate},
+            )
+            if cfg.RESUME_CONVERSIONS
+            else None
+        )
 
-    # ── 4. Get exact durations via ffprobe ────────────────────────────────────
-    durations_ms = [_ffprobe_duration_ms(f) for f in tmp_files]
+        def _convert_one(i: int, src: Path) -> tuple[int, Path, int, bool]:
+            dst = tmp_dir / f"{i:05d}_{src.stem}.mp4"
+            if checkpoint and (duration_ms := checkpoint.get(src, dst)) is not None:
+                return i, dst, duration_ms, True
+            with ffmpeg_slot(), metrics.span("convert.transcode", book):
+                _convert_file_to_mp4(
+                    src,
+                    dst,
+                    copy=should_copy,
+                    codec=codec,
+                    bitrate=bitrate,
+                    samplerate=samplerate,
+                    debug=debug,
+                )
+            # ── 4. Get exact duration via ffprobe ─────────────────────────────
+            with metrics.span("convert.probe", book):
+                duration_ms = _ffprobe_duration_ms(dst)
+            if checkpoint:
+                checkpoint.done(src, dst, duration_ms)
+            return i, dst, duration_ms, False
+
+        ordered: dict[int, tuple[Path, int]] = {}
+        resumed = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(_convert_one, i, f): i for i, f in enumerate(src_files)}
+            for fut in as_completed(futures):
+                idx, dst_path, duration_ms, was_resumed = fut.result()  # propagates exceptions
+                ordered[idx] = dst_path, duration_ms
+                resumed += was_resumed
+
+        if resumed:
+            print_debug(f"Resumed {resumed} of {len(src_files)} already converted files from the last run")
+        tmp_files = [ordered[i][0] for i in sorted(ordered)]
+        durations_ms = [ordered[i][1] for i in sorted(ordered)]
+
+    # Share them with get_duration(), for both the merge copies and the inbox files they were copied from, so
+    # the console/global log don't probe every source file again
+    remember_file_durations(
+        src_files, [ms / 1000 for ms in durations_ms], copied_from=_inbox_originals(book, merge_dir, src_files)
+    )
 
     # ── 5. Build chapters ─────────────────────────────────────────────────────
     chapters_txt = _find_chapters_txt(merge_dir)
@@ -298,7 +356,8 @@ def convert_book_native(book: "Audiobook") -> int:
         if use_filenames:
             tag_titles = None
         else:
-            tag_titles = [_ffprobe_title_tag(f) for f in src_files]
+            with metrics.span("convert.probe", book):
+                tag_titles = [_ffprobe_title_tag(f) for f in src_files]
 
         chapters = build_chapters_from_files(
             src_files, durations_ms, use_filenames=use_filenames, tag_titles=tag_titles
@@ -324,19 +383,7 @@ def convert_book_native(book: "Audiobook") -> int:
         sort_album=book.sortalbum or book.title or None,
     )
 
-    # ── 7. Concat all temp files ───────────────────────────────────────────────
-    concat_output = tmp_dir / "concat.mp4"
-
-    if len(tmp_files) == 1:
-        import shutil as _shutil
-
-        _shutil.copy2(tmp_files[0], concat_output)
-    else:
-        list_path = tmp_dir / "concat_list.txt"
-        _write_concat_list(tmp_files, list_path)
-        _concat_to_m4b(list_path, concat_output, debug=debug)
-
-    # ── 8. Resolve cover art ──────────────────────────────────────────────────
+    # ── 7. Resolve cover art ──────────────────────────────────────────────────
     cover: Optional[Path] = None
     if book.orig_file_type in ("m4a", "m4b") or not book.has_id3_cover:
         cover = book._merge_cover_art_file or (
@@ -347,14 +394,28 @@ def convert_book_native(book: "Audiobook") -> int:
         if cover and not cover.is_file():
             cover = None
 
-    # ── 9. Embed metadata + cover → build_file ────────────────────────────────
-    _embed_metadata_and_cover(
-        concat_output,
-        meta_path,
-        build_file,
-        cover=cover,
-        debug=debug,
-    )
+    if stream:
+        # ── 8. Concat + encode + embed metadata/cover → build_file, in one pass ───
+        with metrics.span("convert.stream_encode", book):
+            _stream_encode_to_m4b(
+                src_files,
+                tmp_dir / "concat_list.txt",
+                meta_path,
+                build_file,
+                cover=cover,
+                copy=should_copy,
+                codec=codec,
+                bitrate=bitrate,
+                samplerate=samplerate,
+                debug=debug,
+            )
+    else:
+        # ── 8. Concat temp files + embed metadata/cover → build_file ───────────
+        list_path = tmp_dir / "concat_list.txt"
+        _write_concat_list(tmp_files, list_path)
+        # metadata and cover are embedded in the same ffmpeg pass as the concat
+        with metrics.span("convert.concat", book):
+            _concat_to_m4b(list_path, meta_path, build_file, cover=cover, debug=debug)
 
     if not build_file.exists():
         raise RuntimeError(f"Conversion appeared to succeed but {build_file} was not created")
@@ -1,21 +1,24 @@
+import threading
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Literal, overload
 
-import cachetools.func
+import cachetools
 import ffmpeg
-from ffmpeg import probe as ffprobe
 
 from src.lib.books_tree import BooksTree
 from src.lib.config import AUDIO_EXTS
+from src.lib.ffprobe_utils import probeCache
 from src.lib.formatters import format_duration, get_nearest_standard_bitrate
 from src.lib.fs_utils import only_audio_files
 from src.lib.term import print_error, print_warning
-from src.lib.typing import DurationFmt, MEMO_TTL
+from src.lib.typing import DurationFmt
 
 
 def get_file_duration_py(file_path: Path) -> float:
     try:
-        return float(ffprobe(str(file_path))["format"]["duration"])
+        return float(probeCache.probe(file_path)["format"]["duration"])
     except ffmpeg.Error as e:
         from src.lib.logger import write_err_file
 
@@ -24,6 +27,54 @@ def get_file_duration_py(file_path: Path) -> float:
         return 0
 
 
+DurationKey = tuple[int, int, int, int]
+
+# Known durations by (st_dev, st_ino, size, mtime_ns), so that any change to a file invalidates its entry
+_file_durations: "cachetools.LRUCache[DurationKey, float]" = cachetools.LRUCache(maxsize=8192)
+_file_durations_lock = threading.Lock()
+
+
+def _duration_key(path: Path) -> DurationKey | None:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def remember_file_durations(files: Sequence[Path], durations: Sequence[float], *, copied_from: Sequence[Path] = ()):
+    """Records durations (in seconds) that were already measured elsewhere, e.g. by the native converter,
+    so `get_duration` doesn't have to probe those files again. If `files` are copies, `copied_from` are the
+    files they were copied from, which get the same durations as long as they are still the same size."""
+    with _file_durations_lock:
+        for f, d in zip(files, durations):
+            if d and (key := _duration_key(f)):
+                _file_durations[key] = d
+        for f, orig, d in zip(files, copied_from, durations):
+            if d and (key := _duration_key(orig)) and (copy_key := _duration_key(f)) and key[2] == copy_key[2]:
+                _file_durations[key] = d
+
+
+def get_file_durations(files: Sequence[Path]) -> list[float]:
+    """Durations (in seconds) of `files`, in order. Files whose duration isn't already known are probed in
+    parallel across cfg.CPU_CORES."""
+    from src.lib.config import cfg
+
+    keys = [_duration_key(f) for f in files]
+    with _file_durations_lock:
+        durations = [_file_durations.get(k) if k else None for k in keys]
+
+    if missing := [i for i, d in enumerate(durations) if d is None]:
+        workers = max(1, min(len(missing), cfg.CPU_CORES))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            probed = list(pool.map(get_file_duration_py, [files[i] for i in missing]))
+        remember_file_durations([files[i] for i in missing], probed)
+        for i, d in zip(missing, probed):
+            durations[i] = d
+
+    return [d or 0 for d in durations]
+
+
 @overload
 def get_duration(path: Path, fmt: Literal["seconds"] = "seconds") -> float: ...
 
@@ -42,16 +93,14 @@ def get_duration(path: Path, fmt: DurationFmt = "human") -> str | float:
         if path.suffix not in AUDIO_EXTS:
             raise ValueError(f"File {path} is not an audio file")
 
-        duration = get_file_duration_py(path)
+        duration = get_file_durations([path])[0]
 
     elif path.is_dir():
         files = only_audio_files(list(path.glob("**/*")))
         if not files:
             raise ValueError(f"No audio files found in {path}")
 
-        duration = 0
-        for file in files:
-            duration += get_file_duration_py(file)
+        duration = sum(get_file_durations(files))
 
     return format_duration(duration, fmt)
 
@@ -74,7 +123,6 @@ def is_variable_bitrate(file: "BooksTree | Path") -> bool:
     return abs(bitrate - nearest_std_bitrate) > 0.5
 
 
-@cachetools.func.ttl_cache(maxsize=128, ttl=MEMO_TTL)
 def get_bitrate_py(file: "BooksTree | Path") -> tuple[int, int]:
     """Returns the bitrate of an audio file in bits per second.
 
@@ -87,7 +135,7 @@ def get_bitrate_py(file: "BooksTree | Path") -> tuple[int, int]:
     """
     path = file.path if isinstance(file, BooksTree) else file
     try:
-        probe_result = ffmpeg.probe(str(path))
+        probe_result = probeCache.probe(path)
         actual_bitrate = int(probe_result["streams"][0]["bit_rate"])
         return get_nearest_standard_bitrate(actual_bitrate), actual_bitrate
     except ffmpeg.Error as e:
@@ -104,11 +152,10 @@ def get_bitrate_py(file: "BooksTree | Path") -> tuple[int, int]:
 #     return int(sample_rate)
 
 
-@cachetools.func.ttl_cache(maxsize=128, ttl=MEMO_TTL)
 def get_samplerate_py(file: "BooksTree | Path") -> int:
     path = file.path if isinstance(file, BooksTree) else file
     try:
-        probe_result = ffmpeg.probe(str(path))
+        probe_result = probeCache.probe(path)
         sample_rate = probe_result["streams"][0]["sample_rate"]
         return int(sample_rate)
     except ffmpeg.Error as e:
@@ -211,7 +258,7 @@ def shrink_mp3_to_size(file: Path, target_size: int) -> Path:
         in_stream = ffmpeg.input(str(file))
 
         # Check if there's a cover art stream and get its dimensions
-        probe = ffprobe(str(file))
+        probe = probeCache.probe(file)
         cover_stream = next((s for s in probe["streams"] if s.get("codec_type") == "video"), None)
 
         cover_adj = {
@@ -1,6 +1,10 @@
+import json
 import os
+import sqlite3
 import subprocess
 import sys
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from typing import Any, cast
 
@@ -84,6 +88,133 @@ def fix_ffprobe(counter: int = 0):
 
 FFProbeResult = dict[str, Any]
 
+PROBE_CACHE_MAXSIZE = 1024
+
+
+class ProbeCache:
+    """An LRU cache of full ffprobe results, keyed by (path, size, mtime) so that a file that changes is
+    probed again. Duration, bitrate, sample rate, tags and cover art all come from the same probe, so each
+    file only needs to be probed once no matter how many of those are asked for.
+
+    If `persist` is True, results are also kept in an SQLite db in cfg.META_DIR so they survive restarts. If it
+    is None (the default), cfg.USE_PROBE_CACHE decides."""
+
+    def __init__(self, maxsize: int = PROBE_CACHE_MAXSIZE, *, persist: bool | None = None):
+        self.maxsize = maxsize
+        self._persist = persist
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[tuple[str, int, int], FFProbeResult] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._cache)
+
+    @property
+    def persist(self) -> bool:
+        if self._persist is None:
+            from src.lib.config import cfg
+
+            return cfg.USE_PROBE_CACHE
+        return self._persist
+
+    @staticmethod
+    def _key(path: Path) -> tuple[str, int, int]:
+        st = path.stat()
+        return str(path), st.st_size, st.st_mtime_ns
+
+    def _connect(self) -> sqlite3.Connection:
+        from src.lib.config import cfg
+
+        conn = sqlite3.connect(str(cfg.META_DIR / "probe_cache.db"))
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS probe_cache (
+                path TEXT,
+                size INTEGER,
+                mtime_ns INTEGER,
+                result TEXT,
+                PRIMARY KEY (path)
+            )
+        """
+        )
+        return conn
+
+    def _load(self, key: tuple[str, int, int]) -> FFProbeResult | None:
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT result FROM probe_cache WHERE path = ? AND size = ? AND mtime_ns = ?", key
+                ).fetchone()
+            finally:
+                conn.close()
+            return json.loads(row[0]) if row else None
+        except (sqlite3.Error, json.JSONDecodeError) as e:
+            print_debug(f"Could not read probe cache: {e}")
+            return None
+
+    def _save(self, key: tuple[str, int, int], result: FFProbeResult):
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO probe_cache (path, size, mtime_ns, result) VALUES (?, ?, ?, ?)",
+                        (*key, json.dumps(result)),
+                    )
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print_debug(f"Could not write probe cache: {e}")
+
+    def _set(self, key: tuple[str, int, int], result: FFProbeResult):
+        with self._lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def probe(self, path: Path) -> FFProbeResult:
+        """Returns the ffprobe result for `path`, probing it only if it isn't cached or has changed since.
+        Raises the same errors as `ffmpeg.probe` (only successful probes are cached)."""
+        path = Path(path)
+        try:
+            key = self._key(path)
+        except OSError:
+            # Let ffprobe report the missing/unreadable file the way callers expect
+            return cast(FFProbeResult, ffmpeg.probe(str(path), cmd="ffprobe"))
+        with self._lock:
+            if (result := self._cache.get(key)) is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return result
+        if self.persist and (result := self._load(key)) is not None:
+            self.hits += 1
+            self._set(key, result)
+            return result
+
+        self.misses += 1
+        result = cast(FFProbeResult, ffmpeg.probe(str(path), cmd="ffprobe"))
+        self._set(key, result)
+        if self.persist:
+            self._save(key, result)
+        return result
+
+    def rm(self, path: Path):
+        with self._lock:
+            for key in [k for k in self._cache if k[0] == str(path)]:
+                del self._cache[key]
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits = self.misses = 0
+
+
+# Global cache instance
+probeCache = ProbeCache()
+
 
 def ffprobe_file(file: Path | None, *, options: dict[str, Any] | None = None, throw: bool = False):
     """Extract metadata from a file using ffprobe."""
@@ -99,7 +230,9 @@ def ffprobe_file(file: Path | None, *, options: dict[str, Any] | None = None, th
         raise FileNotFoundError(f"Error: Cannot extract id3 tag, '{file}' does not exist")
     try:
         options = options or {}
-        probe_result: dict[str, Any] = ffmpeg.probe(str(file), cmd="ffprobe", **options)
+        probe_result: dict[str, Any] = (
+            ffmpeg.probe(str(file), cmd="ffprobe", **options) if options else probeCache.probe(file)
+        )
     except Exception as e:
         from src.lib.logger import write_err_file
 
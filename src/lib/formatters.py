@@ -2,15 +2,17 @@ import re
 from collections.abc import Iterable
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, cast, Literal, overload
+from typing import Any, cast, Literal, overload, TYPE_CHECKING
 
 import cachetools.func
 import humanize
-import inflect
 
 from src.lib.books_tree import BooksTree
 from src.lib.typing import AudiobookFmt, DurationFmt, MEMO_TTL, STANDARD_BITRATES
 
+if TYPE_CHECKING:
+    import inflect
+
 
 def log_date() -> str:
     current_tz = datetime.now().astimezone().tzinfo
@@ -167,17 +169,20 @@ def human_elapsed_time(delta_or_time: datetime | float, relative: bool = True) -
     return humanize.naturaldelta(delta)
 
 
-def pluralize(count: int, singular: str | inflect.Word, plural: str | None = None) -> str:
-    p = inflect.engine()
+def pluralize(count: int, singular: "str | inflect.Word", plural: str | None = None) -> str:
     if count == 1:
         return str(singular)
     elif count == 0 or count > 1:
-        return p.plural(cast(inflect.Word, singular)) if plural is None else plural
+        if plural is not None:
+            return plural
+        from src.lib.nlp import nlpModels
+
+        return nlpModels.inflect.plural(cast("inflect.Word", singular))
     else:
         return f"{singular}(s)"
 
 
-def pluralize_with_count(count: int, singular: str | inflect.Word, plural: str | None = None) -> str:
+def pluralize_with_count(count: int, singular: "str | inflect.Word", plural: str | None = None) -> str:
     return f"{count} {pluralize(count, singular, plural)}"
 
 
@@ -23,6 +23,7 @@ from src.lib.term import (
 from src.lib.typing import (
     AudiobookFmt,
     BookHashesDict,
+    CloneMode,
     copy_kwargs_omit_first_arg,
     Operation,
     OVERWRITE_MODES,
@@ -33,8 +34,7 @@ from src.lib.typing import (
 
 if TYPE_CHECKING:
     from src.lib.books_tree import BooksTree
-
-    pass
+    from src.lib.inbox_snapshot import InboxSnapshot
 
 
 def filter_paths_by_depth(
@@ -163,14 +163,32 @@ def count_audio_files_in_dir(
 
 
 @overload
-def get_size(path: Path, fmt: Literal["bytes"] = "bytes", only_file_exts: list[str] = []) -> int: ...
+def get_size(
+    path: Path,
+    fmt: Literal["bytes"] = "bytes",
+    only_file_exts: list[str] = [],
+    *,
+    snapshot: "InboxSnapshot | None" = None,
+) -> int: ...
 
 
 @overload
-def get_size(path: Path, fmt: Literal["human"] = "human", only_file_exts: list[str] = []) -> str: ...
+def get_size(
+    path: Path,
+    fmt: Literal["human"] = "human",
+    only_file_exts: list[str] = [],
+    *,
+    snapshot: "InboxSnapshot | None" = None,
+) -> str: ...
 
 
-def get_size(path: Path, fmt: SizeFmt = "bytes", only_file_exts: list[str] = []) -> str | int:
+def get_size(
+    path: Path,
+    fmt: SizeFmt = "bytes",
+    only_file_exts: list[str] = [],
+    *,
+    snapshot: "InboxSnapshot | None" = None,
+) -> str | int:
     # takes a file or directory and returns the size in either bytes or human readable format, only counting audio files
     # if no path specified, assume current directory
     from src.lib.formatters import human_size
@@ -188,6 +206,8 @@ def get_size(path: Path, fmt: SizeFmt = "bytes", only_file_exts: list[str] = [])
         if not file_ext_ok(path):
             raise ValueError(f"File {path} is not an audio file")
         size = path.stat().st_size
+    elif snapshot is not None and snapshot.covers(path):
+        size = snapshot.get_size(path, only_file_exts=only_file_exts)
     elif path.is_dir():
         size = sum(f.stat().st_size for f in path.glob("**/*") if f.is_file() and file_ext_ok(f))
     return human_size(size) if fmt == "human" else size
@@ -200,15 +220,15 @@ def sizes_match(path1: Path, path2: Path) -> bool | None:
 
 
 @overload
-def get_audio_size(path: Path, fmt: Literal["bytes"] = "bytes") -> int: ...
+def get_audio_size(path: Path, fmt: Literal["bytes"] = "bytes", *, snapshot: "InboxSnapshot | None" = None) -> int: ...
 
 
 @overload
-def get_audio_size(path: Path, fmt: Literal["human"] = "human") -> str: ...
+def get_audio_size(path: Path, fmt: Literal["human"] = "human", *, snapshot: "InboxSnapshot | None" = None) -> str: ...
 
 
-def get_audio_size(path: Path, fmt: SizeFmt = "bytes"):
-    return get_size(path, fmt=fmt, only_file_exts=AUDIO_EXTS)
+def get_audio_size(path: Path, fmt: SizeFmt = "bytes", *, snapshot: "InboxSnapshot | None" = None):
+    return get_size(path, fmt=fmt, only_file_exts=AUDIO_EXTS, snapshot=snapshot)
 
 
 def is_ok_to_delete(
@@ -273,6 +293,49 @@ def src_and_dst_are_on_same_partition(src: Path, dst: Path) -> bool:
     return src.stat().st_dev == dst.stat().st_dev
 
 
+# ioctl request to clone a file's extents (Linux: btrfs, xfs, bcachefs...), from linux/fs.h
+FICLONE = 0x40049409
+
+
+def reflink_file(src: Path, dst: Path) -> bool:
+    """Makes `dst` a copy-on-write clone of `src`, which is instant and takes no extra space. Returns False
+    (and leaves no `dst` behind) if the platform or filesystem doesn't support it."""
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(src, "rb") as s, open(dst, "xb") as d:
+            try:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            except OSError:
+                d.close()
+                dst.unlink(missing_ok=True)
+                return False
+    except OSError:
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+
+def clone_file(src: Path, dst: Path, mode: CloneMode = "hardlink") -> Literal["reflink", "hardlink", "copy"]:
+    """Copies `src` to `dst` as cheaply as `mode` allows: a reflink if the filesystem supports it, then (if
+    mode is 'hardlink') a hardlink if both are on the same filesystem, and otherwise a regular copy. An
+    existing `dst` is replaced rather than written to, so a hardlinked `dst` never changes its source."""
+    if dst.exists() or dst.is_symlink():
+        dst.unlink()
+    if reflink_file(src, dst):
+        return "reflink"
+    if mode == "hardlink":
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+    return "copy"
+
+
 def rm_dir(dir_path: Path, ignore_errors: bool = False, even_if_not_empty: bool = False):
     # Remove the directory and handle errors
     if not dir_path.is_dir():
@@ -301,6 +364,7 @@ def _mv_or_cp_dir_contents(
     silent_files: list[str] = [],
     only_file_exts: list[str] = [],
     keep_src_dir: bool = False,
+    clone: CloneMode | None = None,
 ):
     """Moves or copies the contents of a source directory into a destination directory. For example:
 
@@ -316,6 +380,8 @@ def _mv_or_cp_dir_contents(
     If moving, and the source directory is empty after moving files, it will be removed.
 
     Default overwrite mode is 'skip', which will raise an error if the destination directory already exists, because we shouldn't ever be automatically overwriting an entire directory.
+
+    When copying, `clone` lets files be reflinked or hardlinked instead of copied where possible (see `clone_file`).
     """
     from src.lib.config import cfg
 
@@ -397,13 +463,16 @@ def _mv_or_cp_dir_contents(
                 overwrite_mode=overwrite_mode,
                 ignore_files=ignore_files,
                 only_file_exts=only_file_exts,
+                clone=clone,
             )
         else:
             dst_file = dst_dir / src_rel_path
             if str(src_rel_path) in files_common_to_both or sizes_match(src_file, dst_file):
                 continue
             if ok_to_mv_or_cp(src_file, dst_file):
-                if operation == "copy":
+                if operation == "copy" and clone:
+                    clone_file(src_file, dst_file, clone)
+                elif operation == "copy":
                     shutil.copy2(src_file, dst_file)
                 elif operation == "move":
                     shutil.move(src_file, dst_file)
@@ -448,6 +517,7 @@ def _mv_or_copy_dir(
     *,
     overwrite_mode: OverwriteMode = "skip",
     silent_files: list[str] = [],
+    clone: CloneMode | None = None,
 ):
     """Moves or copies the source directory *into* the destination directory. For example:
 
@@ -476,6 +546,7 @@ def _mv_or_copy_dir(
         dst_dir,
         overwrite_mode=overwrite_mode,
         silent_files=silent_files,
+        clone=clone,
     )
 
 
@@ -726,10 +797,15 @@ def find_too_small_files(a: Path, b: Path) -> list[Path]:
     ]
 
 
-def clean_dir(dir_path: Path) -> None:
+def clean_dir(dir_path: Path, keep: Iterable[Path] = ()) -> None:
+    """Empties `dir_path`, except for any paths in `keep` (and the dirs that contain them)."""
     dir_path = dir_path.resolve()
 
-    rm_dir(dir_path, ignore_errors=True, even_if_not_empty=True)
+    if keep := [k.resolve() for k in keep if k.exists() and k.resolve().is_relative_to(dir_path)]:
+        if dir_path not in keep:
+            _rm_all_except(dir_path, keep)
+    else:
+        rm_dir(dir_path, ignore_errors=True, even_if_not_empty=True)
 
     # Recreate the directory
     dir_path.mkdir(parents=True, exist_ok=True)
@@ -739,13 +815,27 @@ def clean_dir(dir_path: Path) -> None:
         raise PermissionError(f"'{dir_path}' is not writable by current user, please fix permissions and try again")
 
     # Check if the directory is empty
-    if any(filter_ignored(dir_path.iterdir())):
+    if not keep and any(filter_ignored(dir_path.iterdir())):
         raise OSError(f"'{dir_path}' is not empty, please empty it manually and try again")
 
 
-def clean_dirs(dirs: list[Path]) -> None:
+def _rm_all_except(dir_path: Path, keep: list[Path]) -> None:
+    for child in dir_path.iterdir():
+        if child in keep:
+            continue
+        if child.is_dir() and not child.is_symlink():
+            if any(k.is_relative_to(child) for k in keep):
+                _rm_all_except(child, keep)
+            else:
+                rm_dir(child, ignore_errors=True, even_if_not_empty=True)
+        else:
+            child.unlink(missing_ok=True)
+
+
+def clean_dirs(dirs: list[Path], keep: Iterable[Path] = ()) -> None:
+    keep = list(keep)
     for d in dirs:
-        clean_dir(d)
+        clean_dir(d, keep=keep)
 
 
 def rm_dirs(dirs: list[Path], ignore_errors: bool = False, even_if_not_empty: bool = True) -> None:
@@ -911,7 +1001,11 @@ def find_recently_modified_files_and_dirs(
     return recent_items
 
 
-def last_updated_at(path: Path, *, only_file_exts: list[str] = []) -> float:
+def last_updated_at(
+    path: Path, *, only_file_exts: list[str] = [], snapshot: "InboxSnapshot | None" = None
+) -> float:
+    if snapshot is not None and snapshot.covers(path):
+        return snapshot.last_updated_at(path, only_file_exts=only_file_exts)
     find_all_sorted_by_modified = find_recently_modified_files_and_dirs(
         path, -1, since=0, only_file_exts=only_file_exts
     )
@@ -919,8 +1013,8 @@ def last_updated_at(path: Path, *, only_file_exts: list[str] = []) -> float:
     return max(paths_m, default=try_get_stat_mtime(path))
 
 
-def last_updated_audio_files_at(path: Path) -> float:
-    return last_updated_at(path, only_file_exts=AUDIO_EXTS)
+def last_updated_audio_files_at(path: Path, *, snapshot: "InboxSnapshot | None" = None) -> float:
+    return last_updated_at(path, only_file_exts=AUDIO_EXTS, snapshot=snapshot)
 
 
 @overload
@@ -970,11 +1064,21 @@ def inbox_was_recently_modified(within_seconds: float = 0) -> bool:
     return was_recently_modified(cfg.inbox_dir, within_seconds=within_seconds, only_file_exts=cfg.AUDIO_EXTS)
 
 
-def hash_path(path: Path, *, only_file_exts: list[str] = [], debug: bool = False, n: int = 8) -> str:
+def hash_path(
+    path: Path,
+    *,
+    only_file_exts: list[str] = [],
+    debug: bool = False,
+    n: int = 8,
+    snapshot: "InboxSnapshot | None" = None,
+) -> str:
     """Makes a has of the dir's contents of filenames and file sizes in an array, sorted by filename
-    then hashes the array"""
+    then hashes the array. If a `snapshot` covering `path` is given, it is read instead of walking the dir."""
     import hashlib
 
+    if snapshot is not None and snapshot.covers(path):
+        return snapshot.hash_path(path, only_file_exts=only_file_exts, debug=debug, n=n)
+
     def make_hashable(f: Path) -> str:
         if any(
             [
@@ -999,10 +1103,10 @@ def hash_path(path: Path, *, only_file_exts: list[str] = [], debug: bool = False
     return hash_raw(*files)
 
 
-def hash_path_audio_files(path: Path, *, debug: bool = False) -> str:
+def hash_path_audio_files(path: Path, *, debug: bool = False, snapshot: "InboxSnapshot | None" = None) -> str:
     """Makes a hash of the path's audio files' filenames and file sizes in an array, sorted by filename
     then hashes the array"""
-    return hash_path(path, only_file_exts=AUDIO_EXTS, debug=debug)
+    return hash_path(path, only_file_exts=AUDIO_EXTS, debug=debug, snapshot=snapshot)
 
 
 def hash_entire_inbox():
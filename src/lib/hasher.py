@@ -1,17 +1,22 @@
 import threading
 import time
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 from src.lib.formatters import human_elapsed_time
 from src.lib.fs_utils import hash_path_audio_files, last_updated_audio_files_at
 
+if TYPE_CHECKING:
+    from src.lib.inbox_snapshot import InboxSnapshot
+
 
 class Hasher:
     """Stores the current, and previous 5 hashes of a given path as a tuple. When a new hash is added, the oldest one is removed, and the rest are shifted down by one. If a hash is the same as the previous one, it is not added - only the timestamp on the current hash is updated. This is used to determine if a file has changed in the last 5 seconds."""
 
-    def __init__(self, path: Path, max_hashes: int = 10):
+    def __init__(self, path: Path, max_hashes: int = 10, snapshot: "InboxSnapshot | None" = None):
         self.path = path
         self.max_hashes = max_hashes
+        self.snapshot = snapshot
         self._hashes = []
         self._last_run_start = None
         self._last_run_end = None
@@ -24,12 +29,18 @@ class Hasher:
     def __eq__(self, other):
         return self.path == other.path
 
+    @property
+    def _fresh_snapshot(self):
+        return self.snapshot.for_path(self.path) if self.snapshot is not None else None
+
     @property
     def last_updated(self):
-        return last_updated_audio_files_at(self.path)
+        return last_updated_audio_files_at(self.path, snapshot=self._fresh_snapshot)
 
     def scan(self):
         with threading.Lock():
+            if self.snapshot is not None:
+                self.snapshot.refresh()
             new_hash = self.next_hash
             if new_hash != self.curr_hash:
                 self._hashes.insert(0, (new_hash, time.time()))
@@ -78,7 +89,7 @@ class Hasher:
 
     @property
     def next_hash(self):
-        return hash_path_audio_files(self.path)
+        return hash_path_audio_files(self.path, snapshot=self._fresh_snapshot)
 
     @property
     def last_run_start_hash(self):
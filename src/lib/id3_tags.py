@@ -1,9 +1,14 @@
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Any, cast, Literal, Optional, TYPE_CHECKING, Union
 
 import bidict
+import mutagen
+from mutagen.id3 import ID3
 from mutagen.mp3 import HeaderNotFoundError
+from mutagen.mp4 import MP4Tags
 from pydantic import BaseModel, computed_field, Field, field_validator
 
 from src.lib.ffprobe_utils import ffprobe_file
@@ -16,6 +21,9 @@ if TYPE_CHECKING:
 
 ID3_TAGS_CACHE_TTL = 300
 
+# Upper bound on concurrent ffprobe processes when reading tags for files mutagen can't handle
+MAX_FFPROBE_WORKERS = 8
+
 
 class Id3Cache:
     """A simple cache for ID3 tags."""
@@ -66,11 +74,117 @@ def id3_tags_raw_to_source(in_dict: dict[str, str]) -> dict["TagSource | Additio
 # Global cache instance
 id3Cache = Id3Cache()
 
+MUTAGEN_EXTS = [".mp3", ".m4a", ".m4b", ".mp4", ".ogg", ".oga", ".opus", ".flac"]
+
+# How ffprobe names the tags that mutagen exposes by frame/atom/field name, so both paths produce the same keys
+ID3_FRAMES_TO_FFPROBE = {
+    "TIT1": "grouping",
+    "TIT2": "title",
+    "TPE1": "artist",
+    "TPE2": "album_artist",
+    "TPE3": "performer",
+    "TALB": "album",
+    "TCON": "genre",
+    "TDRC": "date",
+    "TYER": "date",
+    "TRCK": "track",
+    "TPOS": "disc",
+    "TCOM": "composer",
+    "TCOP": "copyright",
+    "TENC": "encoded_by",
+    "TSSE": "encoder",
+    "TPUB": "publisher",
+    "TLAN": "language",
+    "TSOA": "album-sort",
+    "TSOP": "artist-sort",
+    "TSOT": "title-sort",
+}
+
+MP4_ATOMS_TO_FFPROBE = {
+    "©nam": "title",
+    "©ART": "artist",
+    "aART": "album_artist",
+    "©alb": "album",
+    "©gen": "genre",
+    "©day": "date",
+    "©wrt": "composer",
+    "©cmt": "comment",
+    "©too": "encoder",
+    "©grp": "grouping",
+    "©lyr": "lyrics",
+    "desc": "description",
+    "ldes": "synopsis",
+    "cprt": "copyright",
+    "tvsh": "show",
+    "sonm": "sort_name",
+    "soar": "sort_artist",
+    "soal": "sort_album",
+    "soaa": "sort_album_artist",
+    "soco": "sort_composer",
+}
+
+VORBIS_FIELDS_TO_FFPROBE = {
+    "albumartist": "album_artist",
+    "tracknumber": "track",
+    "discnumber": "disc",
+    "description": "comment",
+}
+
+
+def _mp4_num_pair(v: Any) -> str:
+    num, total = v if isinstance(v, tuple) else (v, 0)
+    return f"{num}/{total}" if total else str(num)
+
+
+def read_tags_mutagen(path: Path) -> dict[str, str] | None:
+    """Reads a file's tags in-process with mutagen, keyed the same way ffprobe would report them (lowercase).
+    Returns None if mutagen can't read the file, in which case the caller should fall back to ffprobe."""
+    if path.suffix.lower() not in MUTAGEN_EXTS:
+        return None
+    try:
+        f = mutagen.File(path)
+    except Exception:
+        return None
+    if f is None:
+        return None
+    if f.tags is None:
+        return {}
+
+    raw: dict[str, list[str]] = {}
+    if isinstance(f.tags, ID3):
+        for frame in f.tags.values():
+            if frame.FrameID == "TXXX":
+                key = frame.desc
+            elif frame.FrameID == "COMM":
+                key = "comment"
+            elif frame.FrameID.startswith("T"):
+                key = ID3_FRAMES_TO_FFPROBE.get(frame.FrameID, frame.FrameID)
+            else:
+                continue
+            raw.setdefault(key, []).extend(str(t) for t in frame.text)
+    elif isinstance(f.tags, MP4Tags):
+        for atom, values in f.tags.items():
+            if atom in ("trkn", "disk"):
+                raw["track" if atom == "trkn" else "disc"] = [_mp4_num_pair(v) for v in values[:1]]
+            elif atom.startswith("----:"):
+                raw[atom.rsplit(":", 1)[-1]] = [v.decode(errors="replace") for v in values]
+            elif key := MP4_ATOMS_TO_FFPROBE.get(atom):
+                raw[key] = [str(v) for v in values]
+    elif hasattr(f.tags, "as_dict"):  # Vorbis comments (ogg, opus, flac)
+        for field, values in f.tags.as_dict().items():
+            raw[VORBIS_FIELDS_TO_FFPROBE.get(field.lower(), field)] = values
+    else:
+        return None
+
+    return {k.lower(): ";".join(v) for k, v in raw.items() if any(v)}
 
-def extract_id3_tags(file: "BooksTree | Path", *tags: "TagSource | AdditionalTags", throw=False) -> Id3TagDict:
+
+def extract_id3_tags(
+    file: "BooksTree | Path", *tags: "TagSource | AdditionalTags", throw=False, use_mutagen: bool = True
+) -> Id3TagDict:
     from src.lib.books_tree.books_tree import BooksTree
 
-    """Extract ID3 tags from a file."""
+    """Extract ID3 tags from a file, with mutagen if it can read the file, otherwise with ffprobe."""
     path = file.path if isinstance(file, BooksTree) else Path(file) if file else None
 
     if not path or not path.is_file():
@@ -79,13 +193,16 @@ def extract_id3_tags(file: "BooksTree | Path", *tags: "TagSource | AdditionalTag
         return {}
 
     try:
-        if ffresult := cast(dict[str, Any], ffprobe_file(path, throw=throw)):
-            tag_dict = id3_tags_raw_to_source(
-                {key.lower(): value for key, value in (ffresult["format"]["tags"] or {}).items()}
-            )
+        raw = read_tags_mutagen(path) if use_mutagen else None
+        if raw is None and (ffresult := cast(dict[str, Any], ffprobe_file(path, throw=throw))):
+            raw = {key.lower(): value for key, value in (ffresult["format"]["tags"] or {}).items()}
+        if raw:
+            tag_dict = id3_tags_raw_to_source(raw)
             if not tags:
                 return cast(Id3TagDict, tag_dict)
             return cast(Id3TagDict, {tag: tag_dict.get(tag, "") for tag in tags})
+        if raw is not None and throw:
+            raise HeaderNotFoundError(f"Error: No id3 tags found in {path}")
     except Exception as e:
         if throw:
             raise HeaderNotFoundError(
@@ -222,7 +339,12 @@ class Id3Tags(BaseModel):
 
     @classmethod
     def from_file(
-        cls, file: Path, *tags: TagSource | AdditionalTags, throw: bool = False, no_cache: bool = False
+        cls,
+        file: Path,
+        *tags: TagSource | AdditionalTags,
+        throw: bool = False,
+        no_cache: bool = False,
+        use_mutagen: bool = True,
     ) -> "Id3Tags | None":
         """Extract ID3 tags from a file, using cache if available and not expired."""
 
@@ -244,7 +366,7 @@ class Id3Tags(BaseModel):
 
         # Try to extract tags
         try:
-            extracted_tags = extract_id3_tags(file, *tags, throw=throw)
+            extracted_tags = extract_id3_tags(file, *tags, throw=throw, use_mutagen=use_mutagen)
             if not extracted_tags:
                 id3Cache.set(cache_key, "__BAD__")
                 return cls(updated=current_time, BAD=True)
@@ -258,6 +380,32 @@ class Id3Tags(BaseModel):
                 ) from e
             return cls(updated=current_time, BAD=True)
 
+    @classmethod
+    def from_files(
+        cls, files: Iterable[Path], *, no_cache: bool = False, max_workers: int | None = None
+    ) -> dict[Path, "Id3Tags | None"]:
+        """Extract ID3 tags from many files at once. Tags are read in-process with mutagen where possible, and
+        the files it can't read fall back to ffprobe, run in a bounded thread pool instead of one at a time."""
+        from src.lib.config import cfg
+
+        results: dict[Path, Id3Tags | None] = {}
+        fallback: list[Path] = []
+        for f in files:
+            if (not no_cache and id3Cache.get(str(f)) is not None) or not f.is_file():
+                results[f] = cls.from_file(f)
+            elif (raw := read_tags_mutagen(f)) is not None:
+                id3Cache.set(str(f), cast(CacheValue, id3_tags_raw_to_source(raw)) if raw else "__BAD__")
+                results[f] = cls.from_file(f)
+            else:
+                fallback.append(f)
+
+        if fallback:
+            workers = max_workers or max(1, min(len(fallback), cfg.CPU_CORES, MAX_FFPROBE_WORKERS))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                probed = pool.map(lambda f: cls.from_file(f, no_cache=True, use_mutagen=False), fallback)
+                results.update(zip(fallback, probed))
+        return results
+
     @classmethod
     def clear_cache(cls) -> None:
         """Clear the global ID3 tags cache."""
@@ -2,7 +2,7 @@ import datetime
 import re
 import shutil
 import subprocess
-import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, cast, Literal, NamedTuple, overload, TYPE_CHECKING, Union
 
@@ -17,6 +17,7 @@ from lib.ol_lookup import open_library_lookup_author, open_library_lookup_title
 from src.lib.books_tree import BooksTree
 from src.lib.cleaners import strip_leading_articles
 from src.lib.fs_utils import find_first_audio_file
+from src.lib.metrics import metrics
 from src.lib.misc import compare_trim
 from src.lib.parsers import (
     get_year_from_date,
@@ -236,6 +237,7 @@ def write_mp3_tags(
         raise HeaderNotFoundError(f"Error: Could not load '{file}' for tagging, it may be corrupt or not an audio file")
 
 
+@metrics.timed("verify_id3_tags")
 def verify_and_update_id3_tags(book: "Audiobook", *, in_dir: Literal["build", "converted"]) -> None:
     # takes the inbound book, then checks the converted file and verifies that the id3 tags match the extracted metadata
     # if they do not match, it will print a notice and update the id3 tags
@@ -267,12 +269,18 @@ def verify_and_update_id3_tags(book: "Audiobook", *, in_dir: Literal["build", "c
     new_tags.pop("track_num", None)
     new_tags.pop("disc_num", None)
 
-    ol_author_candidates = [
-        (open_library_lookup_author(book.author, method="score"), "author"),
-        (open_library_lookup_author(book.author, method="similarity"), "author"),
-        (open_library_lookup_author(book.narrator, method="similarity"), "narrator"),
-    ]
-    ol_title = open_library_lookup_title(book.title, author=book.author, narrator=book.narrator, method="similarity")
+    # Look up the author, narrator and title at the same time - identical requests are only made once
+    with metrics.span("ol_lookup", book), ThreadPoolExecutor(max_workers=4) as pool:
+        author_futures = [
+            (pool.submit(open_library_lookup_author, book.author, method="score"), "author"),
+            (pool.submit(open_library_lookup_author, book.author, method="similarity"), "author"),
+            (pool.submit(open_library_lookup_author, book.narrator, method="similarity"), "narrator"),
+        ]
+        title_future = pool.submit(
+            open_library_lookup_title, book.title, author=book.author, narrator=book.narrator, method="similarity"
+        )
+        ol_author_candidates = [(f.result(), prop) for f, prop in author_futures]
+        ol_title = title_future.result()
     ol_author, author_prop = next(
         (
             c
@@ -645,6 +653,7 @@ def custom_sort(key: str, next_key: str) -> int:
     return -1 if key < next_key else int(key > next_key)
 
 
+@metrics.timed("extract_metadata")
 def extract_metadata(book: "Audiobook", console: bool = False) -> "Audiobook":
 
     from src.lib.id3_tags import Id3Tags
@@ -655,7 +664,6 @@ def extract_metadata(book: "Audiobook", console: bool = False) -> "Audiobook":
             highlight_color=PATH_COLOR,
         )
 
-    t1 = time.time()
     li = print_list_item if console else lambda *_: None
 
     # read id3 tags of audio file
@@ -664,8 +672,6 @@ def extract_metadata(book: "Audiobook", console: bool = False) -> "Audiobook":
         book.sample_audio2 or book.sample_audio1  # if only one audio file, fall back to the same file
     )
 
-    t2 = time.time()
-
     for tag, value in ((s := sample_audio1_tags) and s.to_dict() or {}).items():
         if hasattr(book, f"id3_{tag}"):
             setattr(book, f"id3_{tag}", value)
@@ -676,7 +682,6 @@ def extract_metadata(book: "Audiobook", console: bool = False) -> "Audiobook":
 
     id3_score = MetadataScore(book, sample_audio2_tags)  # type: ignore
 
-    t3 = time.time()
     book.title = id3_score.determine_title(fallback=book.fs_title)
     book.album = book.title
     book.sortalbum = strip_leading_articles(book.title)
@@ -685,8 +690,6 @@ def extract_metadata(book: "Audiobook", console: bool = False) -> "Audiobook":
     book.narrator = id3_score.determine_narrator(fallback=book.fs_narrator)
     book.albumartist = id3_score.determine_albumartist(fallback=book.fs_author)
 
-    t4 = time.time()
-
     li(f"Title: {book.title}")
     li(f"Author: {book.artist}")
     if book.narrator:
@@ -714,16 +717,6 @@ def extract_metadata(book: "Audiobook", console: bool = False) -> "Audiobook":
     if not book.has_id3_cover:
         li(f"No cover art")
 
-    t5 = time.time()
-
-    _all_times = {
-        "get_files_and_extract_id3_tags": t2 - t1,
-        "metadata_score": t3 - t2,
-        "author_narrator": t4 - t3,
-        "end": t5 - t4,
-        "total": t5 - t1,
-    }
-
     return book
 
 
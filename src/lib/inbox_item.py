@@ -1,7 +1,7 @@
 import time
 from functools import cached_property
 from pathlib import Path
-from typing import cast, Literal
+from typing import cast, Literal, TYPE_CHECKING
 
 from src.lib.audiobook import Audiobook
 from src.lib.books_tree import BooksTree
@@ -13,6 +13,9 @@ from src.lib.fs_utils import (
 )
 from src.lib.typing import DirName
 
+if TYPE_CHECKING:
+    from src.lib.inbox_snapshot import InboxSnapshot
+
 InboxItemStatus = Literal["new", "ok", "needs_retry", "failed", "gone"]
 
 
@@ -67,17 +70,18 @@ def get_item(key_path_or_book: "str | Path | Audiobook | InboxItem") -> "InboxIt
 
 class InboxItem:
 
-    def __init__(self, tree: BooksTree):
+    def __init__(self, tree: BooksTree, *, snapshot: "InboxSnapshot | None" = None):
         self.tree = tree
+        self.snapshot = snapshot
 
         self.is_dir = self.tree.path.is_dir()
         self.is_file = self.tree.path.is_file()
 
         self._prev_hash = None
         self._last_updated: float | None = None
-        self._curr_hash = hash_path_audio_files(self.tree.path)
+        self._curr_hash = hash_path_audio_files(self.tree.path, snapshot=snapshot)
         self._hash_changed: float = time.time()
-        self.size = get_audio_size(self.tree.path) if self.tree.path.exists() else 0
+        self.size = get_audio_size(self.tree.path, snapshot=snapshot) if self.tree.path.exists() else 0
         self.status: InboxItemStatus = "new"
         self.failed_reason: str = ""
 
@@ -98,7 +102,7 @@ class InboxItem:
         return self.key.__hash__()
 
     def reload(self):
-        self = InboxItem(self.tree)
+        self = InboxItem(self.tree, snapshot=self.snapshot)
 
     def update_path(self, path: Path):
         self.tree.path = path
@@ -126,13 +130,17 @@ class InboxItem:
         if self.is_gone:
             self._hash_changed = time.time()
             return ""
-        new_hash = hash_path_audio_files(self.path)
+        new_hash = hash_path_audio_files(self.path, snapshot=self._fresh_snapshot)
         if new_hash != self._curr_hash:
             self._prev_hash = self._curr_hash
             self._curr_hash = new_hash
             self._hash_changed = time.time()
         return self._curr_hash
 
+    @property
+    def _fresh_snapshot(self):
+        return self.snapshot.for_path(self.path) if self.snapshot is not None else None
+
     @property
     def prev_hash(self):
         return self._prev_hash
@@ -141,7 +149,7 @@ class InboxItem:
     def last_updated(self):
         if self._last_updated is not None:
             return self._last_updated
-        return last_updated_audio_files_at(self.path)
+        return last_updated_audio_files_at(self.path, snapshot=self._fresh_snapshot)
 
     @property
     def hash_changed(self):
@@ -273,7 +281,7 @@ class InboxItem:
 
     @property
     def did_change(self) -> bool:
-        return True if self.is_gone else hash_path_audio_files(self.path) != self._curr_hash
+        return True if self.is_gone else hash_path_audio_files(self.path, snapshot=self._fresh_snapshot) != self._curr_hash
 
     @property
     def type(self) -> Literal["dir", "file", "gone"]:
@@ -0,0 +1,231 @@
+import fnmatch
+import hashlib
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Self
+
+from src.lib.misc import isorted, sh
+
+IS_DIR = 1
+IS_IGNORED = 2
+IS_FILE = 4
+
+
+class InboxSnapshot:
+    """A point-in-time listing of every file and dir under `root`, taken with a single `os.scandir` walk.
+
+    Entries are stored column-wise (relative path, size, mtime, flags) and kept sorted by relative path, so
+    everything under a given subdir is a contiguous slice that can be found with a binary search. This lets
+    hashing, last-modified checks, size totals and the BooksTree builder all share one walk of the inbox
+    instead of each doing its own `rglob` + `stat()` per entry."""
+
+    def __init__(self, root: Path, *, max_age: float = 1.0):
+        self.root = Path(root)
+        self.max_age = max_age
+        self.taken_at: float = 0
+        self._root_mtime: float = 0
+        self._paths: list[str] = []
+        self._sizes = array("q")
+        self._mtimes = array("d")
+        self._flags = bytearray()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"InboxSnapshot({self.root} -- {len(self)} entries -- {round(self.age, 2)}s old)"
+
+    def __len__(self):
+        return len(self._paths)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.taken_at if self.taken_at else float("inf")
+
+    def refresh(self) -> Self:
+        """Walks `root` once and replaces the snapshot's contents."""
+        from src.lib.config import cfg
+
+        ignore_patterns = cfg.IGNORE_FILES
+        rows: list[tuple[str, int, float, int]] = []
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            try:
+                with os.scandir(os.path.join(self.root, rel_dir) if rel_dir else self.root) as it:
+                    entries = list(it)
+            except (FileNotFoundError, NotADirectoryError, PermissionError):
+                continue
+            for entry in entries:
+                rel = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                try:
+                    st = entry.stat()
+                    is_dir = entry.is_dir()
+                except OSError:
+                    continue
+                flags = IS_DIR if is_dir else IS_FILE if entry.is_file() else 0
+                if any(fnmatch.fnmatch(entry.name, ignore) for ignore in ignore_patterns):
+                    flags |= IS_IGNORED
+                rows.append((rel, st.st_size, st.st_mtime, flags))
+                # Don't descend into symlinked dirs, same as Path.rglob
+                if is_dir and not entry.is_symlink():
+                    stack.append(rel)
+
+        rows.sort(key=lambda r: r[0])
+        try:
+            root_mtime = self.root.stat().st_mtime
+        except OSError:
+            root_mtime = 0
+
+        with self._lock:
+            self._paths = [r[0] for r in rows]
+            self._sizes = array("q", (r[1] for r in rows))
+            self._mtimes = array("d", (r[2] for r in rows))
+            self._flags = bytearray(r[3] for r in rows)
+            self._root_mtime = root_mtime
+            self.taken_at = time.time()
+        return self
+
+    def fresh(self, max_age: float | None = None) -> Self:
+        """Returns this snapshot, refreshing it first if it is older than `max_age` seconds."""
+        if self.age > (self.max_age if max_age is None else max_age):
+            self.refresh()
+        return self
+
+    def for_path(self, path: Path, max_age: float | None = None) -> Self | None:
+        """This snapshot, to read `path` from, if it is no older than `max_age` seconds. A stale snapshot is only
+        refreshed for the root itself, which costs the same as walking it. For anything under the root, None is
+        returned so the caller walks just that subtree instead of the whole inbox."""
+        if self.age <= (self.max_age if max_age is None else max_age):
+            return self
+        if self._rel(path) == "":
+            return self.refresh()
+        return None
+
+    def _rel(self, path: Path) -> str | None:
+        try:
+            rel = str(Path(path).relative_to(self.root))
+        except ValueError:
+            return None
+        return "" if rel == "." else rel
+
+    def _index_of(self, rel: str) -> int | None:
+        i = bisect_left(self._paths, rel)
+        return i if i < len(self._paths) and self._paths[i] == rel else None
+
+    def _range(self, rel: str) -> range:
+        """The slice of entries that are descendants of `rel` (excluding `rel` itself)."""
+        if not rel:
+            return range(len(self._paths))
+        prefix = rel + os.sep
+        # Everything that starts with 'a/b/' sorts at or after 'a/b/' and before 'a/b0'
+        upper = rel + chr(ord(os.sep) + 1)
+        return range(bisect_left(self._paths, prefix), bisect_left(self._paths, upper))
+
+    def covers(self, path: Path) -> bool:
+        """True if `path` is the root or a dir inside it that was present when the snapshot was taken."""
+        if not self.taken_at or (rel := self._rel(path)) is None:
+            return False
+        if not rel:
+            return True
+        i = self._index_of(rel)
+        return i is not None and bool(self._flags[i] & IS_DIR)
+
+    def is_dir(self, path: Path) -> bool | None:
+        if (rel := self._rel(path)) is None:
+            return None
+        if not rel:
+            return True
+        return None if (i := self._index_of(rel)) is None else bool(self._flags[i] & IS_DIR)
+
+    def is_file(self, path: Path) -> bool | None:
+        if (rel := self._rel(path)) is None or not rel:
+            return None if rel is None else False
+        return None if (i := self._index_of(rel)) is None else bool(self._flags[i] & IS_FILE)
+
+    def _iter(self, path: Path, *, include_ignored: bool = True) -> Iterator[int]:
+        if (rel := self._rel(path)) is None:
+            return
+        for i in self._range(rel):
+            if include_ignored or not self._flags[i] & IS_IGNORED:
+                yield i
+
+    def paths(self, path: Path | None = None, *, include_ignored: bool = True) -> list[Path]:
+        """All files and dirs under `path` (default: root), like `path.rglob("*")`."""
+        return [self.root / self._paths[i] for i in self._iter(path or self.root, include_ignored=include_ignored)]
+
+    def dirs(self, path: Path | None = None) -> list[Path]:
+        return [self.root / self._paths[i] for i in self._iter(path or self.root) if self._flags[i] & IS_DIR]
+
+    def files(
+        self, path: Path | None = None, *, only_file_exts: list[str] = [], include_ignored: bool = True
+    ) -> list[Path]:
+        return [
+            self.root / self._paths[i]
+            for i in self._iter(path or self.root, include_ignored=include_ignored)
+            if self._flags[i] & IS_FILE
+            and (not only_file_exts or os.path.splitext(self._paths[i])[1] in only_file_exts)
+        ]
+
+    def get_size(self, path: Path, *, only_file_exts: list[str] = []) -> int:
+        """Total size of all files under `path`, equivalent to `fs_utils.get_size` for a dir."""
+        return sum(
+            self._sizes[i]
+            for i in self._iter(path)
+            if self._flags[i] & IS_FILE
+            and (not only_file_exts or os.path.splitext(self._paths[i])[1] in only_file_exts)
+        )
+
+    def last_updated_at(self, path: Path, *, only_file_exts: list[str] = []) -> float:
+        """Most recent mtime of any dir, or matching file, under `path`; equivalent to `fs_utils.last_updated_at`."""
+        mtimes = [
+            self._mtimes[i]
+            for i in self._iter(path, include_ignored=False)
+            if not only_file_exts
+            or not self._flags[i] & IS_FILE
+            or os.path.splitext(self._paths[i])[1] in only_file_exts
+        ]
+        if mtimes:
+            return max(mtimes)
+        if (rel := self._rel(path)) == "":
+            return self._root_mtime
+        return 0 if rel is None or (i := self._index_of(rel)) is None else self._mtimes[i]
+
+    def fingerprints(self) -> dict[str, str]:
+        """A fingerprint for each top-level entry under `root` that changes whenever the entry, or anything
+        under it, is added, removed, resized or touched. Used to work out which books need rescanning, and
+        stable across runs so it can be persisted (see `ScanCache`)."""
+        fps: dict[str, str] = {}
+        for i, p in enumerate(self._paths):
+            if os.sep in p:
+                continue
+            r = self._range(p)
+            h = hashlib.blake2b(digest_size=8)
+            h.update(f"{self._sizes[i]}|{self._mtimes[i]}|{self._flags[i]}".encode())
+            h.update("\0".join(self._paths[r.start : r.stop]).encode(errors="surrogateescape"))
+            h.update(self._sizes[r.start : r.stop].tobytes())
+            h.update(self._mtimes[r.start : r.stop].tobytes())
+            h.update(self._flags[r.start : r.stop])
+            fps[p] = h.hexdigest()
+        return fps
+
+    def hash_path(self, path: Path, *, only_file_exts: list[str] = [], debug: bool = False, n: int = 8) -> str:
+        """Same hash as `fs_utils.hash_path` for a dir, computed from the snapshot instead of the filesystem."""
+        rel = self._rel(path) or ""
+        strip = len(rel) + 1 if rel else 0
+        files = isorted(
+            [
+                f"{self._paths[i][strip:]}|{self._sizes[i]}"
+                for i in self._iter(path, include_ignored=False)
+                if self._flags[i] & IS_FILE
+                and not os.path.basename(self._paths[i]).startswith(".")
+                and (not only_file_exts or os.path.splitext(self._paths[i])[1] in only_file_exts)
+            ]
+        )
+        if debug:
+            return files  # type: ignore
+        _s = files[0] if len(files) == 1 else ":".join(files)
+        return sh(hashlib.md5(_s.encode()).hexdigest(), n)
@@ -1,6 +1,7 @@
 import json
 import os
 import re
+import threading
 import time
 from collections.abc import Callable
 from functools import wraps
@@ -14,7 +15,12 @@ from src.lib.formatters import friendly_short_date
 from src.lib.fs_utils import find_root_from_path, try_relative_to
 from src.lib.hasher import Hasher
 from src.lib.inbox_item import get_item, get_key, InboxItem, InboxItemStatus
+from src.lib.inbox_snapshot import InboxSnapshot
+from src.lib.inbox_watcher import get_inbox_watcher, InboxWatcher, top_level_names
+from src.lib.metrics import metrics
 from src.lib.misc import any_in
+from src.lib.profiling import profiled_calls
+from src.lib.scan_cache import ScanCache
 from src.lib.strings import en
 from src.lib.term import print_debug, print_notice
 
@@ -57,6 +63,19 @@ def requires_scan(func: Callable[..., R]):
     return wrapper
 
 
+def synchronized(func: Callable[..., R]):
+    """A decorator that holds the InboxState's lock while calling the decorated function, so that book workers
+    running in parallel (see PARALLEL_BOOKS and PIPELINE_BOOKS) can't change the items while another thread is
+    changing or iterating them."""
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with cast(InboxState, args[0])._lock:
+            return cast(R, func(*args, **kwargs))
+
+    return wrapper
+
+
 class InboxStateError(Exception):
     pass
 
@@ -67,7 +86,8 @@ class InboxState(Hasher):
     def __init__(self):
         from src.lib.config import cfg
 
-        super().__init__(cfg.inbox_dir)
+        self._lock = threading.RLock()
+        super().__init__(cfg.inbox_dir, snapshot=InboxSnapshot(cfg.inbox_dir))
         self._items: dict[str, InboxItem] = {}
         self.ready = False
         self.loop_counter = 0
@@ -75,8 +95,14 @@ class InboxState(Hasher):
         # print_debug("Set banner_printed to False")
         self._last_scan = 0
         self.tree: BooksTree = None  # type: ignore
+        self.watcher: InboxWatcher | None = None
+        # Top-level inbox names that changed since the last scan, or None if unknown (i.e., assume everything)
+        self._dirty: set[str] | None = None
+        self._fingerprints: dict[str, str] = {}
+        self.scan_cache = ScanCache(cfg.inbox_dir) if cfg.USE_SCAN_CACHE else None
         self.scan()
 
+    @synchronized
     def set(
         self,
         key_path_or_book: str | Path | Audiobook | InboxItem,
@@ -97,6 +123,7 @@ class InboxState(Hasher):
         return self._get(key_path_or_book)
 
     @requires_scan
+    @synchronized
     def get_like(self, key_or_expr: str | Path | BooksTree | Audiobook):
         return [v for k, v in self._items.items() if re.search(str(key_or_expr), k, re.I)]
 
@@ -106,6 +133,7 @@ class InboxState(Hasher):
             raise ValueError("You must pass a list of keys to .get_many()")
         return [(k, self._get(k)) for k in keys_paths_or_books]
 
+    @synchronized
     def _get(self, key_path_hash_or_book: str | Path | BooksTree | Audiobook | None) -> InboxItem | None:
         if not key_path_hash_or_book:
             return None
@@ -131,6 +159,7 @@ class InboxState(Hasher):
             None,
         )
 
+    @synchronized
     def rm(self, key_path_book_or_hash: str | Path | Audiobook):
         key = get_key(key_path_book_or_hash)
         if key or (item := self.get(str(key_path_book_or_hash))) and (key := item.key):
@@ -139,6 +168,9 @@ class InboxState(Hasher):
     def is_empty(self):
         return not bool(self._items)
 
+    @profiled_calls(lambda self, *args, **kwargs: f"loop-{self.loop_counter:04d}-scan")
+    @metrics.timed("scan", book_arg=None)
+    @synchronized
     def scan(
         self,
         recheck_failed: bool = False,
@@ -162,13 +194,40 @@ class InboxState(Hasher):
 
         super().scan()
 
-        if not self.tree:
-            # Only scan id3 info once, when initializing the tree
-            self.tree = BooksTree(cfg.inbox_dir)
-        self.tree.scan(scan_id3=False if scan_id3 is False else True)
-        # self._tree.scan()
-
-        found_items = {str(t.key): InboxItem(t) for t in self.tree.books_and_series}
+        # super().scan() just refreshed the snapshot, so the tree and items are built from the same walk. Compare
+        # each top-level entry's fingerprint to the last scan's (plus anything the watcher saw) so that only the
+        # books that changed get rebuilt and re-scored; every other subtree and InboxItem is kept as-is.
+        fingerprints = self.snapshot.fingerprints()
+        # Structures determined without id3 tags aren't the same as the ones with, so don't cache those
+        scan_cache = self.scan_cache if scan_id3 is not False else None
+        if self.tree and self._fingerprints and self._dirty is not None:
+            self._dirty |= {
+                k
+                for k in fingerprints.keys() | self._fingerprints.keys()
+                if fingerprints.get(k) != self._fingerprints.get(k)
+            }
+            if self._dirty:
+                self.tree.rescan(self._dirty, scan_id3=False if scan_id3 is False else True, snapshot=self.snapshot)
+        else:
+            self._dirty = None
+            if not self.tree:
+                # Only scan id3 info once, when initializing the tree
+                self.tree = BooksTree(cfg.inbox_dir, scan=False)
+            if scan_cache is not None:
+                scan_cache.load(fingerprints, self.tree.match_filter)
+            self.tree.scan(scan_id3=False if scan_id3 is False else True, snapshot=self.snapshot, scan_cache=scan_cache)
+        if scan_cache is not None:
+            scan_cache.save(self.tree, fingerprints, self.tree.match_filter)
+        self._fingerprints = fingerprints
+
+        found_items: dict[str, InboxItem] = {}
+        for t in self.tree.books_and_series:
+            if item := self._items.get(k := str(t.key)):
+                # Existing items keep their state (and hash), they just need to point at the rebuilt tree
+                item.tree = t
+                found_items[k] = item
+            else:
+                found_items[k] = InboxItem(t, snapshot=self.snapshot)
 
         # smart_print(f"scan calls: {SCAN_CALLS}", SCAN_CALLS)
         # try:
@@ -182,7 +241,7 @@ class InboxState(Hasher):
         for k, v in found_items.items():
             if k not in self._items:
                 self._items[k] = v
-            elif recheck_failed and (item := self._items[k]):
+            elif recheck_failed and self.is_dirty(k) and (item := self._items[k]):
                 if item.status == "failed" and (item.did_change or item.hash_age < cfg.SLEEP_TIME):
                     item.set_needs_retry()
 
@@ -199,10 +258,58 @@ class InboxState(Hasher):
 
         self._last_scan = time.time()
         self.stale = False
+        self._dirty = set()
 
+    @synchronized
     def flush(self):
         super().flush()
         self._items = {}
+        self._dirty = None
+        self._fingerprints = {}
+
+    @property
+    def is_watching(self):
+        return bool(self.watcher and self.watcher.mode != "poll")
+
+    def start_watching(self):
+        """Starts an event-driven watcher for the inbox if cfg.WATCH_MODE allows it (see `get_inbox_watcher`)."""
+        from src.lib.config import cfg
+
+        if not self.watcher:
+            self.watcher = get_inbox_watcher(cfg.inbox_dir)
+            if self.is_watching:
+                print_debug(f"Watching {cfg.inbox_dir} for changes with {self.watcher.mode}")
+        return self.watcher
+
+    def stop_watching(self):
+        if self.watcher:
+            self.watcher.close()
+            self.watcher = None
+        self._dirty = None
+
+    def wait_for_changes(self, timeout: float):
+        """Sleeps for up to `timeout` seconds. If watching, returns early as soon as the inbox changes and
+        records which top-level books were touched."""
+        if not self.watcher:
+            time.sleep(timeout)
+            return
+        self.mark_dirty(self.watcher.wait(timeout))
+
+    def mark_dirty(self, paths: "set[Path] | list[Path] | None"):
+        """Marks the books containing `paths` as changed. None means the changes are unknown, so every book
+        will be rechecked on the next scan."""
+        if paths is None:
+            self._dirty = None
+        elif self._dirty is not None and (names := top_level_names(paths, self.path)):
+            self._dirty |= names
+            self.stale = True
+
+    def is_dirty(self, key: str):
+        return self._dirty is None or Path(key).parts[0] in self._dirty
+
+    @property
+    def has_pending_changes(self):
+        return self._dirty is None or bool(self._dirty)
 
     @property
     def match_filter(self):
@@ -229,6 +336,8 @@ class InboxState(Hasher):
             cfg.MATCH_FILTER = match_filter
 
         self.tree._match_filter = match_filter
+        # The filter changes which paths are in the tree, so the next scan has to rebuild all of it
+        self._dirty = None
         # self.tree.scan()
 
     def reset_inbox(self, new_match_filter: str | None = None):
@@ -285,6 +394,7 @@ class InboxState(Hasher):
         return self.tree.standalone_files
 
     @property
+    @synchronized
     def standalone_books(self):
         return {
             k: v
@@ -304,6 +414,7 @@ class InboxState(Hasher):
     def series_parents(self):
         return self.tree.series_parents
 
+    @synchronized
     def series_items_for_key(self, key: str):
         return [
             v
@@ -320,6 +431,7 @@ class InboxState(Hasher):
         return len(self.series_parents)
 
     @property
+    @synchronized
     def ignored_books(self):
         return {k: v for k, v in self._items.items() if v.is_filtered}
 
@@ -328,6 +440,7 @@ class InboxState(Hasher):
         return len(self.tree.books) - self.num_matched
 
     @property
+    @synchronized
     def matched_books(self):
         return {
             k: v
@@ -340,6 +453,7 @@ class InboxState(Hasher):
         return len(self.tree.books_f)
 
     @property
+    @synchronized
     def ok_books(self):
         return {
             k: v for k, v in self._items.items() if v.tree.is_book_root and v.status in ["ok", "new", "needs_retry"]
@@ -358,10 +472,12 @@ class InboxState(Hasher):
         return len(self.matched_ok_books)
 
     @property
+    @synchronized
     def has_failed_books(self):
         return any(v.status in ["failed", "needs_retry"] for v in self._items.values())
 
     @property
+    @synchronized
     def failed_books(self):
         return {k: v for k, v in self._items.items() if v.status == "failed"}
 
@@ -370,6 +486,7 @@ class InboxState(Hasher):
         return len(self.failed_books)
 
     @property
+    @synchronized
     def all_books_failed(self):
         haystack = self._items.values() if not self.match_filter else self.matched_books.values()
         return all(v.status == "failed" for v in haystack)
@@ -407,6 +524,10 @@ class InboxState(Hasher):
         from src.lib.config import cfg
         from src.lib.run import print_banner
 
+        if self.is_watching and self.ready and not self.has_pending_changes:
+            # The watcher saw nothing change, so there is no need to re-hash the inbox
+            return False
+
         self.changed_after_waiting = False
         waited_count = 0
         before_modified_hash = self.prev_hash if self.hash_age < cfg.SLEEP_TIME else self.curr_hash
@@ -483,13 +604,16 @@ class InboxState(Hasher):
 
         return False
 
+    @synchronized
     def to_dict(self, refresh_hashes=False):
         return {path: item.to_dict(refresh_hashes) for path, item in self._items.items()}
 
     @property
+    @synchronized
     def fixed_books(self):
         return {k: v for k, v in self._items.items() if v.status == "needs_retry" and v.failed_reason}
 
+    @synchronized
     def set_failed(
         self,
         key_path_or_book: str | Path | Audiobook,
@@ -507,6 +631,7 @@ class InboxState(Hasher):
         else:
             print_debug(f"Item {key_path_or_book} not found in inbox")
 
+    @synchronized
     def set_needs_retry(self, key_path_or_book: str | Path | Audiobook):
         if not self.get(key_path_or_book):
             self.set(key_path_or_book)
@@ -517,6 +642,7 @@ class InboxState(Hasher):
         else:
             print_debug(f"Item {key_path_or_book} not found in inbox")
 
+    @synchronized
     def set_ok(self, key_path_or_book: str | Path | Audiobook):
         if not self.get(key_path_or_book):
             self.set(key_path_or_book)
@@ -527,6 +653,7 @@ class InboxState(Hasher):
         else:
             print_debug(f"Item {key_path_or_book} not found in inbox")
 
+    @synchronized
     def set_gone(self, key_path_or_book: str | Path | Audiobook):
         if not self.get(key_path_or_book):
             self.set(key_path_or_book)
@@ -537,8 +664,9 @@ class InboxState(Hasher):
         else:
             print_debug(f"Item {key_path_or_book} not found in inbox")
 
+    @synchronized
     def __iter__(self):
-        return iter(self._items.values())
+        return iter(list(self._items.values()))
 
     def __len__(self):
         return len(self._items)
@@ -554,7 +682,9 @@ class InboxState(Hasher):
 
 
 def _sync_failed_to_env():
-    os.environ["FAILED_BOOKS"] = json.dumps({k: v.last_updated for k, v in InboxState().failed_books.items()})
+    inbox = InboxState()
+    with inbox._lock:
+        os.environ["FAILED_BOOKS"] = json.dumps({k: v.last_updated for k, v in inbox.failed_books.items()})
 
 
 def _sync_failed_from_env():
@@ -0,0 +1,208 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from collections.abc import Iterable
+from pathlib import Path
+
+from src.lib.term import print_debug
+from src.lib.typing import WatchMode
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+)
+
+_EVENT = struct.Struct("iIII")
+
+# How long to keep draining events after the first one arrives, so a burst (e.g. a book being copied in)
+# is reported as one batch instead of waking the loop once per file
+SETTLE_TIME = 0.25
+
+
+class InboxWatcher:
+    """Blocks until the inbox changes (or a timeout passes) and reports which paths changed.
+
+    `wait()` returns the set of changed paths, or None if the watcher can't tell what changed and the
+    caller should assume everything did (the kernel event queue overflowed). Polling can't see any changes,
+    so it always returns an empty set and leaves it to the next scan's fingerprints to find them."""
+
+    mode: WatchMode = "poll"
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def wait(self, timeout: float) -> set[Path] | None:
+        time.sleep(timeout)
+        return set()
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class InotifyWatcher(InboxWatcher):
+    """Linux inotify watcher using libc through ctypes. Watches every dir under `path` and adds watches for
+    dirs created or moved in while running. Note that inotify only sees changes made through the local
+    kernel, so changes made by another host on a network share (NFS/SMB) will not be picked up."""
+
+    mode: WatchMode = "inotify"
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self._libc = _load_libc()
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_init1 failed: {os.strerror(ctypes.get_errno())}")
+        self._wds: dict[int, Path] = {}
+        self._overflowed = False
+        self._add_watches(path)
+
+    def _add_watch(self, d: Path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(d), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            # The dir may have been removed before we got to it
+            if errno in (2, 20):  # ENOENT, ENOTDIR
+                return
+            raise OSError(errno, f"inotify_add_watch failed for {d}: {os.strerror(errno)}")
+        self._wds[wd] = d
+
+    def _add_watches(self, root: Path):
+        self._add_watch(root)
+        for dirpath, dirnames, _ in os.walk(root):
+            for name in dirnames:
+                self._add_watch(Path(dirpath, name))
+
+    def _read_events(self) -> set[Path]:
+        changed: set[Path] = set()
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not buf:
+                break
+            i = 0
+            while i + _EVENT.size <= len(buf):
+                wd, mask, _cookie, length = _EVENT.unpack_from(buf, i)
+                name = buf[i + _EVENT.size : i + _EVENT.size + length].rstrip(b"\0")
+                i += _EVENT.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    self._overflowed = True
+                    continue
+                if mask & IN_IGNORED:
+                    self._wds.pop(wd, None)
+                    continue
+                if not (d := self._wds.get(wd)):
+                    continue
+                p = d / os.fsdecode(name) if name else d
+                changed.add(p)
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add_watches(p)
+        return changed
+
+    def wait(self, timeout: float) -> set[Path] | None:
+        changed: set[Path] = set()
+        deadline = time.monotonic() + timeout
+        ready, _, _ = select.select([self._fd], [], [], max(timeout, 0))
+        while ready:
+            changed |= self._read_events()
+            remaining = min(SETTLE_TIME, deadline - time.monotonic())
+            if remaining <= 0:
+                break
+            ready, _, _ = select.select([self._fd], [], [], remaining)
+
+        if self._overflowed:
+            self._overflowed = False
+            print_debug("Inbox watcher event queue overflowed, rescanning everything")
+            return None
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def __del__(self):
+        self.close()
+
+
+def _load_libc():
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+
+def inotify_available() -> bool:
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        return hasattr(_load_libc(), "inotify_init1")
+    except OSError:
+        return False
+
+
+def get_inbox_watcher(path: Path, mode: WatchMode | None = None) -> InboxWatcher:
+    """Returns the watcher for `mode` (default: cfg.WATCH_MODE). 'auto' uses inotify when it's available,
+    and any failure to set up inotify falls back to polling."""
+    from src.lib.config import cfg
+
+    mode = mode or cfg.WATCH_MODE
+    if mode in ("inotify", "auto") and inotify_available():
+        try:
+            return InotifyWatcher(path)
+        except OSError as e:
+            print_debug(f"Could not watch {path} with inotify, falling back to polling: {e}")
+    elif mode == "inotify":
+        print_debug("inotify is not available on this system, falling back to polling")
+    return InboxWatcher(path)
+
+
+def top_level_names(paths: Iterable[Path], root: Path) -> set[str]:
+    """The names of the top-level inbox entries (book or series folders, or standalone files) that contain
+    each of `paths`. A change to `root` itself is ignored."""
+    names = set()
+    for p in paths:
+        try:
+            rel = p.relative_to(root)
+        except ValueError:
+            continue
+        if rel.parts:
+            names.add(rel.parts[0])
+    return names
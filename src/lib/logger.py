@@ -9,7 +9,9 @@ from src.lib.audiobook import Audiobook
 from src.lib.books_tree import BooksTree
 from src.lib.config import cfg
 from src.lib.formatters import log_date, log_format_elapsed_time, pluralize
+from src.lib.metrics import metrics
 from src.lib.misc import re_group
+from src.lib.run_log import get_run_log, LOG_FIELDS, normalize_book_name, RunLog
 from src.lib.term import multiline_is_empty
 
 LOG_HEADERS = [
@@ -32,135 +34,167 @@ log_pattern = re.compile(
 # 2023-10-22 18:37:58-0700   FAILED    The Law of Attraction by Esther and Jerry Hicks    129 kb/s      44.1 kHz   .wma    85 files   336M         -
 
 
-def log_global_results(
-    book: Audiobook,
-    result: str,
-    elapsed_s: int | float,
-    log_file: Path | None = None,
-) -> None:
-    # note: requires `column` version 2.39 or higher, available in util-linux 2.39 or higher
-
-    # takes the original book's path and the result of the book and logs to outputfolder/auto-m4b.log
-    # format: [date] [time] [original book relative path] [info] ["result"=success|failed] [failure-message]
-    # pad the relative path with spaces to 70 characters and truncate to 70 characters
-    # sanitize book_src to remove multiple spaces and replace | with _
-
-    # get current log data and load it into columns - split by tabs or spaces >= 2
+# Column widths for a new log file, which grow as needed when the table is rendered
+LOG_WIDTHS = [24, 7, 70, 9, 11, 5, 9, 7, 11, 5]
+LOG_MAX_NAME_WIDTH = 70
+LOG_COL_SEP = "   "
+
+
+def run_log_path(log_file: Path) -> Path:
+    """The machine-readable run log that sits next to the global log file, e.g. auto-m4b.jsonl."""
+    return log_file.with_suffix(".jsonl")
+
+
+def parse_log_line(line: str) -> list[str] | None:
+    """Parses a row of the global log table into its cells, or returns None if it isn't a row."""
+    if line.startswith("Date ") or multiline_is_empty(line):
+        return None
+    cells = re.sub(r"\s{2,}", "\t", line).strip().split("\t")
+
+    if len(cells) == len(LOG_FIELDS):
+        if not cells[1].lower() in ["success", "failed"]:
+            cells[1] = "UNKNOWN"
+        return cells
+
+    # book name probably got goofed, we need to regex it out
+    parsed = log_pattern.search(line.strip())
+    if not parsed:
+        raise ValueError(f"Couldn't parse log row: '{line}'")
+    return [
+        re_group(parsed, "date", default=""),
+        re_group(parsed, "result", default=""),
+        re_group(parsed, "book_name", default="").strip(),
+        re_group(parsed, "bitrate", default=""),
+        re_group(parsed, "samplerate", default=""),
+        re_group(parsed, "file_type", default=""),
+        re_group(parsed, "num_files", default=""),
+        re_group(parsed, "size", default=""),
+        re_group(parsed, "duration", default="-"),
+        re_group(parsed, "elapsed", default="-"),
+    ]
+
+
+def _read_log_table(log_file: Path) -> list[dict[str, Any]]:
+    entries = []
+    with open(log_file, "r") as f:
+        for line in f:
+            try:
+                cells = parse_log_line(line)
+            except ValueError as e:
+                raise ValueError(f"{e}\nin file: {log_file}") from e
+            if cells:
+                entries.append(dict(zip(LOG_FIELDS, cells)))
+    return entries
 
-    human_elapsed = log_format_elapsed_time(elapsed_s)
 
+def open_run_log(log_file: Path | None = None) -> RunLog:
+    """Returns the run log for `log_file`, first importing the rows of the table if there's no run log yet."""
     if not log_file:
         log_file = cfg.GLOBAL_LOG_FILE
-
-    log_data: list[list[str]] = []
-    log_file.touch(exist_ok=True)
-    with open(log_file, "r") as f:
-        for line in f:
-            if line.startswith("Date ") or multiline_is_empty(line):
-                continue
-            cells = re.sub(r"\s{2,}", "\t", line).strip().split("\t")
-
-            if len(cells) == 10:
-                if not cells[1].lower() in ["success", "failed"]:
-                    cells[1] = "UNKNOWN"
-                log_data.append(cells)
-            else:
-                # book name probably got goofed, we need to regex it out
-                parsed = log_pattern.search(line.strip())
-                if parsed:
-                    log_data.append(
-                        [
-                            re_group(parsed, "date", default=""),
-                            re_group(parsed, "result", default=""),
-                            re_group(parsed, "book_name", default="").strip(),
-                            re_group(parsed, "bitrate", default=""),
-                            re_group(parsed, "samplerate", default=""),
-                            re_group(parsed, "file_type", default=""),
-                            re_group(parsed, "num_files", default=""),
-                            re_group(parsed, "size", default=""),
-                            re_group(parsed, "duration", default="-"),
-                            re_group(parsed, "elapsed", default="-"),
-                        ]
-                    )
-                else:
-                    raise ValueError(f"Couldn't parse log row: '{line}'\nin file: {log_file}")
-
-    num_cols = len(LOG_HEADERS)
-
-    # ensure all rows in log_data have 10 columns
-    for row in log_data:
-        if len(row) < num_cols:
-            row.extend([""] * (num_cols - len(row)))
-        elif len(row) > num_cols:
-            raise ValueError(f"Row has too many columns for log: {row}")
-
-    # remove 2+ spaces from book_name
-    book_name = " ".join(book.basename.split())
-
-    # pad result with spaces to 9 characters
-    # result = f"{result:<10}"
-
-    # # strip all chars from elapsed that are not number or :
-    # human_elapsed = "".join(c for c in str(human_elapsed) if c.isdigit() or c == ":")
-
-    # Read the current auto-m4b.log file and replace all double spaces with |
-    # with open(log_file, "r") as f:
-    #     log = f.read().replace("  ", "\t")
-
-    # Remove each line from log if it starts with ^Date\s+
-    # log = "\n".join(line for line in log.splitlines() if not line.startswith("Date "))
-
-    # Remove blank lines from end of log file
-    # log = log.rstrip("\n")
-
-    log_data.append(
-        [
-            log_date(),
-            result.upper(),
-            book_name,
-            book.bitrate_friendly,
-            book.samplerate_friendly,
-            f".{(book.orig_file_type or "N/A").replace('.', '')}",
-            f"{book.num_files('inbox')} {pluralize(book.num_files('inbox'), "file")}",
-            book.size("inbox", "human"),
-            book.duration("inbox", "human") or "-",
-            human_elapsed or "",
-        ]
-    )
-
+    run_log = get_run_log(run_log_path(log_file))
+    if log_file.exists():
+        run_log.create(lambda: _read_log_table(log_file))
+    return run_log
+
+
+def _log_row(entry: dict[str, Any]) -> list[str]:
+    return [str(entry.get(field, "")) for field in LOG_FIELDS]
+
+
+def _default_header() -> str:
+    cells = [
+        h.ljust(w) if j == "l" else h.rjust(w) for h, w, j in zip(LOG_HEADERS, LOG_WIDTHS, LOG_JUSTIFY)
+    ]
+    return LOG_COL_SEP.join(cells).rstrip()
+
+
+def _format_log_line(row: list[str], header: str) -> str:
+    """Lines a row up under the columns of an existing table's `header`. Left-justified cells start where
+    their header starts, and right-justified cells end where it ends, unless an earlier cell is in the way."""
+    spans = [m.span() for m in re.finditer(r"\S+(?: \S+)*", header)]
+    if len(spans) != len(LOG_HEADERS):
+        spans = [m.span() for m in re.finditer(r"\S+(?: \S+)*", _default_header())]
+    line = ""
+    for i, (cell, (start, end), justify) in enumerate(zip(row, spans, LOG_JUSTIFY)):
+        if i == 2:
+            cell = cell[:LOG_MAX_NAME_WIDTH]
+        col = start if justify == "l" else end - len(cell)
+        if i > 0:
+            col = max(col, len(line) + 2)
+        line = line.ljust(col) + cell
+    return line.rstrip()
+
+
+def render_global_log(log_file: Path | None = None) -> str:
+    """Renders the whole run log as the global log table."""
     table = columnar(
-        log_data,
+        [_log_row(entry) for entry in open_run_log(log_file)] or [[""] * len(LOG_HEADERS)],
         headers=LOG_HEADERS,
         terminal_width=1000,
         preformatted_headers=True,
         no_borders=True,
-        max_column_width=70,
+        max_column_width=LOG_MAX_NAME_WIDTH,
         justify=LOG_JUSTIFY,
         wrap_max=0,  # don't wrap
     )
+    # remove empty first line of table, and edge whitespace
+    return "\n".join(line.strip() for line in table.splitlines()[1:] if line.strip())
+
+
+@metrics.timed("log")
+def log_global_results(
+    book: Audiobook,
+    result: str,
+    elapsed_s: int | float,
+    log_file: Path | None = None,
+) -> None:
+    # takes the original book's path and the result of the book and logs it to the run log, and as a new row
+    # at the end of outputfolder/auto-m4b.log. Neither file is ever rewritten, see render_global_log for
+    # re-rendering the whole table.
 
-    table_cleaned = []
+    if not log_file:
+        log_file = cfg.GLOBAL_LOG_FILE
 
-    for line in table.splitlines()[1:]:
-        table_cleaned.append(line.strip())
+    run_log = open_run_log(log_file)
+
+    entry = {
+        "date": log_date(),
+        "result": result.upper(),
+        # remove 2+ spaces from book_name
+        "book_name": normalize_book_name(book.basename),
+        "bitrate": book.bitrate_friendly,
+        "samplerate": book.samplerate_friendly,
+        "file_type": f".{(book.orig_file_type or "N/A").replace('.', '')}",
+        "num_files": f"{book.num_files('inbox')} {pluralize(book.num_files('inbox'), "file")}",
+        "size": book.size("inbox", "human"),
+        "duration": book.duration("inbox", "human") or "-",
+        "elapsed": log_format_elapsed_time(elapsed_s) or "",
+        "elapsed_s": round(elapsed_s, 3),
+        "path": str(book.inbox_dir),
+    }
+    run_log.append(entry)
 
-    # remove empty first line of table, and edge whitespace
-    table = "\n".join(table_cleaned)
+    log_file.touch(exist_ok=True)
+    with open(log_file, "rb") as f:
+        header = f.readline().decode()
+        f.seek(0, 2)
+        ends_with_newline = f.tell() == 0 or (f.seek(-1, 2) >= 0 and f.read(1) == b"\n")
 
-    # replace the log file
-    with open(log_file, "w") as f:
-        # ensure newline at end of file
-        f.write(table)
+    with open(log_file, "a") as f:
+        if not header.strip():
+            header = _default_header()
+            f.write(f"{header}\n")
+        elif not ends_with_newline:
+            f.write("\n")
+        f.write(f"{_format_log_line(_log_row(entry), header)}\n")
 
 
 def get_log_entry(book_src: Path, log_file: Path | None = None) -> str:
-    # looks in the log file to see if this book has been converted before and returns the log entry or ""
-    if not log_file:
-        log_file = cfg.GLOBAL_LOG_FILE
-    book_name = book_src.name
-    with open(log_file, "r") as f:
-        log_entry = next((line for line in f if book_name in line), "")
-    return log_entry
+    # looks in the run log to see if this book has been converted before and returns the log entry or ""
+    entry = next(iter(open_run_log(log_file).find(book_src.name)), None)
+    if not entry:
+        return ""
+    return _format_log_line(_log_row(entry), _default_header())
 
 
 def write_err_file(file: "BooksTree | Path", e: Any, component: str, stderr: str | None = None) -> None:
@@ -171,3 +205,23 @@ def write_err_file(file: "BooksTree | Path", e: Any, component: str, stderr: str
         full_stack = traceback.format_exc()
         stderr = f"\n\n{stderr}" if stderr else ""
         f.write(f"{full_stack}\n{str(e)}{stderr}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render the global log table from the run log")
+    parser.add_argument("--log-file", type=Path, help="The global log file, default is converted/auto-m4b.log")
+    parser.add_argument("--write", action="store_true", help="Replace the log file with the rendered table")
+    args = parser.parse_args()
+
+    log_file = args.log_file or cfg.GLOBAL_LOG_FILE
+    table = render_global_log(log_file)
+    if args.write:
+        log_file.write_text(f"{table}\n")
+    else:
+        print(table)
+
+
+if __name__ == "__main__":
+    main()
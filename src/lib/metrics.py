@@ -0,0 +1,194 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, ParamSpec, TypeVar
+
+METRICS_FILE = "metrics.jsonl"
+PROMETHEUS_FILE = "metrics.prom"
+PROMETHEUS_PREFIX = "auto_m4b"
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+@dataclass
+class SpanStats:
+    count: int = 0
+    seconds: float = 0.0
+
+    def add(self, seconds: float, count: int = 1):
+        self.count += count
+        self.seconds += seconds
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"count": self.count, "seconds": round(self.seconds, 4)}
+
+
+def _add(stats: dict[str, SpanStats], name: str, seconds: float, count: int = 1):
+    stats.setdefault(name, SpanStats()).add(seconds, count)
+
+
+def book_key(book: Any) -> str | None:
+    """The name spans are grouped under for `book`, an Audiobook, InboxItem or name."""
+    if book is None or isinstance(book, str):
+        return book
+    return getattr(book, "basename", None) or getattr(getattr(book, "path", None), "name", None)
+
+
+class Metrics:
+    """Collects how long named spans (e.g. "backup" or "convert.transcode") take, per book and per loop.
+
+    At the end of each loop, the totals for each book and for the loop are appended to metrics.jsonl in
+    META_DIR, and the running totals since startup are written to metrics.prom for Prometheus' textfile
+    collector. Spans from different threads can overlap, so a book's spans can add up to more than its
+    wall-clock time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: int | None = None
+        self._loop_start = 0.0
+        self._books: dict[str, dict[str, SpanStats]] = {}
+        self._loop_spans: dict[str, SpanStats] = {}
+        self._totals: dict[str, SpanStats] = {}
+        self._books_total = 0
+        self._loops_total = 0
+        self._last_loop_seconds = 0.0
+
+    def __repr__(self):
+        return f"Metrics(loop {self._loop}, {len(self._books)} books, {len(self._totals)} spans)"
+
+    @property
+    def enabled(self) -> bool:
+        from src.lib.config import cfg
+
+        return bool(cfg.METRICS)
+
+    def record(self, name: str, seconds: float, book: Any = None):
+        key = book_key(book)
+        with self._lock:
+            if key:
+                _add(self._books.setdefault(key, {}), name, seconds)
+            _add(self._loop_spans, name, seconds)
+            _add(self._totals, name, seconds)
+
+    @contextmanager
+    def span(self, name: str, book: Any = None) -> Iterator[None]:
+        """Times the block as span `name`, counted towards `book` if given."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, book)
+
+    def timed(self, name: str, book_arg: int | None = 0) -> Callable[[Callable[P, R]], Callable[P, R]]:
+        """Decorator that times each call as span `name`, counted towards the book that is positional arg
+        `book_arg` (or the `book` kwarg)."""
+
+        def decorator(fn: Callable[P, R]) -> Callable[P, R]:
+            @functools.wraps(fn)
+            def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+                book = kwargs.get("book")
+                if book is None and book_arg is not None and len(args) > book_arg:
+                    book = args[book_arg]
+                with self.span(name, book):
+                    return fn(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    @contextmanager
+    def loop(self, loop: int) -> Iterator[None]:
+        """Collects the spans of one loop of the inbox, and exports them when it's done. Loops where no
+        books were processed aren't exported."""
+        with self._lock:
+            self._loop = loop
+            self._loop_start = time.perf_counter()
+            self._books = {}
+            self._loop_spans = {}
+        try:
+            yield
+        finally:
+            with self._lock:
+                elapsed = time.perf_counter() - self._loop_start
+                books, loop_spans = self._books, self._loop_spans
+                self._books, self._loop_spans, self._loop = {}, {}, None
+                if books:
+                    self._books_total += len(books)
+                    self._loops_total += 1
+                    self._last_loop_seconds = elapsed
+            if books and self.enabled:
+                self.export(loop, elapsed, books, loop_spans)
+
+    def snapshot(self) -> dict[str, Any]:
+        """The spans of the current loop so far, per book and in total."""
+        with self._lock:
+            return {
+                "books": {k: {n: s.to_dict() for n, s in v.items()} for k, v in self._books.items()},
+                "spans": {n: s.to_dict() for n, s in self._loop_spans.items()},
+            }
+
+    def export(self, loop: int, elapsed: float, books: dict[str, dict[str, SpanStats]], spans: dict[str, SpanStats]):
+        from src.lib.config import cfg
+        from src.lib.term import print_debug
+
+        now = datetime.now().astimezone().isoformat(timespec="seconds")
+        rows = [
+            {"type": "book", "time": now, "loop": loop, "book": book, "spans": {n: s.to_dict() for n, s in v.items()}}
+            for book, v in books.items()
+        ]
+        rows.append(
+            {
+                "type": "loop",
+                "time": now,
+                "loop": loop,
+                "seconds": round(elapsed, 4),
+                "books": len(books),
+                "spans": {n: s.to_dict() for n, s in spans.items()},
+            }
+        )
+        try:
+            with open(cfg.META_DIR / METRICS_FILE, "a") as f:
+                f.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows))
+            prom_file = cfg.META_DIR / PROMETHEUS_FILE
+            tmp_file = prom_file.with_suffix(".prom.tmp")
+            tmp_file.write_text(self.prometheus())
+            os.replace(tmp_file, prom_file)
+        except OSError as e:
+            print_debug(f"Couldn't write metrics to {cfg.META_DIR}: {e}")
+
+    def prometheus(self) -> str:
+        """The running totals since startup in the Prometheus text format."""
+        p = PROMETHEUS_PREFIX
+        with self._lock:
+            totals = sorted(self._totals.items())
+            lines = [
+                f"# HELP {p}_span_seconds_total Seconds spent in each stage, summed over every book.",
+                f"# TYPE {p}_span_seconds_total counter",
+                *(f'{p}_span_seconds_total{{span="{n}"}} {s.seconds:.4f}' for n, s in totals),
+                f"# HELP {p}_span_count_total Number of times each stage ran.",
+                f"# TYPE {p}_span_count_total counter",
+                *(f'{p}_span_count_total{{span="{n}"}} {s.count}' for n, s in totals),
+                f"# HELP {p}_books_total Books processed.",
+                f"# TYPE {p}_books_total counter",
+                f"{p}_books_total {self._books_total}",
+                f"# HELP {p}_loops_total Loops in which books were processed.",
+                f"# TYPE {p}_loops_total counter",
+                f"{p}_loops_total {self._loops_total}",
+                f"# HELP {p}_last_loop_seconds Wall-clock seconds of the last loop in which books were processed.",
+                f"# TYPE {p}_last_loop_seconds gauge",
+                f"{p}_last_loop_seconds {self._last_loop_seconds:.4f}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
@@ -1,34 +1,36 @@
 import contextlib
 import json
 import os
-import pickle
 import re
-import sqlite3
 import subprocess
 import sys
+import threading
 import warnings
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
 from datetime import datetime, timedelta
-from typing import cast, Literal, TypedDict
+from typing import Any, cast, Literal, TYPE_CHECKING, TypedDict
+
+import cachetools
 
 # Suppress deprecation warning from thinc about torch.cuda.amp.autocast
 warnings.filterwarnings("ignore", message=r".*torch\.cuda\.amp\.autocast.*", category=FutureWarning)
 warnings.filterwarnings("ignore", message=r".*torch\.amp\.autocast.*", category=FutureWarning)
 warnings.filterwarnings("ignore", category=FutureWarning, module=r"thinc\..*")
 
-import nltk
-import spacy
-from nltk.corpus import webtext, words
-from spacy.language import Language
-from spacy.matcher import Matcher
-
 from lib.misc import re_group
+from src.import_debug import bug
 from src.lib.config import cfg
+from src.lib.sqlite_cache import SQLiteCache
 from src.lib.term import print_debug
 
+if TYPE_CHECKING:
+    from spacy.language import Language
+    from spacy.matcher import Matcher
+
 SPACY_MODEL_TRF = "en_core_web_trf"
 SPACY_MODEL_SM = "en_core_web_sm"
 TRF_MODEL = "dslim/bert-base-NER"
+NER_BATCH_SIZE = 32
 
 
 def should_update_nltk() -> bool:
@@ -45,30 +47,12 @@ def should_update_nltk() -> bool:
         return True
 
 
-english_words = set()
-webtext_words = set()
-
-
 def update_nltk_timestamp():
     nltk_file = cfg.META_DIR / ".nltk"
     with open(nltk_file, "w") as f:
         json.dump({"last_update": datetime.now().isoformat()}, f)
 
 
-if should_update_nltk():
-    with contextlib.redirect_stdout(open(os.devnull, "w")):
-        nltk.download("words")
-        nltk.download("webtext")
-        english_words = set(words.words())
-        webtext_words = set(webtext.words())
-    update_nltk_timestamp()
-else:
-    english_words = set(words.words())
-    webtext_words = set(webtext.words())
-
-nlp = None  # type: ignore
-
-
 def _ensure_pip():
     try:
         subprocess.run([sys.executable, "-m", "pip", "--version"], check=True, capture_output=True)
@@ -86,7 +70,10 @@ def _devnull():
             yield
 
 
-def _load_spacy_model() -> spacy.language.Language:
+def _load_spacy_model() -> "Language":
+    with bug.timed("import spacy"):
+        import spacy
+
     for model in (SPACY_MODEL_TRF, SPACY_MODEL_SM):
         try:
             with _devnull():
@@ -101,21 +88,6 @@ def _load_spacy_model() -> spacy.language.Language:
     raise RuntimeError(f"Could not load any spaCy model (tried: {SPACY_MODEL_TRF}, {SPACY_MODEL_SM})")
 
 
-nlp = _load_spacy_model()
-
-
-matcher = Matcher(nlp.vocab)
-matcher.add("PERSON", [[{"IS_ALPHA": True}]])
-matcher.add("WORK_OF_ART", [[{"IS_ALPHA": True}]])
-matcher.add("PRODUCT", [[{"IS_ALPHA": True}]])
-matcher.add("EVENT", [[{"IS_ALPHA": True}]])
-matcher.add("ORG", [[{"IS_ALPHA": True}]])
-
-import inflect as _inflect
-
-inflect = _inflect.engine()
-nlp = cast(Language, nlp)
-
 """
 [{'entity_group': 'PER', 'score': 0.9915958, 'word': 'Melody Muze', 'start': 0, 'end': 11}, {'entity_group': 'PER', 'score': 0.9990646, 'word': 'Fe', 'start': 15, 'end': 17}, {'entity_group': 'PER', 'score': 0.68379545, 'word': '##yre', 'start': 17, 'end': 20}]
 special variables
@@ -136,48 +108,32 @@ DslimBertBaseNER = TypedDict(
 )
 
 
-def get_model_cache_db() -> sqlite3.Connection:
-    """Get or create the SQLite database connection for model caching."""
-    db_path = cfg.META_DIR / "model_cache.db"
-    conn = sqlite3.connect(str(db_path))
+nlpCache = SQLiteCache("nlp_cache")
+modelCache = SQLiteCache("model_cache")
 
-    # Check if we need to migrate from old schema
-    cursor = conn.cursor()
-    try:
-        cursor.execute("SELECT results FROM model_cache LIMIT 1")
-    except sqlite3.OperationalError:
-        # Old schema exists, migrate to new schema
-        cursor.execute("DROP TABLE IF EXISTS model_cache")
-        cursor.execute(
-            """
-            CREATE TABLE model_cache (
-                model_name TEXT,
-                input_text TEXT,
-                results BLOB,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (model_name, input_text)
-            )
-        """
-        )
-        conn.commit()
-    else:
-        # Table exists with new schema, ensure it has all columns
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS model_cache (
-                model_name TEXT,
-                input_text TEXT,
-                results BLOB,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (model_name, input_text)
-            )
-        """
-        )
-
-    return conn
-
-
-def get_transformer_pipeline(pipeline, *, model_name: str) -> Callable[[str], list[DslimBertBaseNER]]:
+
+class CachedNERPipeline:
+    """Wraps a transformers NER pipeline, caching its results in the model cache DB."""
+
+    def __init__(self, pipeline: Callable[..., Any], model_name: str):
+        self.pipeline = pipeline
+        self.model_name = model_name
+
+    def __call__(self, text: str) -> list[DslimBertBaseNER]:
+        return self.batch([text])[0]
+
+    def batch(self, texts: list[str]) -> list[list[DslimBertBaseNER]]:
+        """Runs every text that isn't already in the model cache through the model in batches of
+        NER_BATCH_SIZE, and caches the new results."""
+        results: dict[str, list[DslimBertBaseNER]] = modelCache.get_many(self.model_name, texts)
+        if todo := [t for t in dict.fromkeys(texts) if t not in results]:
+            computed = dict(zip(todo, self.pipeline(todo, batch_size=NER_BATCH_SIZE)))
+            modelCache.set_many(self.model_name, computed)
+            results.update(computed)
+        return [results[t] for t in texts]
+
+
+def get_transformer_pipeline(pipeline, *, model_name: str) -> CachedNERPipeline:
     """Get a transformer pipeline for NER with result caching.
 
     Args:
@@ -186,67 +142,159 @@ def get_transformer_pipeline(pipeline, *, model_name: str) -> Callable[[str], li
     Returns:
         A callable that takes a string and returns a list of NER results
     """
+    from transformers import AutoModelForTokenClassification, AutoTokenizer
+
     # Create the pipeline
     tokenizer = AutoTokenizer.from_pretrained(model_name, never_split=[])
     model = AutoModelForTokenClassification.from_pretrained(model_name)
-    pipeline = cast(
-        Callable[[str], list[DslimBertBaseNER]],
-        pipeline("ner", model=model, tokenizer=tokenizer, aggregation_strategy="simple"),
+    return CachedNERPipeline(
+        pipeline("ner", model=model, tokenizer=tokenizer, aggregation_strategy="simple"), model_name
     )
 
-    # Create a wrapper that caches results
-    def cached_pipeline(text: str) -> list[DslimBertBaseNER]:
-        conn = get_model_cache_db()
-        cursor = conn.cursor()
 
-        # Try to get from cache
-        cursor.execute("SELECT results FROM model_cache WHERE model_name = ? AND input_text = ?", (model_name, text))
-        result = cursor.fetchone()
+class NoTRF:
+    def __init__(self): ...
 
-        if result is not None:
-            try:
-                cached_results = pickle.loads(result[0])
-                conn.close()
-                return cached_results
-            except (pickle.UnpicklingError, EOFError):
-                # If unpickling fails, we'll recompute the results
-                pass
+    def __call__(self, s: str):
+        return cast(list[DslimBertBaseNER], [])
 
-        # Compute new results
-        results = pipeline(text)
+    def batch(self, texts: list[str]):
+        return [self(t) for t in texts]
 
-        # Cache the results
-        try:
-            cursor.execute(
-                "INSERT OR REPLACE INTO model_cache (model_name, input_text, results) VALUES (?, ?, ?)",
-                (model_name, text, pickle.dumps(results)),
-            )
-            conn.commit()
-        except Exception as e:
-            print_debug(f"Failed to cache NER results: {e}")
 
-        conn.close()
-        return results
+class _EmptyDoc(tuple):
+    """Stands in for a spaCy Doc with no tokens or entities when NLP is disabled."""
 
-    return cached_pipeline
+    ents = ()
 
 
-class NoTRF:
-    def __init__(self): ...
+def _load_nltk_words() -> set[str]:
+    with bug.timed("import nltk"):
+        import nltk
+        from nltk.corpus import words
 
-    def __call__(self, s: str):
-        return cast(list[DslimBertBaseNER], [])
+    if should_update_nltk():
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            nltk.download("words")
+        update_nltk_timestamp()
+    return set(words.words())
 
 
-try:
-    from transformers import AutoModelForTokenClassification, AutoTokenizer, pipeline
+def _load_trf() -> CachedNERPipeline | NoTRF:
+    try:
+        with bug.timed("import transformers"):
+            from transformers import pipeline
+
+        with _devnull(), warnings.catch_warnings():
+            warnings.filterwarnings("ignore")
+            return get_transformer_pipeline(pipeline, model_name=TRF_MODEL)
+    except Exception as e:
+        print_debug(f"Error loading transformer model: {e}")
+        return NoTRF()
+
+
+class NLPModels:
+    """The spaCy, transformer and NLTK models used to find names in book metadata. Between them they take
+    seconds and hundreds of MB to load, so each is only loaded the first time it's used, not on import.
+
+    With USE_NLP=N none of them are loaded: `spacy` and `trf` find no entities, and names are only parsed
+    with patterns."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded: dict[str, Any] = {}
+        # Parsed spaCy docs, so the same string is only run through the model once per run
+        self._docs: cachetools.LRUCache[str, Any] = cachetools.LRUCache(maxsize=4096)
+
+    def __repr__(self):
+        return f"NLPModels({', '.join(self._loaded) or 'nothing loaded'})"
+
+    @property
+    def enabled(self) -> bool:
+        return bool(cfg.USE_NLP)
+
+    def _load(self, name: str, loader: Callable[[], Any]) -> Any:
+        if name not in self._loaded:
+            # Only one thread loads each model
+            with self._lock:
+                if name not in self._loaded:
+                    with bug.timed(name):
+                        self._loaded[name] = loader()
+                    print_debug(f"Loaded {name} in {bug.TIMINGS[name]:.2f}s")
+        return self._loaded[name]
+
+    @property
+    def english_words(self) -> set[str]:
+        return self._load("nltk words", _load_nltk_words) if self.enabled else set()
+
+    @property
+    def inflect(self):
+        def load():
+            import inflect
+
+            return inflect.engine()
+
+        return self._load("inflect", load)
+
+    @property
+    def spacy(self) -> "Language | Callable[[str], _EmptyDoc]":
+        return self._load("spacy model", _load_spacy_model) if self.enabled else lambda _s: _EmptyDoc()
+
+    def docs(self, texts: list[str]) -> list[Any]:
+        """Parses `texts` with spaCy, running any that haven't been parsed yet through `nlp.pipe` in batches
+        of NER_BATCH_SIZE rather than one at a time."""
+        if not self.enabled:
+            return [_EmptyDoc() for _ in texts]
+        nlp = self.spacy
+        with self._lock:
+            if todo := [t for t in dict.fromkeys(texts) if t not in self._docs]:
+                for text, doc in zip(todo, nlp.pipe(todo, batch_size=NER_BATCH_SIZE)):
+                    self._docs[text] = doc
+            return [self._docs[t] if t in self._docs else nlp(t) for t in texts]
+
+    def doc(self, s: str) -> Any:
+        return self.docs([s])[0]
+
+    def prefetch(self, texts: Iterable[str]):
+        """Runs `texts` through spaCy and the transformer model in batches ahead of time, so that parsing them
+        one by one later only hits the caches."""
+        if not self.enabled or not (texts := [t for t in dict.fromkeys(texts) if t]):
+            return
+        with bug.timed("ner prefetch"):
+            self.docs(texts)
+            self.trf.batch(texts)
+
+    @property
+    def matcher(self) -> "Matcher":
+        def load():
+            from spacy.matcher import Matcher
+
+            matcher = Matcher(self._load("spacy model", _load_spacy_model).vocab)
+            for label in ("PERSON", "WORK_OF_ART", "PRODUCT", "EVENT", "ORG"):
+                matcher.add(label, [[{"IS_ALPHA": True}]])
+            return matcher
+
+        return self._load("spacy matcher", load)
+
+    @property
+    def trf(self) -> CachedNERPipeline | NoTRF:
+        return self._load("transformer model", _load_trf) if self.enabled else NoTRF()
+
+    def pos_tag(self, s: str) -> list[tuple[str, str]]:
+        """Tokenizes `s` and tags each token's part of speech with NLTK. With NLP disabled, splits on
+        whitespace and tags capitalized words as proper nouns."""
+        if not self.enabled:
+            return [(t, "NNP" if t[:1].isupper() else "NN") for t in s.split()]
+
+        def load():
+            with bug.timed("import nltk"):
+                from nltk import pos_tag, word_tokenize
+            return lambda s: pos_tag(word_tokenize(s))
 
-    with _devnull(), warnings.catch_warnings():
-        warnings.filterwarnings("ignore")
-        nlp_trf = get_transformer_pipeline(pipeline, model_name=TRF_MODEL)
-except Exception as e:
-    print_debug(f"Error loading transformer model: {e}")
-    nlp_trf = NoTRF()
+        return self._load("nltk tagger", load)(s)
+
+
+nlpModels = NLPModels()
 
 
 def squash_trf_results(results: list[DslimBertBaseNER]) -> list[DslimBertBaseNER]:
@@ -364,58 +412,16 @@ def squash_nlp_results(
     return cast(list[tuple[str, str, float]], sorted(combined_results, key=lambda x: x[2] or 0, reverse=True))
 
 
-def get_nlp_cache_db() -> sqlite3.Connection:
-    """Get or create the SQLite database connection for NLP caching."""
-    db_path = cfg.META_DIR / "nlp_cache.db"
-    conn = sqlite3.connect(str(db_path))
-
-    # Create table if it doesn't exist
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS nlp_cache (
-            input_text TEXT,
-            results BLOB,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            PRIMARY KEY (input_text)
-        )
-    """
-    )
-    return conn
-
-
 def get_cached_nlp_results(text: str) -> list[tuple[str, str, float]] | None:
     """Get cached NLP results for the given text."""
-    conn = get_nlp_cache_db()
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT results FROM nlp_cache WHERE input_text = ?", (text,))
-    result = cursor.fetchone()
-    conn.close()
-
-    if result is not None:
-        try:
-            return pickle.loads(result[0])
-        except (pickle.UnpicklingError, EOFError):
-            return None
-    return None
+    if (cached := nlpCache.get("names", text)) is None:
+        return None
+    return [cast(tuple[str, str, float], tuple(r)) for r in cached]
 
 
 def cache_nlp_results(text: str, results: list[tuple[str, str, float]]) -> None:
     """Cache NLP results for the given text."""
-    conn = get_nlp_cache_db()
-    cursor = conn.cursor()
-
-    try:
-        cursor.execute(
-            "INSERT OR REPLACE INTO nlp_cache (input_text, results) VALUES (?, ?)",
-            (text, pickle.dumps(results)),
-        )
-        conn.commit()
-    except Exception as e:
-        print_debug(f"Failed to cache NLP results: {e}")
-    finally:
-        conn.close()
+    nlpCache.set("names", text, results)
 
 
 def restore_original_name(s: str, results: list[tuple[str, str, float]]) -> list[tuple[str, str, float]]:
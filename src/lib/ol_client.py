@@ -0,0 +1,153 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any
+
+import requests
+import requests_cache
+from requests.adapters import HTTPAdapter
+
+OL_BASE_URL = "https://openlibrary.org"
+# Concurrent requests to Open Library, which is also the size of the connection pool
+OL_MAX_CONNECTIONS = 4
+
+
+class RateLimiter:
+    """A token bucket that allows `rate` calls per second on average, in bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a call is allowed."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            # Reserve the token now and wait for it outside the lock, so waiters queue up in order
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class _RateLimitedAdapter(HTTPAdapter):
+    """Only requests that actually go out over the network pass through the adapter, so cached responses
+    don't count against the rate limit."""
+
+    def __init__(self, limiter: RateLimiter, **kwargs):
+        self.limiter = limiter
+        super().__init__(**kwargs)
+
+    def send(self, *args, **kwargs):
+        self.limiter.acquire()
+        return super().send(*args, **kwargs)
+
+
+class OpenLibraryClient:
+    """Fetches JSON from the Open Library API on a pool of `max_connections` threads sharing one pooled,
+    rate-limited session (cached for a day, unless `cache` is False).
+
+    Identical requests that are in flight at the same time, e.g. the same author being looked up for
+    several books at once, share a single request."""
+
+    def __init__(
+        self,
+        base_url: str = OL_BASE_URL,
+        *,
+        max_connections: int = OL_MAX_CONNECTIONS,
+        rate_limit: float | None = None,
+        cache: bool = True,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self._rate_limit = rate_limit
+        self._cache = cache
+        self._session: requests.Session | None = None
+        self._pool: ThreadPoolExecutor | None = None
+        self._inflight: dict[tuple[str, str], Future[Any]] = {}
+        self._lock = threading.RLock()
+
+    def __repr__(self):
+        return f"OpenLibraryClient({self.base_url}, {len(self._inflight)} in flight)"
+
+    @property
+    def session(self) -> requests.Session:
+        with self._lock:
+            if self._session is None:
+                from src.lib.config import cfg
+
+                rate = self._rate_limit if self._rate_limit is not None else cfg.OPEN_LIBRARY_RATE_LIMIT
+                if self._cache:
+                    session: requests.Session = requests_cache.CachedSession(
+                        str(cfg.META_DIR / "ol_cache"),
+                        backend="sqlite",
+                        expire_after=timedelta(days=1),
+                        ignored_parameters=["User-Agent"],
+                    )
+                else:
+                    session = requests.Session()
+                adapter = _RateLimitedAdapter(
+                    RateLimiter(rate, burst=self.max_connections),
+                    pool_connections=1,
+                    pool_maxsize=self.max_connections,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_connections, thread_name_prefix="ol-client")
+            return self._pool
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}{path}"
+
+    def _fetch(self, url: str, user_agent: str) -> Any:
+        response = self.session.get(url, headers={"User-Agent": user_agent})
+        response.raise_for_status()
+        return response.json()
+
+    def submit(self, path: str, user_agent: str = "") -> Future[Any]:
+        """Starts fetching `path` (e.g. "/search.json?q=...") and returns a future for its JSON, or the future
+        of the identical request that is already in flight."""
+        key = (self.url(path), user_agent)
+        with self._lock:
+            if (future := self._inflight.get(key)) is not None:
+                return future
+            future = self.pool.submit(self._fetch, *key)
+            self._inflight[key] = future
+
+            def done(f: Future[Any]):
+                with self._lock:
+                    if self._inflight.get(key) is f:
+                        del self._inflight[key]
+
+            future.add_done_callback(done)
+        return future
+
+    def get_json(self, path: str, user_agent: str = "") -> Any:
+        return self.submit(path, user_agent).result()
+
+    def close(self):
+        with self._lock:
+            if self._pool:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+            if self._session:
+                self._session.close()
+                self._session = None
+
+
+olClient = OpenLibraryClient()
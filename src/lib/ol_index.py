@@ -0,0 +1,306 @@
+"""A local, offline index of Open Library authors and works, built from the Open Library data dumps
+(https://openlibrary.org/developers/dumps), that answers the same searches as the Open Library API.
+
+Build it with:
+
+    poetry run build-ol-index ol_dump_authors_latest.txt.gz ol_dump_works_latest.txt.gz \\
+        [ol_dump_ratings_latest.txt.gz] [ol_dump_reading-log_latest.txt.gz]
+"""
+
+import argparse
+import gzip
+import json
+import re
+import sqlite3
+import threading
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any, TYPE_CHECKING
+
+from src.lib.term import print_debug
+
+if TYPE_CHECKING:
+    from src.lib.ol_lookup import OpenLibraryAuthorResult, OpenLibrarySearchResult
+
+OL_INDEX_FILE = "ol_index.db"
+# Bump this if the schema changes, so older indexes are ignored rather than misread
+OL_INDEX_VERSION = 1
+# The Open Library search API returns up to 100 docs per page
+SEARCH_LIMIT = 100
+
+_SCHEMA = """
+CREATE TABLE authors (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    alternate_names TEXT,
+    birth_date TEXT,
+    death_date TEXT,
+    work_count INTEGER NOT NULL DEFAULT 0,
+    ratings_count INTEGER NOT NULL DEFAULT 0,
+    want_to_read_count INTEGER NOT NULL DEFAULT 0,
+    currently_reading_count INTEGER NOT NULL DEFAULT 0,
+    already_read_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE works (
+    key TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    author_key TEXT NOT NULL DEFAULT '[]',
+    author_names TEXT NOT NULL DEFAULT '[]',
+    first_publish_year INTEGER,
+    ratings_count INTEGER NOT NULL DEFAULT 0,
+    want_to_read_count INTEGER NOT NULL DEFAULT 0,
+    currently_reading_count INTEGER NOT NULL DEFAULT 0,
+    read_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE work_authors (work_key TEXT NOT NULL, author_key TEXT NOT NULL);
+CREATE TABLE work_stats (work_key TEXT NOT NULL, stat TEXT NOT NULL);
+"""
+
+_SHELVES = {
+    "want to read": "want_to_read_count",
+    "currently reading": "currently_reading_count",
+    "already read": "read_count",
+}
+
+
+def _fts_query(s: str, column: str | None = None) -> str:
+    """Every word in `s` as a quoted FTS5 term, so punctuation and FTS operators in names are ignored."""
+    prefix = f"{column} : " if column else ""
+    return " AND ".join(f'{prefix}"{w}"' for w in re.findall(r"\w+", s.lower()))
+
+
+def _open_dump(path: Path) -> Iterator[str]:
+    with (gzip.open(path, "rt", encoding="utf-8") if path.suffix == ".gz" else open(path, encoding="utf-8")) as f:
+        yield from f
+
+
+def _short_key(key: str) -> str:
+    return key.rsplit("/", 1)[-1]
+
+
+def _year(s: Any) -> int | None:
+    return int(m.group()) if isinstance(s, str) and (m := re.search(r"\b\d{4}\b", s)) else None
+
+
+def build_index(dumps: Iterable[Path], db_path: Path) -> tuple[int, int]:
+    """Builds an index at `db_path` from Open Library dump files: the authors and works dumps (or the
+    complete dump), and optionally the ratings and reading log dumps. Returns the number of authors and
+    works indexed."""
+    tmp = db_path.with_name(f".{db_path.name}.tmp")
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(str(tmp))
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executescript(_SCHEMA)
+
+    for dump in dumps:
+        print_debug(f"Indexing {dump}")
+        with conn:
+            for line in _open_dump(dump):
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) == 5 and fields[0] == "/type/author":
+                    rec = json.loads(fields[4])
+                    if name := rec.get("name"):
+                        conn.execute(
+                            "INSERT OR REPLACE INTO authors (key, name, alternate_names, birth_date, death_date)"
+                            " VALUES (?, ?, ?, ?, ?)",
+                            (
+                                _short_key(fields[1]),
+                                name,
+                                json.dumps(rec["alternate_names"]) if rec.get("alternate_names") else None,
+                                rec.get("birth_date"),
+                                rec.get("death_date"),
+                            ),
+                        )
+                elif len(fields) == 5 and fields[0] == "/type/work":
+                    rec = json.loads(fields[4])
+                    if not (title := rec.get("title")):
+                        continue
+                    author_keys = [
+                        _short_key(a["author"]["key"])
+                        for a in rec.get("authors", [])
+                        if isinstance(a, dict) and isinstance(a.get("author"), dict) and "key" in a["author"]
+                    ]
+                    conn.execute(
+                        "INSERT OR REPLACE INTO works (key, title, author_key, first_publish_year) VALUES (?, ?, ?, ?)",
+                        (fields[1], title, json.dumps(author_keys), _year(rec.get("first_publish_date"))),
+                    )
+                    conn.executemany(
+                        "INSERT INTO work_authors VALUES (?, ?)", [(fields[1], k) for k in dict.fromkeys(author_keys)]
+                    )
+                elif len(fields) == 4 and fields[0].startswith("/works/"):
+                    # Ratings: work, edition, rating, date. Reading log: work, edition, shelf, date
+                    if fields[2].isdigit():
+                        conn.execute("INSERT INTO work_stats VALUES (?, 'ratings_count')", (fields[0],))
+                    elif stat := _SHELVES.get(fields[2].lower()):
+                        conn.execute("INSERT INTO work_stats VALUES (?, ?)", (fields[0], stat))
+
+    print_debug("Linking works to authors")
+    with conn:
+        conn.execute("CREATE INDEX work_authors_work ON work_authors (work_key)")
+        conn.execute("CREATE INDEX work_authors_author ON work_authors (author_key)")
+        conn.execute(
+            """
+            UPDATE works SET author_names = x.names FROM (
+                SELECT wa.work_key, json_group_array(a.name) AS names
+                FROM work_authors wa JOIN authors a ON a.key = wa.author_key
+                GROUP BY wa.work_key
+            ) AS x WHERE works.key = x.work_key
+        """
+        )
+        for stat in ("ratings_count", *_SHELVES.values()):
+            conn.execute(
+                f"""
+                UPDATE works SET {stat} = x.n FROM (
+                    SELECT work_key, count(*) AS n FROM work_stats WHERE stat = ? GROUP BY work_key
+                ) AS x WHERE works.key = x.work_key
+            """,
+                (stat,),
+            )
+        conn.execute(
+            """
+            UPDATE authors SET
+                work_count = x.work_count,
+                ratings_count = x.ratings_count,
+                want_to_read_count = x.want_to_read_count,
+                currently_reading_count = x.currently_reading_count,
+                already_read_count = x.read_count
+            FROM (
+                SELECT wa.author_key, count(*) AS work_count, sum(w.ratings_count) AS ratings_count,
+                    sum(w.want_to_read_count) AS want_to_read_count,
+                    sum(w.currently_reading_count) AS currently_reading_count, sum(w.read_count) AS read_count
+                FROM work_authors wa JOIN works w ON w.key = wa.work_key
+                GROUP BY wa.author_key
+            ) AS x WHERE authors.key = x.author_key
+        """
+        )
+        conn.execute("DROP TABLE work_authors")
+        conn.execute("DROP TABLE work_stats")
+
+    print_debug("Building search index")
+    with conn:
+        conn.execute(
+            "CREATE VIRTUAL TABLE authors_fts USING fts5("
+            "name, alternate_names, content='authors', content_rowid='rowid')"
+        )
+        conn.execute("INSERT INTO authors_fts (authors_fts) VALUES ('rebuild')")
+        conn.execute(
+            "CREATE VIRTUAL TABLE works_fts USING fts5(title, author_names, content='works', content_rowid='rowid')"
+        )
+        conn.execute("INSERT INTO works_fts (works_fts) VALUES ('rebuild')")
+        conn.execute(f"PRAGMA user_version = {OL_INDEX_VERSION}")
+    num_authors, num_works = (conn.execute(f"SELECT count(*) FROM {t}").fetchone()[0] for t in ("authors", "works"))
+    conn.execute("VACUUM")
+    conn.close()
+
+    tmp.replace(db_path)
+    return num_authors, num_works
+
+
+class OpenLibraryIndex:
+    """Searches an index built by `build_index`, returning docs shaped like the Open Library search API's,
+    so they can be scored the same way."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def __repr__(self):
+        return f"OpenLibraryIndex({self.db_path})"
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        if (conn := getattr(self._local, "conn", None)) is None:
+            conn = sqlite3.connect(f"{self.db_path.as_uri()}?mode=ro", uri=True)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def is_valid(self) -> bool:
+        try:
+            return self._conn.execute("PRAGMA user_version").fetchone()[0] == OL_INDEX_VERSION
+        except sqlite3.Error:
+            return False
+
+    def search_authors(self, q: str) -> tuple[list["OpenLibraryAuthorResult"], int]:
+        """Like https://openlibrary.org/search/authors.json?q=..., returns the matching author docs and the
+        total number found."""
+        if not (match := _fts_query(q)):
+            return [], 0
+        rows = self._conn.execute(
+            """
+            SELECT a.* FROM authors_fts JOIN authors a ON a.rowid = authors_fts.rowid
+            WHERE authors_fts MATCH ? ORDER BY a.work_count DESC, rank LIMIT ?
+        """,
+            (match, SEARCH_LIMIT),
+        ).fetchall()
+        found = self._conn.execute("SELECT count(*) FROM authors_fts WHERE authors_fts MATCH ?", (match,)).fetchone()[0]
+        docs = []
+        for r in rows:
+            doc: dict[str, Any] = {k: r[k] for k in r.keys() if r[k] is not None}
+            doc["type"] = "author"
+            if "alternate_names" in doc:
+                doc["alternate_names"] = json.loads(doc["alternate_names"])
+            docs.append(doc)
+        return docs, found  # type: ignore[return-value]
+
+    def search_titles(self, title: str, author: str | None = None) -> tuple[list["OpenLibrarySearchResult"], int]:
+        """Like https://openlibrary.org/search.json?title=...&author=..., returns the matching work docs and the
+        total number found."""
+        terms = [_fts_query(title, "title"), _fts_query(author, "author_names") if author else ""]
+        if not terms[0] or (author and not terms[1]):
+            return [], 0
+        match = " AND ".join(filter(None, terms))
+        rows = self._conn.execute(
+            """
+            SELECT w.* FROM works_fts JOIN works w ON w.rowid = works_fts.rowid
+            WHERE works_fts MATCH ? ORDER BY rank LIMIT ?
+        """,
+            (match, SEARCH_LIMIT),
+        ).fetchall()
+        found = self._conn.execute("SELECT count(*) FROM works_fts WHERE works_fts MATCH ?", (match,)).fetchone()[0]
+        docs = []
+        for r in rows:
+            doc: dict[str, Any] = {k: r[k] for k in r.keys() if r[k] is not None}
+            doc["author_key"] = json.loads(doc["author_key"])
+            doc["author_name"] = json.loads(doc.pop("author_names"))
+            doc["type"] = "work"
+            docs.append(doc)
+        return docs, found  # type: ignore[return-value]
+
+
+_indexes: dict[tuple[Path, int], OpenLibraryIndex | None] = {}
+
+
+def get_ol_index() -> OpenLibraryIndex | None:
+    """The local Open Library index in META_DIR, if there is one and OPEN_LIBRARY_INDEX is enabled."""
+    from src.lib.config import cfg
+
+    db_path = cfg.META_DIR / OL_INDEX_FILE
+    if not cfg.OPEN_LIBRARY_INDEX or not db_path.is_file():
+        return None
+    # Keyed by mtime too, so a rebuilt index is picked up without a restart
+    if (key := (db_path, db_path.stat().st_mtime_ns)) not in _indexes:
+        index = OpenLibraryIndex(db_path)
+        if not index.is_valid():
+            print_debug(f"Ignoring {db_path}, it was built by an older version - rebuild it with build-ol-index")
+            index = None
+        _indexes[key] = index
+    return _indexes[key]
+
+
+def main():
+    from src.lib.config import cfg
+
+    parser = argparse.ArgumentParser(description="Build a local Open Library index from the Open Library dumps")
+    parser.add_argument("dumps", nargs="+", type=Path, help="Open Library dump files (.txt or .txt.gz)")
+    parser.add_argument("--out", type=Path, help=f"Where to write the index, default is META_DIR/{OL_INDEX_FILE}")
+    args = parser.parse_args()
+
+    out = args.out or cfg.META_DIR / OL_INDEX_FILE
+    num_authors, num_works = build_index(args.dumps, out)
+    print(f"Indexed {num_authors} authors and {num_works} works in {out}")
+
+
+if __name__ == "__main__":
+    main()
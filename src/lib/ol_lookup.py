@@ -1,21 +1,13 @@
 import re
 import sys
 import urllib.parse
-from datetime import timedelta
 from math import log10
-from typing import Any, Literal, NotRequired, overload, TypedDict
+from typing import Any, cast, Literal, NotRequired, overload, TypedDict
 
-import requests
-import requests_cache
 from rapidfuzz import fuzz
 
 from lib.misc import max_if, re_group
 from lib.term import print_debug
-from src.lib.config import cfg
-
-requests_cache.install_cache(
-    str(cfg.META_DIR / "ol_cache"), backend="sqlite", expire_after=timedelta(days=1), ignored_parameters=["User-Agent"]
-)
 
 OpenLibraryAuthorResult = TypedDict(
     "OpenLibraryAuthorResult",
@@ -137,6 +129,52 @@ def _get_open_library_user_agent() -> str | None:
     return f"{app_name}/{version} ({email})"
 
 
+SearchResults = list[tuple[list[dict[str, Any]], int]]
+
+
+def _search_authors(names: list[str], agent_string: str | None) -> SearchResults:
+    """Searches for each of `names` in the local Open Library index if there is one, otherwise with the API,
+    all at once. Returns the author docs and the total number found for each."""
+    from src.lib.ol_client import olClient
+    from src.lib.ol_index import get_ol_index
+
+    if index := get_ol_index():
+        return cast(SearchResults, [index.search_authors(name) for name in names])
+    futures = [
+        olClient.submit(f"/search/authors.json?q={urllib.parse.quote_plus(name)}", agent_string or "")
+        for name in names
+    ]
+    return [(data.get("docs", []), data["numFound"]) for data in (f.result() for f in futures)]
+
+
+def _search_titles(queries: list[tuple[str, str | None]], agent_string: str | None) -> SearchResults:
+    """Searches for each (title, author) in `queries` in the local Open Library index if there is one,
+    otherwise with the API, all at once. Returns the work docs and the total number found for each."""
+    from src.lib.ol_client import olClient
+    from src.lib.ol_index import get_ol_index
+
+    if index := get_ol_index():
+        return cast(SearchResults, [index.search_titles(title, author) for title, author in queries])
+    futures = [
+        olClient.submit(
+            f"/search.json?title={urllib.parse.quote_plus(title)}"
+            + (f"&author={urllib.parse.quote_plus(author)}" if author else ""),
+            agent_string or "",
+        )
+        for title, author in queries
+    ]
+    return [(data.get("docs", []), data["numFound"]) for data in (f.result() for f in futures)]
+
+
+def _can_lookup() -> tuple[bool, str | None]:
+    """Whether authors and titles can be looked up, and the user agent to use with the API. The API needs a
+    user agent, the local index doesn't."""
+    from src.lib.ol_index import get_ol_index
+
+    agent_string = _get_open_library_user_agent()
+    return bool(agent_string or get_ol_index()), agent_string
+
+
 def _in_alternate_names(name: str, doc: dict[str, Any]) -> bool:
     """Check if name is in the alternate_names list of the doc"""
     if not (alternate_names := doc.get("alternate_names", None)):
@@ -333,7 +371,7 @@ class OpenLibraryAuthor:
 def open_library_lookup_author(
     author: str, *, method: Literal["score", "similarity"] = "score"
 ) -> OpenLibraryAuthor | None:
-    """Queries the Open Library API to get the author's score.
+    """Queries the Open Library API (or the local index, see `ol_index`) to get the author's score.
 
     Make sure you follow their rules for identifying your application:
     https://openlibrary.org/developers/api
@@ -346,8 +384,8 @@ def open_library_lookup_author(
     OPEN_LIBRARY_USER_AGENT=MyAppName/1.0 (myemail@example.com)
     """
 
-    agent_string = _get_open_library_user_agent()
-    if not agent_string:
+    ok, agent_string = _can_lookup()
+    if not ok:
         return None
 
     try:
@@ -357,15 +395,10 @@ def open_library_lookup_author(
         matches = []
         exact_matches = []
         found = 0
-        for name in list(set([author_lower, author_no_periods, author_period_spaces])):
-            url = f"https://openlibrary.org/search/authors.json?q={urllib.parse.quote_plus(name)}"
-            response = requests.get(url, headers={"User-Agent": agent_string})
-            response.raise_for_status()
-            data = response.json()
-            matches.extend(
-                [OpenLibraryAuthorResult(**d) for d in data.get("docs", []) if d.get("type", "") == "author"]
-            )
-            found += data["numFound"]
+        names = list(set([author_lower, author_no_periods, author_period_spaces]))
+        for name, (docs, num_found) in zip(names, _search_authors(names, agent_string)):
+            matches.extend([OpenLibraryAuthorResult(**d) for d in docs if d.get("type", "") == "author"])
+            found += num_found
             exact_matches.extend(
                 [
                     OpenLibraryAuthorResult(**d)
@@ -540,7 +573,7 @@ def open_library_lookup_title(
     narrator: str | None = None,
     method: Literal["score", "similarity"] = "score",
 ) -> OpenLibraryTitle | None:
-    """Queries the Open Library API to get the title's score.
+    """Queries the Open Library API (or the local index, see `ol_index`) to get the title's score.
 
     Make sure you follow their rules for identifying your application:
     https://openlibrary.org/developers/api
@@ -555,8 +588,8 @@ def open_library_lookup_title(
 
     from src.lib.patterns import junk_chars_title_pattern, title_chunk_pattern
 
-    agent_string = _get_open_library_user_agent()
-    if not agent_string:
+    ok, agent_string = _can_lookup()
+    if not ok:
         return None
 
     author_result = (None, 0.0)
@@ -578,21 +611,11 @@ def open_library_lookup_title(
 
         matches = []
         found = 0
-        for t in list(set([title_lower, title_no_periods, title_no_punctuation, title_unchunked])):
-            urls = (
-                [
-                    f"https://openlibrary.org/search.json?title={urllib.parse.quote_plus(t)}&author={urllib.parse.quote_plus(a)}"
-                    for a in authors
-                ]
-                if authors
-                else [f"https://openlibrary.org/search.json?title={urllib.parse.quote_plus(t)}"]
-            )
-            for url in urls:
-                response = requests.get(url, headers={"User-Agent": agent_string})
-                response.raise_for_status()
-                data = response.json()
-                matches.extend([OpenLibrarySearchResult(**d) for d in data.get("docs", [])])
-                found += data["numFound"]
+        titles = list(set([title_lower, title_no_periods, title_no_punctuation, title_unchunked]))
+        queries: list[tuple[str, str | None]] = [(t, a) for t in titles for a in authors or [None]]
+        for docs, num_found in _search_titles(queries, agent_string):
+            matches.extend([OpenLibrarySearchResult(**d) for d in docs])
+            found += num_found
 
         return OpenLibraryTitle(
             *_find_best_title(title, matches, author=author, narrator=narrator, method=method),
@@ -1,7 +1,5 @@
 import os
-import pickle
 import re
-import sqlite3
 import string
 from collections.abc import Generator, Iterable
 from dataclasses import dataclass
@@ -11,9 +9,7 @@ from typing import Any, cast, Literal, overload, TYPE_CHECKING, TypeVar
 
 import cachetools
 import cachetools.func
-from nltk import pos_tag, word_tokenize
 
-from lib import nlp
 from lib.cleaners import clean_name_abbreviations
 from lib.ol_lookup import open_library_lookup_author
 from src.lib.misc import (
@@ -22,10 +18,9 @@ from src.lib.misc import (
     re_group,
 )
 from src.lib.nlp import (
-    english_words,
-    inflect,
-    nlp,
-    nlp_trf,
+    cache_nlp_results,
+    get_cached_nlp_results,
+    nlpModels,
     restore_original_name,
     squash_nlp_results,
     squash_trf_results,
@@ -37,6 +32,7 @@ from src.lib.typing import AuthorNarrator, MEMO_TTL, NameParserTarget
 
 if TYPE_CHECKING:
     from src.lib.audiobook import Audiobook
+    from src.lib.books_tree import BooksTree
 
 
 S = TypeVar("S", bound=str | Path)
@@ -224,17 +220,12 @@ def startswith_partno(s: str, s2: str | None = None) -> bool:
     return bool(get_start_num(s) >= 0)
 
 
-def extract_path_info(book: "Audiobook", console: bool = False) -> "Audiobook":
+def common_file_name(tree: "BooksTree") -> str:
+    """The text common to the names of all of a book's files, without part numbers or junk."""
     from src.lib.cleaners import strip_part_number
 
-    dir_title = re_group(book_title_pattern.search(book.basename), "book_title")
-    dir_author = parse_author(book.basename, "fs", fallback="")
-    dir_nlp_people, dir_nlp_titles = spaCy_extract(book.basename)
-    dir_year = re_group(year_pattern.search(book.basename), "year")
-    dir_narrator = parse_narrator(book.basename, "fs", fallback="")
-
     # remove suffix/extension from files
-    files = [f.path.stem for f in book.tree.files_recursive]
+    files = [f.path.stem for f in tree.files_recursive]
     # Get filename common text
     orig_file_name = find_greatest_common_string(files)
 
@@ -245,7 +236,32 @@ def extract_path_info(book: "Audiobook", console: bool = False) -> "Audiobook":
     orig_file_name = orig_file_name.replace("_", " ")
 
     # strip leading and trailing -._ spaces and punctuation
-    orig_file_name = path_junk_pattern.sub("", orig_file_name)
+    return path_junk_pattern.sub("", orig_file_name)
+
+
+def prefetch_nlp(trees: Iterable["BooksTree"]):
+    """Runs the folder and file names of every book in `trees` through the NER models in batches, ahead of
+    `extract_path_info` parsing them one book at a time. Strings are prepared the same way `spaCy_extract`
+    and `get_nlp_names` prepare them, so those calls are served from the cache."""
+    if not nlpModels.enabled:
+        return
+    texts = []
+    for tree in trees:
+        for name in (tree.path.name, common_file_name(tree)):
+            for variant in (name, swap_firstname_lastname_in_long(name)):
+                texts.append(strip_leading_nums_and_punct(variant))
+                texts.append(strip_leading_nums_and_punct(junk_chars_name_pattern.sub("", variant)))
+    nlpModels.prefetch(texts)
+
+
+def extract_path_info(book: "Audiobook", console: bool = False) -> "Audiobook":
+    dir_title = re_group(book_title_pattern.search(book.basename), "book_title")
+    dir_author = parse_author(book.basename, "fs", fallback="")
+    dir_nlp_people, dir_nlp_titles = spaCy_extract(book.basename)
+    dir_year = re_group(year_pattern.search(book.basename), "year")
+    dir_narrator = parse_narrator(book.basename, "fs", fallback="")
+
+    orig_file_name = common_file_name(book.tree)
 
     file_title = re_group(book_title_pattern.search(orig_file_name), "book_title")
     file_author = parse_author(orig_file_name, "fs", fallback="")
@@ -420,21 +436,21 @@ def get_name_from_str(s: str, max_words=6) -> str:
 
 def is_generic_word(word):
     # Load English words from nltk corpus
-    return word.lower() in english_words
+    return word.lower() in nlpModels.english_words
 
 
 def get_singular(word):
-    return word if not inflect.singular_noun(word) else inflect.singular_noun(word)
+    return word if not (singular := nlpModels.inflect.singular_noun(word)) else singular
 
 
 # Basic name scoring fallback
 def heuristic_score(name: str) -> float:
-    tokens = word_tokenize(name)
+    tags = nlpModels.pos_tag(name)
 
-    if not tokens:
+    if not tags:
         return 0.0
 
-    tags = pos_tag(tokens)
+    tokens = [token for token, _ in tags]
 
     # Score based on heuristics
     score = 0
@@ -451,6 +467,8 @@ def heuristic_score(name: str) -> float:
 
 def lookup_and_score_names(candidates: list[tuple[str, str, float]]) -> list[tuple[str, str, float]]:
     scores = {}
+    # Parse all the candidates in one batch
+    nlpModels.docs([name for name, label, _ in candidates if not label.endswith("SPACY")])
     for name, label, existing_score in candidates:
         entity_score = existing_score if existing_score is not None else 0.0
         entity_label = label
@@ -460,7 +478,7 @@ def lookup_and_score_names(candidates: list[tuple[str, str, float]]) -> list[tup
 
         # Check if spaCy detects it as a PERSON entity
         if not label.endswith("SPACY"):
-            doc = nlp(name)
+            doc = nlpModels.doc(name)
             for ent in doc.ents:
                 if ent.label_.startswith("PER") and ent.text == name:
                     entity_score = (
@@ -737,7 +755,7 @@ def spaCy_extract(s: str) -> tuple[list[tuple[str, str, float]], list[tuple[str,
     """Extracts people and objects using spaCy's NER with transformer model."""
     s = strip_leading_nums_and_punct(s)
 
-    doc = nlp(s)
+    doc = nlpModels.doc(s)
 
     entities = []
 
@@ -766,7 +784,7 @@ def spaCy_extract(s: str) -> tuple[list[tuple[str, str, float]], list[tuple[str,
     entities = [(p, l, sc) for p, l, sc in entities if not any(j in p for j in junk_tokens)]
 
     # Add transformer results if we can derive them
-    trf = squash_trf_results(nlp_trf(s))
+    trf = squash_trf_results(nlpModels.trf(s))
     for ent in trf:
         # if any(k.startswith(ent["entity_group"]) for k in tuple(default_score_map.keys())):
         # If the entity as an exact match already exists, average the score and update it instead of adding
@@ -797,68 +815,15 @@ def spaCy_extract(s: str) -> tuple[list[tuple[str, str, float]], list[tuple[str,
     return people, objects
 
 
-def get_nlp_cache_db() -> sqlite3.Connection:
-    from src.lib.config import cfg
-
-    """Get or create the SQLite database connection for NLP caching."""
-    db_path = cfg.META_DIR / "nlp_cache.db"
-    conn = sqlite3.connect(str(db_path))
-
-    # Create table if it doesn't exist
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS nlp_cache (
-            input_text TEXT,
-            results BLOB,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            PRIMARY KEY (input_text)
-        )
-    """
-    )
-    return conn
-
-
-def get_cached_nlp_results(text: str) -> list[tuple[str, str, float]] | None:
-    """Get cached NLP results for the given text."""
-    conn = get_nlp_cache_db()
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT results FROM nlp_cache WHERE input_text = ?", (text,))
-    result = cursor.fetchone()
-    conn.close()
-
-    if result is not None:
-        try:
-            return pickle.loads(result[0])
-        except (pickle.UnpicklingError, EOFError):
-            return None
-    return None
-
-
-def cache_nlp_results(text: str, results: list[tuple[str, str, float]]) -> None:
-    """Cache NLP results for the given text."""
-    conn = get_nlp_cache_db()
-    cursor = conn.cursor()
-
-    try:
-        cursor.execute(
-            "INSERT OR REPLACE INTO nlp_cache (input_text, results) VALUES (?, ?)",
-            (text, pickle.dumps(results)),
-        )
-        conn.commit()
-    except Exception as e:
-        print_debug(f"Failed to cache NLP results: {e}")
-    finally:
-        conn.close()
-
-
 def get_nlp_names(s: str, *, no_cache: bool = False) -> list[tuple[str, str, float]]:
     """Extract name candidates using both NLTK and spaCy, score and rank."""
     # Try to get from cache first
     if not no_cache and (cached := get_cached_nlp_results(s)):
         return cached
 
+    if not nlpModels.enabled:
+        return []
+
     s = swap_firstname_lastname_in_long(s)
 
     from nltk import ne_chunk, pos_tag, word_tokenize
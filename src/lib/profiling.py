@@ -0,0 +1,109 @@
+import cProfile
+import functools
+import io
+import pstats
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import ParamSpec, TypeVar
+
+PROFILE_DIR = "profiles"
+# Functions listed in each profile's summary
+PROFILE_TOP_N = 30
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+_lock = threading.Lock()
+_active: cProfile.Profile | None = None
+_run_dir: Path | None = None
+
+
+def profiles_dir() -> Path:
+    """Where this run's profiles are saved, META_DIR/profiles/<startup time>."""
+    global _run_dir
+    from src.lib.config import cfg
+    from src.lib.term import print_dark_grey
+
+    with _lock:
+        if _run_dir is None or not _run_dir.is_relative_to(cfg.META_DIR):
+            _run_dir = cfg.META_DIR / PROFILE_DIR / datetime.now().strftime("%Y%m%d-%H%M%S")
+            print_dark_grey(f"Saving profiles in {_run_dir}")
+        return _run_dir
+
+
+def summarize(stats: pstats.Stats, title: str, top_n: int = PROFILE_TOP_N) -> str:
+    """The `top_n` functions by cumulative and by own time."""
+    out = io.StringIO()
+    out.write(f"{title}\n\n")
+    for sort in ("cumulative", "tottime"):
+        out.write(f"Top {top_n} by {sort} time:\n")
+        stats.stream = out  # type: ignore
+        stats.sort_stats(sort).print_stats(top_n)
+    return out.getvalue()
+
+
+def save_profile(profile: cProfile.Profile, name: str) -> Path:
+    """Saves `profile` as <name>.prof (for pstats, snakeviz, etc.) and a summary as <name>.txt. If a profile
+    with the same name was already saved, e.g. for each scan between two loops, they are combined."""
+    out_dir = profiles_dir()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    prof_file = out_dir / f"{name}.prof"
+    stats = pstats.Stats(profile)
+    if prof_file.exists():
+        stats.add(str(prof_file))
+    stats.dump_stats(prof_file)
+    title = f"{name}: {stats.total_calls} function calls in {stats.total_tt:.2f}s"  # type: ignore
+    prof_file.with_suffix(".txt").write_text(summarize(stats, title))
+    return prof_file
+
+
+@contextmanager
+def profiled(name: str, *, enabled: bool | None = None) -> Iterator[None]:
+    """Profiles the block with cProfile when PROFILE is on (or `enabled` is True) and saves it as `name`, see
+    `save_profile`. Blocks that run while another is being profiled are part of that profile. Only the
+    thread the block runs in is profiled, time spent waiting on other threads shows up as e.g. `acquire`."""
+    global _active
+    from src.lib.config import cfg
+    from src.lib.term import print_debug
+
+    if not (cfg.PROFILE if enabled is None else enabled):
+        yield
+        return
+
+    with _lock:
+        profile = cProfile.Profile() if _active is None else None
+        if profile:
+            _active = profile
+    if not profile:
+        yield
+        return
+
+    start = time.perf_counter()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        with _lock:
+            _active = None
+        elapsed = time.perf_counter() - start
+        prof_file = save_profile(profile, name)
+        print_debug(f"Profiled {name} ({elapsed:.2f}s), see {prof_file.with_suffix('.txt')}")
+
+
+def profiled_calls(name: Callable[..., str]) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """Decorator that profiles each call, see `profiled`. `name` is called with the same args to name it."""
+
+    def decorator(fn: Callable[P, R]) -> Callable[P, R]:
+        @functools.wraps(fn)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            with profiled(name(*args, **kwargs)):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
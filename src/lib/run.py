@@ -18,14 +18,18 @@ from src.lib.formatters import (
     truncate_middle,
 )
 from src.lib.converter import convert_book_native
+from src.lib.converter.checkpoint import resumable_tmp_dirs
 from src.lib.id3_utils import verify_and_update_id3_tags
 from src.lib.inbox_state import InboxItem, InboxState
 from src.lib.logger import log_global_results
 from src.lib.m4btool import M4bTool
+from src.lib.metrics import metrics
 from src.lib.misc import re_group
 from src.lib.parsers import (
+    prefetch_nlp,
     roman_numerals_affect_file_order,
 )
+from src.lib.scheduler import run_book_jobs, run_book_pipeline, working_dirs_lock
 from src.lib.strings import en
 from src.lib.term import (
     AMBER_COLOR,
@@ -231,16 +235,12 @@ def fail_book(book: Audiobook, reason: str = "unknown"):
             shutil.move(build_log, book.log_file)
 
 
+@metrics.timed("backup")
 def backup_ok(book: Audiobook):
     # Copy files to backup destination
+    from src.lib.backup import backup_files
     from src.lib.formatters import human_size
-    from src.lib.fs_utils import (
-        compare_dirs_by_files,
-        cp_dir_contents,
-        cp_file_into_dir,
-        dir_is_empty_ignoring_files,
-        find_too_small_files,
-    )
+    from src.lib.fs_utils import dir_is_empty_ignoring_files
 
     if not cfg.BACKUP:
         print_debug("Not backing up (backups are disabled)")
@@ -249,80 +249,30 @@ def backup_ok(book: Audiobook):
     else:
         ln = "Making a backup copy → "
         smart_print(f"{ln}{tint_path(linebreak_path(book.backup_dir, indent=len(ln)))}")
-        cp_dir_contents(book.inbox_dir, book.backup_dir, overwrite_mode="skip-silent")
-
-        fuzzy = 1000
-
-        # Check that files count and folder size match
-        orig_files_count = book.num_files("inbox")
-        orig_size_b = book.size("inbox", "bytes")
-        orig_size_human = book.size("inbox", "human")
-        orig_plural = pluralize(orig_files_count, "file")
-
-        backup_files_count = book.num_files("backup")
-        backup_size_b = book.size("backup", "bytes")
-        backup_size_human = book.size("backup", "human")
-        backup_plural = pluralize(backup_files_count, "file")
-
-        file_count_matches = orig_files_count == backup_files_count
-        size_matches = orig_size_b == backup_size_b
-        size_fuzzy_matches = abs(orig_size_b - backup_size_b) < fuzzy
+        result = backup_files(
+            book.inbox_dir,
+            book.backup_dir,
+            clone="hardlink" if cfg.BACKUP_HARDLINKS else "reflink",
+        )
 
-        expected = f"{orig_files_count} {orig_plural} ({orig_size_human})"
-        found = f"{backup_files_count} {backup_plural} ({backup_size_human})"
+        if result.failed:
+            print_error(
+                f"Backup failed - {len(result.failed)} {pluralize(len(result.failed), 'file')} in the backup did not match the original"
+            )
+            for f in result.failed:
+                print_grey(f"     - {f}")
+            smart_print("Skipping this book\n")
+            return False
 
-        if file_count_matches and size_matches:
-            print_grey(f"Backup successful - {backup_files_count} {orig_plural} ({backup_size_human})")
-        elif orig_files_count < backup_files_count or orig_size_b < backup_size_b:
-            print_grey(f"Backup successful, but extra data found in backup dir - expected {expected}, found {found}")
-            print_grey("Assuming this is a previous backup and continuing")
-        elif file_count_matches and size_fuzzy_matches:
-            print_grey(f"Backup successful, but sizes aren't exactly the same - expected {expected}, found {found}")
+        msg = f"Backup successful - {result.files} {pluralize(result.files, 'file')} ({human_size(result.size)})"
+        if result.unchanged:
+            msg += f", {result.unchanged} unchanged since the last backup"
+        print_grey(msg)
+        if result.kept:
+            print_grey(
+                f"{len(result.kept)} {pluralize(len(result.kept), 'file')} in the backup dir differ from the original and were not overwritten"
+            )
             print_grey("Assuming this is a previous backup and continuing")
-        elif file_count_matches and backup_size_b < orig_size_b - fuzzy:
-
-            if too_small_files := find_too_small_files(book.inbox_dir, book.backup_dir):
-                print_debug(
-                    f"Found {len(too_small_files)} files in backup that are smaller than the original, trying to re-copy them"
-                )
-
-                # re-copy the files that are too small
-                for f in too_small_files:
-                    cp_file_into_dir(f, book.backup_dir, overwrite_mode="overwrite-silent")
-
-                # re-check the size of the backup
-                if too_small_files := find_too_small_files(book.inbox_dir, book.backup_dir):
-                    print_error(
-                        f"Backup failed - expected {orig_size_human}, but backup is only {backup_size_human} (found {len(too_small_files)} files that are smaller than the original)"
-                    )
-                    smart_print("Skipping this book\n")
-                    return False
-        else:
-            # for each audio file in left, find it in right, and compare size of each.
-            # if the size is the same, remove it from the list of files to check.
-            left_right_files = compare_dirs_by_files(book.inbox_dir, book.backup_dir)
-            # if None in the 3rd column of left_right_files, a file is missing from the backup
-            missing_files = [f for f in left_right_files if f[2] is None]
-            if missing_files:
-                print_error(
-                    f"Backup failed - {len(missing_files)} {pluralize(len(missing_files), 'file')} missing from backup"
-                )
-                smart_print("Skipping this book\n")
-                return False
-            # compare the size of each file in the list of files to check
-            for left, l_size, _, r_size in left_right_files:
-                if l_size != r_size:
-                    l_human_size = human_size(l_size)
-                    r_human_size = human_size(r_size)
-                    print_error(
-                        f"Backup failed - size mismatch for {left} - original is {l_human_size}, but backup is {r_human_size}"
-                    )
-                    smart_print("Skipping this book\n")
-                    return False
-            if expected != found:
-                print_error(f"Backup failed - expected {expected}, found {found}")
-                smart_print("Skipping this book\n")
-                return False
 
     return True
 
@@ -379,12 +329,18 @@ def check_failed_books():
         #     print_debug(f"{book_name} hash is the same, keeping it in failed books")
 
 
+@metrics.timed("copy_to_working_dir")
 def copy_to_working_dir(book: Audiobook):
     from src.lib.fs_utils import cp_dir, cp_file_into_dir
 
     # Move from inbox to merge folder
     smart_print("\nCopying files to working folder...", end="")
-    cp_dir(book.inbox_dir, book.merge_dir.parent, overwrite_mode="overwrite-silent")
+    cp_dir(
+        book.inbox_dir,
+        book.merge_dir.parent,
+        overwrite_mode="overwrite-silent",
+        clone="hardlink" if cfg.LINK_WORKING_FILES else "reflink",
+    )
     # copy book.cover_art to merge folder
     if book.cover_art_file and not book.cover_art_file.exists():
         cp_file_into_dir(book.cover_art_file, book.merge_dir, overwrite_mode="overwrite-silent")
@@ -544,6 +500,7 @@ def print_book_info(book: "Audiobook"):
     nl()
 
 
+@metrics.timed("convert")
 def convert_book(book: Audiobook):
     if not book.merge_dir.exists():
         raise FileNotFoundError(
@@ -693,6 +650,7 @@ def print_moving_to_converted(book):
     smart_print(f"{ln}{tint_path(linebreak_path(book.converted_file, indent=len(ln)))}")
 
 
+@metrics.timed("move_converted")
 def move_converted_book_and_extras(book: Audiobook):
     from src.lib.fs_utils import mv_dir_contents, mv_file_into_dir, rm_all_empty_dirs
 
@@ -801,6 +759,7 @@ def cleanup_series_dir(parent: InboxItem | None):
         print_mint(" ✓")
 
 
+@metrics.timed("archive")
 def archive_inbox_book(book: Audiobook):
     from src.lib.fs_utils import is_ok_to_delete, mv_dir_contents, rm_dir
     from src.lib.term import print_notice, print_warning
@@ -838,8 +797,10 @@ def archive_inbox_book(book: Audiobook):
         print_mint(" ✓")
 
 
-def process_book(b: int, item: InboxItem):
-    from src.lib.fs_utils import clean_dirs, rm_all_empty_dirs, rm_dirs, was_recently_modified
+def prepare_book(b: int, item: InboxItem) -> tuple[int, Audiobook | None]:
+    """Checks, backs up and copies a book to the working dir. Returns the book if it's ready to be
+    converted, or None if it was skipped, failed, or didn't need converting."""
+    from src.lib.fs_utils import clean_dirs, rm_all_empty_dirs, was_recently_modified
     from src.lib.term import print_notice
 
     inbox = InboxState()
@@ -848,12 +809,12 @@ def process_book(b: int, item: InboxItem):
 
     if not item.path.exists():
         print_notice(f"This book was removed from the inbox or cannot be accessed, skipping")
-        return b
+        return b, None
 
     # check if the current dir was modified in the last 1m and skip if so
     if was_recently_modified(book.inbox_dir):
         print_notice(en.BOOK_RECENTLY_MODIFIED)
-        return b
+        return b, None
 
     if inbox.should_retry(book):
         nl()
@@ -866,55 +827,59 @@ def process_book(b: int, item: InboxItem):
         if book.orig_file_type == "m4b":
             b += process_already_m4b(book, item)
             if item.is_gone:
-                return b
+                return b, None
         elif book.tree.is_file():
             book, item = move_standalone_into_dir(book, item)
 
     if not has_audio_files(book):
-        return b
+        return b, None
 
     if book.tree.has_structure("mixed"):
         print_error(en.MULTI_ERR)
         fail_book(book, en.MULTI_ERR)
-        return b
+        return b, None
 
     if not can_process_multi_dir(book):
-        return b
+        return b, None
 
     if book.tree.has_structure("series_parent"):
-        return b
+        return b, None
 
     if not can_process_roman_numeral_book(book):
-        return b
+        return b, None
 
     print_book_info(book)
 
     if not backup_ok(book):
-        return b
+        return b, None
 
     flatten_nested_book(book)
 
     if not ok_to_overwrite(book):
-        return b
+        return b, None
 
     inbox.set_ok(book)
 
-    copy_to_working_dir(book)
+    with working_dirs_lock:
+        copy_to_working_dir(book)
 
-    book.extract_path_info(console=True)
+    with metrics.span("extract_path_info", book):
+        book.extract_path_info(console=True)
     book.extract_metadata(console=True)
 
-    clean_dirs([book.build_dir, book.build_tmp_dir])
-    rm_all_empty_dirs(cfg.merge_dir)
+    with working_dirs_lock:
+        clean_dirs([book.build_dir, book.build_tmp_dir], keep=resumable_tmp_dirs(book.build_dir))
+        rm_all_empty_dirs(cfg.merge_dir)
 
     book.set_active_dir("build")
 
     nl()
+    return b, book
 
-    # TODO: Only handles single m4b output file, not multiple files.
 
-    if (elapsedtime := convert_book(book)) is False:
-        return b
+def finish_book(b: int, book: Audiobook, elapsedtime: int) -> int:
+    """Moves a converted book to the converted folder, then archives (or deletes) the original."""
+    from src.lib.fs_utils import rm_dirs
 
     book.converted_dir.mkdir(parents=True, exist_ok=True)
 
@@ -936,7 +901,46 @@ def process_book(b: int, item: InboxItem):
     return b
 
 
+def print_stage_times(timings: dict[str, float], elapsed: float):
+    stages = " · ".join(f"{name} {human_elapsed_time(secs, relative=False)}" for name, secs in timings.items())
+    print_dark_grey(f"Time per stage: {stages} (total {human_elapsed_time(elapsed, relative=False)})")
+
+
+def scan_inbox_only(loop: int = 1):
+    """Builds the inbox's tree and determines the structure of every book in it, like the first scan of the
+    inbox, but without the scan cache and without converting or moving anything. For profiling the scan
+    (see --profile) on a copy of real data."""
+    from src.lib.books_tree import BooksTree
+    from src.lib.profiling import profiled
+
+    print_grey(f"Scanning {cfg.inbox_dir} (scan only, nothing will be converted)...")
+    starttime = time.perf_counter()
+    with profiled(f"loop-{loop:04d}-scan-only"):
+        tree = BooksTree(cfg.inbox_dir, scan=False).scan(scan_id3=True)
+    elapsed = time.perf_counter() - starttime
+
+    found = tree.books_and_series
+    if cfg.DEBUG:
+        from src.lib.scorers import scorerCache
+
+        for t in found:
+            print_list_item(f"{t.rel_path} {tint_light_grey(", ".join(t.structure))}")
+        print_debug(f"Scorer cache: {scorerCache.hits} hits, {scorerCache.misses} misses")
+    num_series = sum(t.has_structure("series_parent") for t in found)
+    smart_print(
+        f"Found {pluralize_with_count(len(found) - num_series, 'book')} and "
+        f"{pluralize_with_count(num_series, 'series', 'series')} in {elapsed:.2f}s"
+    )
+    return tree
+
+
 def process_inbox():
+    # Every book's stages are timed and exported at the end of the loop, see metrics.Metrics
+    with metrics.loop(InboxState().loop_counter):
+        _process_inbox()
+
+
+def _process_inbox():
     from src.lib.fs_utils import clean_dirs, inbox_last_updated_at
     from src.lib.run import audio_files_found, print_banner
     from src.lib.term import print_debug
@@ -970,14 +974,36 @@ def process_inbox():
 
     inbox.start()
 
-    b = 0
-    for item in inbox.matched_ok_books.values():
-        b = process_book(b, item)
+    def encode(prepared: tuple[int, Audiobook | None]) -> tuple[int, Audiobook | None, "int | Literal[False]"]:
+        b, book = prepared
+        # TODO: Only handles single m4b output file, not multiple files.
+        return b, book, convert_book(book) if book else False
+
+    def finish(item: InboxItem, encoded: tuple[int, Audiobook | None, "int | Literal[False]"]) -> int:
+        converted, book, elapsedtime = encoded
+        if book and elapsedtime is not False:
+            converted = finish_book(converted, book, elapsedtime)
         divider("\n", "\n")
 
         if item.is_series_book and item.is_last_book_in_series:
             cleanup_series_dir(item.series_parent)
+        return converted
+
+    items = list(inbox.matched_ok_books.values())
+    if len(items) > 1:
+        # Batch the NER for every book's names up front rather than one small pass per book
+        prefetch_nlp(item.tree for item in items if item.path.exists())
+
+    # Stages of different books run on their own threads; the InboxState lock keeps their status updates safe
+    if cfg.PIPELINE_BOOKS and cfg.USE_NATIVE_CONVERTER and cfg.PARALLEL_BOOKS <= 1 and len(items) > 1:
+        starttime = time.time()
+        b, timings = run_book_pipeline(
+            items, [("copy", lambda item: prepare_book(0, item)), ("encode", encode)], ("finalize", finish)
+        )
+        print_stage_times(timings, time.time() - starttime)
+    else:
+        b = run_book_jobs(items, lambda item: finish(item, encode(prepare_book(0, item))))
 
     print_footer(b)
-    clean_dirs([cfg.merge_dir, cfg.build_dir, cfg.trash_dir])
+    clean_dirs([cfg.merge_dir, cfg.build_dir, cfg.trash_dir], keep=resumable_tmp_dirs(cfg.build_dir))
     inbox.done()
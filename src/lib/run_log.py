@@ -0,0 +1,142 @@
+import json
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from pathlib import Path
+from typing import Any
+
+# The fields of a run log entry, in the order they're shown in the global log table
+LOG_FIELDS = [
+    "date",
+    "result",
+    "book_name",
+    "bitrate",
+    "samplerate",
+    "file_type",
+    "num_files",
+    "size",
+    "duration",
+    "elapsed",
+]
+
+
+def normalize_book_name(name: str) -> str:
+    return " ".join(name.split())
+
+
+class RunLog:
+    """An append-only log of converted and failed books, one JSON object per line.
+
+    Entries are never rewritten, so writing one is cheap no matter how long the log gets. Lookups by book
+    name go through an index of line offsets that is built on first use and then kept up to date from the
+    end of the file, so entries written by other processes are picked up too."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._index: dict[str, list[int]] = {}
+        self._indexed_to = 0
+        self._lock = threading.RLock()
+
+    def __repr__(self):
+        return f"RunLog({self.path})"
+
+    def __len__(self):
+        with self._lock:
+            self._update_index()
+            return sum(len(offsets) for offsets in self._index.values())
+
+    def _update_index(self):
+        if not self.path.exists():
+            self._index.clear()
+            self._indexed_to = 0
+            return
+        size = self.path.stat().st_size
+        if size < self._indexed_to:
+            # The file was replaced or truncated, start over
+            self._index.clear()
+            self._indexed_to = 0
+        if size == self._indexed_to:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._indexed_to)
+            offset = self._indexed_to
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Partially written by another process, pick it up next time
+                    break
+                if entry := self._decode(line):
+                    self._index.setdefault(normalize_book_name(entry.get("book_name", "")), []).append(offset)
+                offset += len(line)
+            self._indexed_to = offset
+
+    @staticmethod
+    def _decode(line: bytes) -> dict[str, Any] | None:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            return None
+        return entry if isinstance(entry, dict) else None
+
+    def _read_at(self, offsets: list[int]) -> list[dict[str, Any]]:
+        entries = []
+        with open(self.path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                if entry := self._decode(f.readline()):
+                    entries.append(entry)
+        return entries
+
+    def append(self, entry: dict[str, Any]):
+        self.extend([entry])
+
+    def extend(self, entries: Iterable[dict[str, Any]]):
+        data = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries).encode()
+        if not data:
+            return
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # A single write in append mode, so concurrent writers can't interleave partial lines
+            with open(self.path, "ab") as f:
+                f.write(data)
+
+    def create(self, load: Callable[[], Iterable[dict[str, Any]]]) -> bool:
+        """Creates the log with the entries returned by `load` if it doesn't exist yet, and returns whether it
+        did. Only one thread gets to call `load`, so e.g. an older log can't be imported twice."""
+        if self.path.exists():
+            return False
+        with self._lock:
+            if self.path.exists():
+                return False
+            self.extend(load())
+            self.path.touch(exist_ok=True)
+            return True
+
+    def find(self, book_name: str) -> list[dict[str, Any]]:
+        """Returns every entry for `book_name`, oldest first."""
+        with self._lock:
+            self._update_index()
+            offsets = self._index.get(normalize_book_name(book_name), [])
+            return self._read_at(offsets) if offsets else []
+
+    def last(self, book_name: str) -> dict[str, Any] | None:
+        entries = self.find(book_name)
+        return entries[-1] if entries else None
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        if not self.path.exists():
+            return
+        with open(self.path, "rb") as f:
+            for line in f:
+                if entry := self._decode(line):
+                    yield entry
+
+
+_run_logs: dict[Path, RunLog] = {}
+_run_logs_lock = threading.Lock()
+
+
+def get_run_log(path: Path) -> RunLog:
+    """Returns the shared RunLog for `path`, so its index is only built once per process."""
+    with _run_logs_lock:
+        if (run_log := _run_logs.get(path)) is None:
+            run_log = _run_logs[path] = RunLog(path)
+        return run_log
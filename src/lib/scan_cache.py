@@ -0,0 +1,162 @@
+import hashlib
+import pickle
+import sqlite3
+from functools import cache
+from pathlib import Path
+from typing import NamedTuple, TYPE_CHECKING
+
+from src.lib.id3_tags import CacheValue, id3Cache
+from src.lib.term import print_debug
+from src.lib.typing import BookStructure2
+
+if TYPE_CHECKING:
+    from src.lib.books_tree.books_tree import BooksTree
+
+# Bump this to throw away every cached entry, e.g. if the pickled format changes
+SCAN_CACHE_VERSION = 1
+
+
+class CachedEntry(NamedTuple):
+    """Everything worth keeping about a top-level inbox entry, keyed by path relative to the inbox."""
+
+    structures: dict[str, tuple[BookStructure2, ...]]
+    id3: dict[str, CacheValue]
+
+
+@cache
+def _code_version() -> str:
+    """Cached structures are only as good as the scoring code that determined them, so the source of the
+    modules that decide a book's structure is part of every cache key."""
+    from src.lib import scorers
+    from src.lib.books_tree import books_tree, books_tree_summary
+
+    h = hashlib.md5(str(SCAN_CACHE_VERSION).encode())
+    for m in (scorers, books_tree, books_tree_summary):
+        h.update(Path(m.__file__).read_bytes())
+    return h.hexdigest()
+
+
+class ScanCache:
+    """A persistent cache (SQLite, in cfg.META_DIR) of each top-level book or series folder's determined
+    structure and the ID3 tags of its files, keyed by the folder's `InboxSnapshot` fingerprint. On a warm
+    restart with an unchanged inbox, this skips both the ffprobe calls for every file and the scorers."""
+
+    def __init__(self, root: Path, db_path: Path | None = None):
+        from src.lib.config import cfg
+
+        self.root = Path(root)
+        self.db_path = db_path or cfg.META_DIR / "scan_cache.db"
+        self._entries: dict[str, CachedEntry] = {}
+        # The key each top-level name was last loaded or saved with, so unchanged entries aren't re-written
+        self._keys: dict[str, str] = {}
+
+    def __repr__(self):
+        return f"ScanCache({self.root} -- {len(self._entries)} entries loaded)"
+
+    def _key(self, fingerprint: str, match_filter: object) -> str:
+        return hashlib.md5(f"{fingerprint}|{match_filter or ''}|{_code_version()}".encode()).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path))
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS scan_cache (
+                inbox TEXT,
+                name TEXT,
+                key TEXT,
+                entry BLOB,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (inbox, name)
+            )
+        """
+        )
+        return conn
+
+    def load(self, fingerprints: dict[str, str], match_filter: object = None) -> set[str]:
+        """Loads the cached entries that still match `fingerprints`, and seeds the in-memory ID3 tag cache
+        with their tags. Entries for names that are no longer in the inbox are deleted. Returns the top-level
+        names that were found."""
+        self._entries = {}
+        try:
+            conn = self._connect()
+            try:
+                gone = []
+                rows = conn.execute("SELECT name, key, entry FROM scan_cache WHERE inbox = ?", (str(self.root),))
+                for name, key, blob in rows.fetchall():
+                    if (fp := fingerprints.get(name)) is None:
+                        gone.append((str(self.root), name))
+                    elif key == self._key(fp, match_filter):
+                        self._entries[name] = CachedEntry(*pickle.loads(blob))
+                        self._keys[name] = key
+                with conn:
+                    conn.executemany("DELETE FROM scan_cache WHERE inbox = ? AND name = ?", gone)
+            finally:
+                conn.close()
+        except (sqlite3.Error, pickle.UnpicklingError, EOFError, TypeError) as e:
+            print_debug(f"Could not load scan cache from {self.db_path}: {e}")
+            self._entries = {}
+
+        for entry in self._entries.values():
+            for rel, tags in entry.id3.items():
+                id3Cache.set(str(self.root / rel), tags)
+        return set(self._entries)
+
+    def apply(self, tree: "BooksTree") -> set[str]:
+        """Restores the cached structure of every node in each loaded top-level dir of `tree`, so that
+        `determine_structure` skips them. A dir is only restored if every node in it was cached. Standalone
+        files at the root of the inbox are scored against each other, so they are always re-scored."""
+        restored = set()
+        for name, d in tree._dirs.items():
+            if not (entry := self._entries.get(name)):
+                continue
+            nodes = [d, *d.children_recursive]
+            rels = [str(n.path.relative_to(self.root)) for n in nodes]
+            if not all(rel in entry.structures for rel in rels):
+                # Re-save it once its structure has been determined again
+                self._keys.pop(name, None)
+                continue
+            for n, rel in zip(nodes, rels):
+                n.structure = entry.structures[rel]
+            restored.add(name)
+        return restored
+
+    def save(self, tree: "BooksTree", fingerprints: dict[str, str], match_filter: object = None):
+        """Stores the structure and ID3 tags of every top-level entry in `tree` whose fingerprint changed
+        since it was last loaded or saved, and forgets entries that are no longer in the inbox."""
+        rows = []
+        for c in (*tree._dirs.values(), *tree._files):
+            if (fp := fingerprints.get(c.name)) is None or not c.structure:
+                continue
+            if self._keys.get(c.name) == (key := self._key(fp, match_filter)):
+                continue
+            nodes = [c, *c.children_recursive]
+            entry = CachedEntry(
+                structures={str(n.path.relative_to(self.root)): n.structure for n in nodes},
+                id3={
+                    str(f.path.relative_to(self.root)): tags
+                    for f in nodes
+                    if f.is_file() and (tags := id3Cache.get(str(f.path))) is not None
+                },
+            )
+            rows.append((str(self.root), c.name, key, pickle.dumps(tuple(entry))))
+            self._keys[c.name] = key
+
+        gone = [name for name in self._keys if name not in fingerprints]
+        if not rows and not gone:
+            return
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO scan_cache (inbox, name, key, entry) VALUES (?, ?, ?, ?)", rows
+                    )
+                    conn.executemany(
+                        "DELETE FROM scan_cache WHERE inbox = ? AND name = ?", [(str(self.root), n) for n in gone]
+                    )
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print_debug(f"Could not save scan cache to {self.db_path}: {e}")
+        for name in gone:
+            self._keys.pop(name, None)
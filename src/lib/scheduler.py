@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, TYPE_CHECKING
+
+from src.lib.config import cfg
+from src.lib.term import buffered_output
+
+if TYPE_CHECKING:
+    from src.lib.inbox_item import InboxItem
+
+# Held while a book's working dirs are being created or cleaned up, since that touches the shared merge dir
+working_dirs_lock = threading.RLock()
+
+_slots_lock = threading.Lock()
+_slots: tuple[int, threading.BoundedSemaphore] | None = None
+
+
+def _ffmpeg_slots() -> threading.BoundedSemaphore:
+    global _slots
+    n = max(1, cfg.CPU_CORES)
+    with _slots_lock:
+        if _slots is None or _slots[0] != n:
+            _slots = (n, threading.BoundedSemaphore(n))
+        return _slots[1]
+
+
+@contextmanager
+def ffmpeg_slot() -> Iterator[None]:
+    """Holds one of the CPU_CORES ffmpeg slots that every book being converted shares, so running books in
+    parallel doesn't start more ffmpeg processes than there are cores."""
+    with _ffmpeg_slots():
+        yield
+
+
+def book_jobs(items: Iterable["InboxItem"]) -> list[list["InboxItem"]]:
+    """Groups `items` into jobs that can run in parallel: each book in a series goes in the same job, in
+    order, so the series is converted one book at a time and its folder is cleaned up after the last one."""
+    jobs: dict[str, list["InboxItem"]] = {}
+    for item in items:
+        jobs.setdefault(item.series_key or item.key, []).append(item)
+    return list(jobs.values())
+
+
+def run_book_jobs(items: Iterable["InboxItem"], process: Callable[["InboxItem"], int]) -> int:
+    """Runs `process` on each item and returns the sum of its results. With PARALLEL_BOOKS > 1 (and the
+    native converter), up to that many jobs (see `book_jobs`) run at once, each book's console output is
+    printed in one piece when it finishes."""
+    workers = max(1, cfg.PARALLEL_BOOKS) if cfg.USE_NATIVE_CONVERTER else 1
+    if workers == 1:
+        return sum(process(item) for item in items)
+
+    def run_job(job: list["InboxItem"]) -> int:
+        b = 0
+        for item in job:
+            with buffered_output():
+                b += process(item)
+        return b
+
+    jobs = book_jobs(items)
+    with ThreadPoolExecutor(max_workers=min(workers, len(jobs) or 1), thread_name_prefix="book") as pool:
+        return sum(pool.map(run_job, jobs))
+
+
+def run_book_pipeline(
+    items: Iterable["InboxItem"],
+    stages: Sequence[tuple[str, Callable[[Any], Any]]],
+    finish: tuple[str, Callable[["InboxItem", Any], int]],
+    *,
+    depth: int = 2,
+) -> tuple[int, dict[str, float]]:
+    """Passes each item through `stages` in order, each stage on its own thread, then through `finish` on
+    the calling thread, so that e.g. the next book can be copied while this one encodes. Books go through
+    every stage one at a time and in order, and at most `depth` books are waiting to be finished. Returns
+    the sum of `finish`'s results and the total time spent in each stage."""
+    timings = {name: 0.0 for name, _ in (*stages, finish)}
+
+    def timed(name: str, fn: Callable[..., Any], *args: Any) -> Any:
+        start = time.time()
+        try:
+            with buffered_output():
+                return fn(*args)
+        finally:
+            timings[name] += time.time() - start
+
+    def run_stage(prev: Future | None, name: str, fn: Callable[[Any], Any], item: "InboxItem") -> Any:
+        return timed(name, fn, item if prev is None else prev.result())
+
+    pools = [ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"book-{name}") for name, _ in stages]
+    pending: deque[tuple["InboxItem", Future]] = deque()
+    b = 0
+
+    def finish_next():
+        nonlocal b
+        item, fut = pending.popleft()
+        b += timed(finish[0], finish[1], item, fut.result())
+
+    try:
+        for item in items:
+            fut = None
+            for pool, (name, fn) in zip(pools, stages):
+                fut = pool.submit(run_stage, fut, name, fn, item)
+            if fut is None:
+                raise ValueError("A pipeline needs at least one stage")
+            pending.append((item, fut))
+            while len(pending) > depth:
+                finish_next()
+        while pending:
+            finish_next()
+    finally:
+        for pool in pools:
+            pool.shutdown(wait=True, cancel_futures=True)
+    return b, timings
@@ -2,7 +2,6 @@ import functools
 import re
 import sys
 from collections.abc import Callable
-from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Any, cast, Literal, TYPE_CHECKING, TypeVar
 
@@ -25,7 +24,6 @@ from src.lib.parsers import (
     to_words,
 )
 from src.lib.patterns import basic_part_or_ch_pattern, common_str_pattern, startswith_num_pattern
-from src.lib.singleton import singleton
 from src.lib.term import print_debug
 
 if TYPE_CHECKING:
@@ -42,96 +40,68 @@ from src.lib.compare import get_size_similarity
 
 T = TypeVar("T")
 
-
-@singleton
-class AlreadyChecked:
-    def __init__(self):
-        self._checked: set[Path] = set()
-        self._start_time: datetime | None = None
-
-    def start(self):
-        self._checked.clear()
-        self._start_time = datetime.now()
-
-    def add(self, path: Path):
-        self._checked.add(path)
-
-    def has(self, path: Path) -> bool:
-        return path in self._checked
-
-    def clear(self):
-        self._checked.clear()
-        self._start_time = None
-
-    @property
-    def is_expired(self) -> bool:
-        if not self._start_time:
-            return True
-        return (datetime.now() - self._start_time) > timedelta(seconds=300)  # 5 minute expiry
-
-
-already_checked = AlreadyChecked()
+# Returned by ScorerCache.get when there is no valid result
+MISSING = object()
+_CHECKED = "__checked__"
 
 
 class ScorerCache:
-    """Custom cache implementation for scorers that uses tree.path as key"""
-
-    def __init__(self, ttl_seconds: int = 300):  # 5 minutes TTL
-        self._cache: dict[str, tuple[Any, datetime]] = {}
-        self._ttl = timedelta(seconds=ttl_seconds)
-
-    def get(self, key: Path | None) -> Any | None:
-        if not key:
-            return None
-        str_key = str(key)
-        if str_key not in self._cache:
-            return None
-        value, timestamp = self._cache[str_key]
-        if datetime.now() - timestamp > self._ttl:
-            del self._cache[str_key]
-            return None
-        return value
-
-    def set(self, key: Path | None, value: Any) -> None:
-        if not key:
-            return
-        self._cache[str(key)] = (value, datetime.now())
+    """Caches scorer results on the node they were scored for, so looking one up doesn't build a key and a
+    result lives exactly as long as its node. A result is only reused while the node's `generation` hasn't
+    changed, i.e. until its subtree is scanned again."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        # Bumped by clear(), so results cached on nodes before then are ignored
+        self._epoch = 0
+
+    def _entry(self, tree: "BooksTree", name: str) -> tuple[int, int, Any] | None:
+        entry = tree._scores.get(name) if tree._scores else None
+        return entry if entry and entry[0] == self._epoch and entry[1] == tree.generation else None
+
+    def get(self, tree: "BooksTree", name: str) -> Any:
+        """The cached result of the scorer `name` for `tree`, or MISSING."""
+        if entry := self._entry(tree, name):
+            self.hits += 1
+            return entry[2]
+        self.misses += 1
+        return MISSING
+
+    def set(self, tree: "BooksTree", name: str, value: Any) -> None:
+        if tree._scores is None:
+            tree._scores = {}
+        tree._scores[name] = (self._epoch, tree.generation, value)
+
+    def is_checked(self, tree: "BooksTree") -> bool:
+        """Whether `tree` has been marked as checked, see `set_checked`."""
+        return self._entry(tree, _CHECKED) is not None
+
+    def set_checked(self, tree: "BooksTree") -> None:
+        """Marks `tree` as already (being) scored, for scorers that score their siblings and would otherwise
+        recurse. Like results, the mark only holds for the node's current generation."""
+        self.set(tree, _CHECKED, True)
 
     def clear(self) -> None:
-        self._cache.clear()
+        self._epoch += 1
+        self.hits = self.misses = 0
 
 
 # Global cache instance
-_scorer_cache = ScorerCache()
+scorerCache = ScorerCache()
+
 
+def cached_scorer(func: Callable[["BooksTree"], T]) -> Callable[["BooksTree"], T]:
+    """Decorator that caches a scorer's result for each node, see `ScorerCache`"""
 
-def cached_scorer(func: Callable[..., T]) -> Callable[..., T]:
-    """Custom decorator that caches scorer results using tree.path as key"""
+    name = func.__name__
 
     @functools.wraps(func)
-    def wrapper(tree: "BooksTree", *args: Any, **kwargs: Any) -> T:
-        # Create a unique cache key that includes the function name and args
-        cache_key = f"{func.__name__}:{tree.path}"
-        if args:
-            cache_key += f":{args}"
-        if kwargs:
-            # Sort kwargs items to ensure consistent cache keys
-            sorted_kwargs = sorted(kwargs.items())
-            # For already_checked, only include the length and first few items to avoid huge keys
-            if "already_checked" in kwargs:
-                already_checked = kwargs["already_checked"]
-                if already_checked:
-                    sorted_kwargs = [(k, v) for k, v in sorted_kwargs if k != "already_checked"]
-                    sorted_kwargs.append(("already_checked_len", len(already_checked)))
-                    if already_checked:
-                        sorted_kwargs.append(("already_checked_first", str(already_checked[0].path)))
-            cache_key += f":{sorted_kwargs}"
-
-        cached_result = _scorer_cache.get(Path(cache_key))
-        if cached_result is not None:
+    def wrapper(tree: "BooksTree") -> T:
+        if (cached_result := scorerCache.get(tree, name)) is not MISSING:
             return cached_result
-        result = func(tree, *args, **kwargs)
-        _scorer_cache.set(Path(cache_key), result)
+        result = func(tree)
+        scorerCache.set(tree, name, result)
         return result
 
     return wrapper
@@ -1263,9 +1233,9 @@ def score_single_standalone_file(tree: "BooksTree") -> tuple[Literal["standalone
             return (None, 0.0, 0.0)
 
         # Check if we've already processed this file in this pass
-        if already_checked.has(tree.path):
+        if scorerCache.is_checked(tree):
             return (None, 0.0, 0.0)
-        already_checked.add(tree.path)
+        scorerCache.set_checked(tree)
 
         # tree.parent.tick(f"--- score_single_standalone_file: {tree.rel_path}")
 
@@ -1399,7 +1369,7 @@ def score_single_standalone_file(tree: "BooksTree") -> tuple[Literal["standalone
         # tree.parent.tick(f" --- sibling_files: {len(sibling_files)}")
 
         for f in sibling_files:
-            if not already_checked.has(f.path):
+            if not scorerCache.is_checked(f):
                 (_, s, _) = score_single_standalone_file(f)
                 bonus = (-0.5 + s) / 10
                 standalone_score += bonus
@@ -0,0 +1,153 @@
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+from src.lib.term import print_debug
+
+# Entries older than this are dropped, in seconds
+DEFAULT_MAX_AGE = 90 * 24 * 60 * 60
+# Once there are more entries than this, the oldest are dropped
+DEFAULT_MAX_ENTRIES = 100_000
+# Prune again after this many writes in a single process
+PRUNE_EVERY = 5_000
+
+_GET = "SELECT value FROM cache WHERE namespace = ? AND key = ?"
+_SET = "INSERT OR REPLACE INTO cache (namespace, key, value, created_at) VALUES (?, ?, ?, ?)"
+_EVICT_OLDEST = """
+    DELETE FROM cache WHERE (namespace, key) IN (
+        SELECT namespace, key FROM cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+    )
+"""
+
+
+def _json_default(o: Any):
+    # numpy scalars, e.g. the float32 scores from transformers
+    if hasattr(o, "item"):
+        return o.item()
+    raise TypeError(f"Cannot encode {type(o).__name__} for the cache")
+
+
+def encode(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=_json_default)
+
+
+class SQLiteCache:
+    """A persistent key/value cache for JSON-encodable values in an SQLite DB in cfg.META_DIR.
+
+    Each thread keeps one connection open per DB for the life of the process, in WAL mode so readers
+    and the writer don't block each other. Entries are evicted once they are older than `max_age`
+    seconds, or (oldest first) once there are more than `max_entries` of them."""
+
+    def __init__(self, name: str, *, max_age: float = DEFAULT_MAX_AGE, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.name = name
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pruned: set[Path] = set()
+        self._writes = 0
+
+    def __repr__(self):
+        return f"SQLiteCache({self.name})"
+
+    @property
+    def db_path(self) -> Path:
+        from src.lib.config import cfg
+
+        return cfg.META_DIR / f"{self.name}.db"
+
+    def _connect(self) -> sqlite3.Connection:
+        db_path = self.db_path
+        conns: dict[Path, sqlite3.Connection] = self._local.__dict__.setdefault("conns", {})
+        if (conn := conns.get(db_path)) is None:
+            conn = sqlite3.connect(str(db_path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                # Drop the table used by older versions, whose pickled values can't be read any more
+                conn.execute(f"DROP TABLE IF EXISTS {self.name}")
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS cache (
+                        namespace TEXT NOT NULL,
+                        key TEXT NOT NULL,
+                        value TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        PRIMARY KEY (namespace, key)
+                    ) WITHOUT ROWID
+                """
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS cache_created_at ON cache (created_at)")
+            conns[db_path] = conn
+            with self._lock:
+                should_prune = db_path not in self._pruned
+                self._pruned.add(db_path)
+            if should_prune:
+                self.prune(conn)
+        return conn
+
+    def close(self):
+        """Closes this thread's connections."""
+        for conn in self._local.__dict__.pop("conns", {}).values():
+            conn.close()
+
+    def get(self, namespace: str, key: str) -> Any | None:
+        return self.get_many(namespace, [key]).get(key)
+
+    def get_many(self, namespace: str, keys: Iterable[str]) -> dict[str, Any]:
+        """The cached values for whichever of `keys` are in the cache."""
+        found = {}
+        try:
+            conn = self._connect()
+            for key in dict.fromkeys(keys):
+                if (row := conn.execute(_GET, (namespace, key)).fetchone()) is not None:
+                    try:
+                        found[key] = json.loads(row[0])
+                    except ValueError:
+                        pass
+        except sqlite3.Error as e:
+            print_debug(f"Could not read {self.name}: {e}")
+        return found
+
+    def set(self, namespace: str, key: str, value: Any):
+        self.set_many(namespace, {key: value})
+
+    def set_many(self, namespace: str, items: dict[str, Any]):
+        """Caches every value in `items` in a single transaction."""
+        if not items:
+            return
+        now = time.time()
+        try:
+            rows = [(namespace, key, encode(value), now) for key, value in items.items()]
+            conn = self._connect()
+            with conn:
+                conn.executemany(_SET, rows)
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            print_debug(f"Could not write to {self.name}: {e}")
+            return
+        with self._lock:
+            self._writes += len(rows)
+            should_prune = self._writes >= PRUNE_EVERY
+            if should_prune:
+                self._writes = 0
+        if should_prune:
+            self.prune(conn)
+
+    def prune(self, conn: sqlite3.Connection | None = None) -> int:
+        """Evicts entries that are too old, then the oldest entries over the size limit. Returns the number of
+        entries evicted."""
+        try:
+            conn = conn or self._connect()
+            with conn:
+                removed = conn.execute("DELETE FROM cache WHERE created_at < ?", (time.time() - self.max_age,)).rowcount
+                removed += conn.execute(_EVICT_OLDEST, (self.max_entries,)).rowcount
+        except sqlite3.Error as e:
+            print_debug(f"Could not prune {self.name}: {e}")
+            return 0
+        if removed:
+            print_debug(f"Evicted {removed} entries from {self.name}")
+        return removed
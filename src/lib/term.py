@@ -1,5 +1,8 @@
 import os
 import re
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Any
 
@@ -16,6 +19,10 @@ LAST_LINE_WAS_ALERT = False
 LAST_LINE_ENDS_WITH_NEWLINE = False
 PRINT_LOG: list[tuple[str, str]] = []
 
+# While a thread is inside `buffered_output()`, its lines are collected here instead of being printed
+_buffers = threading.local()
+_print_lock = threading.Lock()
+
 DEFAULT_COLOR = 0
 GREY_COLOR = Tinta().inspect(name="grey")
 DARK_GREY_COLOR = Tinta().inspect(name="dark_grey")
@@ -97,9 +104,14 @@ def count_empty_trailing_lines(multiline: str) -> int:
     return count
 
 
+def _print_log() -> list[tuple[str, str]]:
+    buffer = getattr(_buffers, "current", None)
+    return buffer[0] if buffer is not None else PRINT_LOG
+
+
 def get_prev_text_and_end() -> tuple[str, str]:
-    global PRINT_LOG
-    return PRINT_LOG[-1] if PRINT_LOG else ("", "")
+    log = _print_log()
+    return log[-1] if log else ("", "")
 
 
 def get_prev_line() -> str:
@@ -118,7 +130,7 @@ def was_prev_line_alert() -> bool:
 
 def was_prev_line_divider() -> bool:
     # starting from end of print log, find next non-empty line
-    for line, _ in reversed(PRINT_LOG):
+    for line, _ in reversed(_print_log()):
         if not multiline_is_empty(line):
             return line.strip().startswith("-" * 10)
     return False
@@ -229,7 +241,7 @@ def smart_print(
     elif prev_was_alert:
         if line_is_indented:
             if prev_line_was_empty:
-                Tinta.up()
+                _up()
             text = trim_newlines(text)
         elif not prev_line_was_empty:
             text = ensure_leading_newline(text)
@@ -252,9 +264,44 @@ def smart_print(
     else:
         t.tint(color, text)
 
-    PRINT_LOG.append((t.to_str(plaintext=True), end))
+    if (buffer := getattr(_buffers, "current", None)) is not None:
+        buffer[0].append((t.to_str(plaintext=True), end))
+        buffer[1].append((t, end))
+        return
+
+    with _print_lock:
+        PRINT_LOG.append((t.to_str(plaintext=True), end))
+        t.print(end=end)
+
 
-    t.print(end=end)
+def _up():
+    if (buffer := getattr(_buffers, "current", None)) is not None:
+        buffer[1].append((None, ""))
+    else:
+        Tinta.up()
+
+
+@contextmanager
+def buffered_output() -> Iterator[None]:
+    """Holds back everything this thread prints until the block exits, then prints it all at once, so
+    that output from books being processed in parallel doesn't interleave. Nested calls are no-ops."""
+    if getattr(_buffers, "current", None) is not None:
+        yield
+        return
+    log: list[tuple[str, str]] = []
+    lines: list[tuple[Tinta | None, str]] = []
+    _buffers.current = (log, lines)
+    try:
+        yield
+    finally:
+        _buffers.current = None
+        with _print_lock:
+            PRINT_LOG.extend(log)
+            for t, end in lines:
+                if t is None:
+                    Tinta.up()
+                else:
+                    t.print(end=end)
 
 
 def nl(num_newlines=1):
@@ -20,6 +20,9 @@ R = TypeVar("R")
 AudiobookFmt = Literal["m4b", "mp3", "m4a", "wma"]
 Operation = Literal["move", "copy"]
 OverwriteMode = Literal["skip", "skip-silent", "overwrite", "overwrite-silent"]
+# How a copy may share data with its source: "reflink" only makes copy-on-write clones, "hardlink" also allows
+# hardlinks. Both fall back to a real copy when the filesystem can't do it.
+CloneMode = Literal["reflink", "hardlink"]
 OVERWRITE_MODES = ["skip", "skip-silent", "overwrite", "overwrite-silent"]
 PathType = Literal["dir", "file"]
 SizeFmt = Literal["bytes", "human"]
@@ -142,6 +145,7 @@ def copy_kwargs_omit_first_arg(
 
 
 OnComplete = Literal["archive", "delete", "test_do_nothing"]
+WatchMode = Literal["poll", "inotify", "auto"]
 
 NumericIterable = TypeVar("NumericIterable", bound=Iterable[int | float] | list[int | float])
 SimilarityComparisonMethod = Literal["median", "avg", "min", "max"] | None
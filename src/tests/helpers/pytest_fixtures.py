@@ -46,13 +46,11 @@ def setup_teardown():
 
 @pytest.fixture(autouse=True, scope="function")
 def clear_scorer_caches():
-    from src.lib.scorers import _scorer_cache, already_checked
+    from src.lib.scorers import scorerCache
 
-    _scorer_cache.clear()
-    already_checked.clear()
+    scorerCache.clear()
     yield
-    _scorer_cache.clear()
-    already_checked.clear()
+    scorerCache.clear()
 
 
 @pytest.fixture(scope="function", autouse=False)
@@ -804,10 +802,13 @@ def mock_inbox_being_copied_to():
 def global_test_log():
     orig_log = FIXTURES_ROOT / "sample-auto-m4b.log"
     test_log = TEST_DIRS.converted / "auto-m4b.log"
+    run_log = test_log.with_suffix(".jsonl")
     test_log.unlink(missing_ok=True)
+    run_log.unlink(missing_ok=True)
     shutil.copy2(orig_log, test_log)
     yield test_log
     test_log.unlink(missing_ok=True)
+    run_log.unlink(missing_ok=True)
 
 
 @pytest.fixture(scope="function", autouse=False)
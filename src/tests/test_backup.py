@@ -0,0 +1,73 @@
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from src.lib import backup as backup_module
+from src.lib.backup import backup_files, hash_file, manifest_path
+
+
+@pytest.fixture
+def book(tmp_path: Path):
+    book = tmp_path / "inbox" / "Book"
+    (book / "Disc 1").mkdir(parents=True)
+    (book / "Disc 1" / "01.mp3").write_bytes(b"one" * 1000)
+    (book / "Disc 1" / "02.mp3").write_bytes(b"two" * 1000)
+    (book / "cover.jpg").write_bytes(b"jpg")
+    return book
+
+
+def test_backup_files_copies_and_writes_manifest(book: Path, tmp_path: Path):
+    backup = tmp_path / "backup" / "Book"
+    result = backup_files(book, backup)
+
+    assert (result.files, result.copied, result.unchanged, result.kept, result.failed) == (3, 3, 0, [], [])
+    assert result.size == 6003
+    assert (backup / "Disc 1" / "02.mp3").read_bytes() == b"two" * 1000
+
+    manifest = json.loads(manifest_path(backup).read_text())
+    assert manifest_path(backup).parent == backup.parent
+    assert sorted(manifest["files"]) == ["Disc 1/01.mp3", "Disc 1/02.mp3", "cover.jpg"]
+    assert manifest["files"]["cover.jpg"]["blake2b"] == hash_file(book / "cover.jpg")
+
+
+def test_backup_files_skips_unchanged_files_using_manifest(book: Path, tmp_path: Path):
+    backup = tmp_path / "backup" / "Book"
+    backup_files(book, backup)
+
+    with patch("src.lib.backup.hash_file") as hash_file_mock:
+        result = backup_files(book, backup)
+    hash_file_mock.assert_not_called()
+    assert (result.copied, result.unchanged) == (0, 3)
+
+    (book / "Disc 1" / "03.mp3").write_bytes(b"three")
+    result = backup_files(book, backup)
+    assert (result.files, result.copied, result.unchanged) == (4, 1, 3)
+
+
+def test_backup_files_keeps_previous_backups(book: Path, tmp_path: Path):
+    backup = tmp_path / "backup" / "Book"
+    (backup / "Disc 1").mkdir(parents=True)
+    (backup / "Disc 1" / "01.mp3").write_bytes(b"one" * 1000)
+    (backup / "cover.jpg").write_bytes(b"older cover")
+
+    result = backup_files(book, backup)
+    assert (result.copied, result.unchanged, result.kept) == (1, 1, ["cover.jpg"])
+    assert (backup / "cover.jpg").read_bytes() == b"older cover"
+    assert "cover.jpg" not in json.loads(manifest_path(backup).read_text())["files"]
+
+
+def test_backup_files_reports_copies_that_dont_match(book: Path, tmp_path: Path):
+    backup = tmp_path / "backup" / "Book"
+    copy_and_hash = backup_module._copy_and_hash
+
+    def bad_copy(src: Path, dst: Path) -> str:
+        copy_and_hash(src, dst)
+        return "not the right hash"
+
+    with patch("src.lib.backup._copy_and_hash", side_effect=bad_copy):
+        result = backup_files(book, backup)
+    assert sorted(result.failed) == ["Disc 1/01.mp3", "Disc 1/02.mp3", "cover.jpg"]
+    assert not list(backup.rglob("*.*"))
+    assert backup_files(book, backup).copied == 3
@@ -0,0 +1,59 @@
+from pathlib import Path
+
+import mutagen
+import pytest
+
+from benchmarks.inbox import generate_inbox, InboxSpec, SHAPES
+from benchmarks.suite import compare, load_baselines, Result, save_baselines
+from src.lib.books_tree import BooksTree
+
+
+@pytest.fixture
+def inbox(tmp_path: Path):
+    root = tmp_path / "inbox"
+    books = generate_inbox(root, InboxSpec(books=len(SHAPES) * 3, files_per_book=4))
+    return root, books
+
+
+def test_generate_inbox_shapes(inbox: tuple[Path, list[Path]]):
+    root, books = inbox
+    assert len(books) == len(SHAPES) * 3
+    assert books[0] == root / "Author 0000 - Title 0000"
+    assert sorted(p.name for p in books[1].iterdir()) == ["Disc 1", "Disc 2"]
+    assert books[2] == root / "Author 0002" / "Title 0002"
+    # the 3 series books are in the same series folder
+    assert {b.parent for b in books[3 :: len(SHAPES)]} == {root / "Series Author 0000 - Series 0000"}
+    assert books[4].is_file()
+
+    tree = BooksTree(root, scan=False).scan(scan_id3=True)
+    structures = {b.rel_path: b.structure for b in tree.books_and_series}
+    assert structures[Path("Author 0000 - Title 0000")] == ("flat",)
+    assert "multi_disc" in structures[Path("Author 0001 - Title 0001")]
+    assert "nested" in structures[Path("Author 0002")]
+    assert "series_parent" in structures[Path("Series Author 0000 - Series 0000")]
+    assert structures[Path("Author 0004 - Title 0004.mp3")] == ("standalone_file",)
+
+
+def test_generated_files_are_tagged_audio(inbox: tuple[Path, list[Path]]):
+    _root, books = inbox
+    clean = mutagen.File(sorted(books[0].glob("*.mp3"))[0])
+    assert clean.info.length == pytest.approx(1.0, abs=0.1)
+    assert str(clean.tags["TPE1"]) == "Author 0000"
+    assert str(clean.tags["TRCK"]) == "1/4"
+
+    # messy tags differ from file to file
+    messy = [mutagen.File(f).tags for f in sorted(books[5].glob("*.mp3"))]
+    assert len({tuple(sorted((k, str(v)) for k, v in t.items())) for t in messy}) > 1
+
+
+def test_compare_flags_regressions(tmp_path: Path):
+    baselines_file = tmp_path / "baselines.json"
+    results = [Result("scan", [1.0, 1.0, 1.0]), Result("convert", [], skipped="needs ffmpeg")]
+    save_baselines(results, "small", baselines_file)
+    baselines = load_baselines(baselines_file)
+    assert set(baselines["small"]) == {"scan"}
+
+    assert compare([Result("scan", [1.2])], baselines["small"], tolerance=0.5) == []
+    assert compare([Result("scan", [1.6])], baselines["small"], tolerance=0.5) == ["scan"]
+    # new benchmarks have nothing to compare to
+    assert compare([Result("hash", [9.0])], baselines["small"], tolerance=0.5) == []
@@ -0,0 +1,47 @@
+import time
+from pathlib import Path
+
+import pytest
+
+from src.lib.books_tree import BooksTree
+
+FILES_PER_BOOK = 20
+BOOKS_PER_SERIES = 10
+
+
+def make_inbox(root: Path, num_files: int):
+    """Lays out `num_files` empty mp3s as series of multi-disc books, plus some non-audio noise."""
+    for i in range(num_files // FILES_PER_BOOK):
+        series, book = divmod(i, BOOKS_PER_SERIES)
+        book_dir = root / f"Series {series:04d}" / f"Book {book:02d}"
+        for disc in range(2):
+            (d := book_dir / f"Disc {disc + 1}").mkdir(parents=True, exist_ok=True)
+            for track in range(FILES_PER_BOOK // 2):
+                (d / f"{track + 1:02d} - Chapter.mp3").touch()
+        (book_dir / "cover.jpg").touch()
+
+
+def time_scan(root: Path) -> tuple[float, BooksTree]:
+    start = time.perf_counter()
+    tree = BooksTree(root, scan=False).scan(determine_structure=False)
+    return time.perf_counter() - start, tree
+
+
+@pytest.mark.slow
+def test_books_tree_scan_scales_linearly(tmp_path: Path):
+    sizes = [1_000, 10_000, 100_000]
+    results: list[tuple[int, float]] = []
+    for n in sizes:
+        root = tmp_path / f"inbox_{n}"
+        make_inbox(root, n)
+        elapsed, tree = time_scan(root)
+        assert len(tree.files_recursive) == n
+        results.append((n, elapsed))
+
+    print("\nBooksTree.scan (no structure/id3)")
+    for n, elapsed in results:
+        print(f"  {n:>7,} files: {elapsed:7.3f}s ({elapsed / n * 1e6:6.1f} µs/file)")
+
+    # Per-file cost should stay roughly flat as the inbox grows; a quadratic scan would be ~100x worse here
+    (n_small, t_small), (n_large, t_large) = results[0], results[-1]
+    assert (t_large / n_large) < (t_small / n_small) * 10
@@ -121,3 +121,8 @@ def test_get_size_similarity_real_world():
         ("37 - Authors' Note.mp3", 2012128),
     ]
     assert get_size_similarity([f[1] for f in files], ignore_smaller_than=10 * mb) == 0.306
+
+
+def test_get_size_similarity_all_ignored():
+    assert get_size_similarity([100, 200, 300], ignore_smaller_than=1000) == 1.0
+    assert get_size_similarity([100, 200, 3000], ignore_smaller_than=1000) == 1.0
@@ -324,6 +324,156 @@ class TestDetectAacCodec:
         assert mock_run.call_count == 1
 
 
+# ─── Concat ───────────────────────────────────────────────────────────────────
+
+
+class TestConcat:
+    def test_concat_embeds_metadata_and_cover_in_one_pass(self, tmp_path: Path):
+        from src.lib.converter.merge import _concat_to_m4b
+
+        cover = tmp_path / "cover.jpg"
+        cover.write_bytes(b"\xff\xd8")
+        output = tmp_path / "build" / "book.m4b"
+        with patch("src.lib.converter.merge.subprocess.run") as mock_run:
+            mock_run.return_value.returncode = 0
+            _concat_to_m4b(tmp_path / "concat_list.txt", tmp_path / "metadata.txt", output, cover=cover)
+
+        assert mock_run.call_count == 1
+        cmd = mock_run.call_args.args[0]
+        assert [cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-i"] == [
+            str(tmp_path / "concat_list.txt"),
+            str(tmp_path / "metadata.txt"),
+            str(cover),
+        ]
+        assert cmd[cmd.index("-c:a") + 1] == "copy"
+        assert cmd.count("+faststart") == 1
+        assert cmd[-1] == str(output)
+
+    def test_concat_raises_on_ffmpeg_error(self, tmp_path: Path):
+        from src.lib.converter.merge import _concat_to_m4b
+
+        with patch("src.lib.converter.merge.subprocess.run") as mock_run:
+            mock_run.return_value.returncode = 1
+            mock_run.return_value.stderr = "boom"
+            with pytest.raises(RuntimeError, match="boom"):
+                _concat_to_m4b(tmp_path / "concat_list.txt", tmp_path / "metadata.txt", tmp_path / "book.m4b")
+
+
+# ─── Checkpoint ───────────────────────────────────────────────────────────────
+
+
+class TestCheckpoint:
+    OPTIONS = {"copy": False, "codec": CODEC_AAC, "bitrate": 64, "samplerate": 44100}
+
+    @pytest.fixture
+    def book(self, tmp_path: Path):
+        merge = tmp_path / "merge"
+        merge.mkdir()
+        (merge / "01.mp3").write_bytes(b"one")
+        (merge / "02.mp3").write_bytes(b"two")
+        tmp = tmp_path / "build" / "~tmpfiles"
+        tmp.mkdir(parents=True)
+        (tmp / "00000_01.mp4").write_bytes(b"mp4 one")
+        return merge, tmp
+
+    def test_resumes_finished_files_only(self, book):
+        from src.lib.converter.checkpoint import Checkpoint
+
+        merge, tmp = book
+        Checkpoint(tmp, merge, self.OPTIONS).done(merge / "01.mp3", tmp / "00000_01.mp4", 1234)
+
+        checkpoint = Checkpoint(tmp, merge, self.OPTIONS)
+        assert len(checkpoint) == 1
+        assert checkpoint.get(merge / "01.mp3", tmp / "00000_01.mp4") == 1234
+        assert checkpoint.get(merge / "02.mp3", tmp / "00001_02.mp4") is None
+
+    def test_changed_source_output_or_options_are_converted_again(self, book):
+        from src.lib.converter.checkpoint import Checkpoint
+
+        merge, tmp = book
+        Checkpoint(tmp, merge, self.OPTIONS).done(merge / "01.mp3", tmp / "00000_01.mp4", 1234)
+
+        assert len(Checkpoint(tmp, merge, {**self.OPTIONS, "bitrate": 128})) == 0
+
+        (tmp / "00000_01.mp4").write_bytes(b"trunc")
+        assert Checkpoint(tmp, merge, self.OPTIONS).get(merge / "01.mp3", tmp / "00000_01.mp4") is None
+
+        Checkpoint(tmp, merge, self.OPTIONS).done(merge / "01.mp3", tmp / "00000_01.mp4", 1234)
+        (merge / "01.mp3").write_bytes(b"a different file")
+        assert Checkpoint(tmp, merge, self.OPTIONS).get(merge / "01.mp3", tmp / "00000_01.mp4") is None
+
+
+# ─── Streaming encode ─────────────────────────────────────────────────────────
+
+
+class TestStreamEncode:
+    def test_single_ffmpeg_call_with_metadata_and_cover(self, tmp_path: Path):
+        from src.lib.converter.merge import _stream_encode_to_m4b
+
+        cover = tmp_path / "cover.jpg"
+        cover.write_bytes(b"\xff\xd8")
+        output = tmp_path / "build" / "book.m4b"
+        with patch("src.lib.converter.merge.subprocess.run") as mock_run:
+            mock_run.return_value.returncode = 0
+            _stream_encode_to_m4b(
+                TINY_MP3_FILES,
+                tmp_path / "concat_list.txt",
+                tmp_path / "metadata.txt",
+                output,
+                cover=cover,
+                copy=False,
+                codec=CODEC_AAC,
+                bitrate=64,
+                samplerate=44100,
+            )
+
+        assert mock_run.call_count == 1
+        cmd = mock_run.call_args.args[0]
+        assert cmd[0] == "ffmpeg" and cmd[-1] == str(output)
+        assert cmd.count("-i") == 3
+        assert ["-map", "0:a", "-map", "2:v", "-map_metadata", "1", "-map_chapters", "1"] == cmd[
+            cmd.index("-map") : cmd.index("-map_chapters") + 2
+        ]
+        assert ["-c:a", CODEC_AAC, "-b:a", "64k", "-ar", "44100"] == cmd[cmd.index("-c:a") : cmd.index("-ar") + 2]
+        listed = (tmp_path / "concat_list.txt").read_text().splitlines()
+        assert len(listed) == len(TINY_MP3_FILES)
+
+    def test_copies_audio_without_cover(self, tmp_path: Path):
+        from src.lib.converter.merge import _stream_encode_to_m4b
+
+        with patch("src.lib.converter.merge.subprocess.run") as mock_run:
+            mock_run.return_value.returncode = 0
+            _stream_encode_to_m4b(
+                TINY_MP3_FILES,
+                tmp_path / "concat_list.txt",
+                tmp_path / "metadata.txt",
+                tmp_path / "book.m4b",
+                copy=True,
+                codec=CODEC_AAC,
+                bitrate=64,
+                samplerate=44100,
+            )
+
+        cmd = mock_run.call_args.args[0]
+        assert cmd.count("-i") == 2
+        assert "2:v" not in cmd and "-b:a" not in cmd
+        assert cmd[cmd.index("-c:a") + 1] == "copy"
+
+    def test_only_streams_uniform_inputs(self):
+        from src.lib.converter.merge import _can_stream_encode
+
+        def probe(sample_rate: str):
+            stream = {"codec_type": "audio", "codec_name": "mp3", "sample_rate": sample_rate, "channels": 2}
+            return {"streams": [stream]}
+
+        with patch("src.lib.ffprobe_utils.probeCache.probe", side_effect=[probe("44100"), probe("44100")]):
+            assert _can_stream_encode(TINY_MP3_FILES[:2])
+        with patch("src.lib.ffprobe_utils.probeCache.probe", side_effect=[probe("44100"), probe("22050")]):
+            assert not _can_stream_encode(TINY_MP3_FILES[:2])
+        with patch("src.lib.ffprobe_utils.probeCache.probe", side_effect=RuntimeError("no ffprobe")):
+            assert not _can_stream_encode(TINY_MP3_FILES[:2])
+
+
 # ─── Integration: chapter embedding via ffprobe ───────────────────────────────
 
 
@@ -1,4 +1,9 @@
+from pathlib import Path
+from unittest.mock import patch, PropertyMock
+
 from src.lib.audiobook import Audiobook
+from src.lib.config import cfg
+from src.lib.ffprobe_utils import ProbeCache
 
 
 class test_ffprobe:
@@ -6,3 +11,108 @@ class test_ffprobe:
         from src.lib.ffmpeg_utils import get_duration
 
         assert get_duration(basic_with_cover__single_mp3.path) == "0h:02m:06s"
+
+
+class test_probe_cache:
+    PROBE_RESULT = {"format": {"duration": "12.5", "tags": {"title": "Chapter 1"}}, "streams": []}
+
+    def test_probes_each_file_once_until_it_changes(self, tmp_path: Path):
+        f = tmp_path / "01.mp3"
+        f.write_bytes(b"\0" * 10)
+        cache = ProbeCache()
+        with patch("ffmpeg.probe", return_value=self.PROBE_RESULT) as probe:
+            assert cache.probe(f) == cache.probe(f) == self.PROBE_RESULT
+            assert probe.call_count == 1
+
+            f.write_bytes(b"\0" * 20)
+            cache.probe(f)
+            assert probe.call_count == 2
+
+    def test_evicts_least_recently_used(self, tmp_path: Path):
+        files = [tmp_path / f"{i}.mp3" for i in range(3)]
+        [f.write_bytes(b"\0") for f in files]
+        cache = ProbeCache(maxsize=2)
+        with patch("ffmpeg.probe", return_value=self.PROBE_RESULT) as probe:
+            cache.probe(files[0])
+            cache.probe(files[1])
+            cache.probe(files[0])
+            cache.probe(files[2])  # evicts files[1]
+            assert len(cache) == 2
+            cache.probe(files[0])
+            assert probe.call_count == 3
+            cache.probe(files[1])
+            assert probe.call_count == 4
+
+    def test_persisted_results_survive_a_new_cache(self, tmp_path: Path):
+        f = tmp_path / "01.mp3"
+        f.write_bytes(b"\0")
+        with (
+            patch.object(type(cfg), "META_DIR", new_callable=PropertyMock, return_value=tmp_path),
+            patch.object(type(cfg), "USE_PROBE_CACHE", new_callable=PropertyMock, return_value=True),
+            patch("ffmpeg.probe", return_value=self.PROBE_RESULT) as probe,
+        ):
+            assert ProbeCache().probe(f) == self.PROBE_RESULT
+            assert ProbeCache().probe(f) == self.PROBE_RESULT
+            assert probe.call_count == 1
+
+            f.write_bytes(b"\0" * 2)
+            ProbeCache().probe(f)
+            assert probe.call_count == 2
+
+            ProbeCache(persist=False).probe(f)
+            assert probe.call_count == 3
+
+    def test_duration_bitrate_and_tags_share_one_probe(self, tmp_path: Path):
+        from src.lib.converter.merge import _ffprobe_duration_ms, _ffprobe_title_tag
+        from src.lib.ffmpeg_utils import get_file_duration_py
+
+        f = tmp_path / "01.mp3"
+        f.write_bytes(b"\0")
+        with patch("ffmpeg.probe", return_value=self.PROBE_RESULT) as probe:
+            assert get_file_duration_py(f) == 12.5
+            assert _ffprobe_duration_ms(f) == 12500
+            assert _ffprobe_title_tag(f) == "Chapter 1"
+            assert probe.call_count == 1
+
+
+class test_durations:
+    def test_get_duration_probes_each_file_once(self, tmp_path: Path):
+        from src.lib.ffmpeg_utils import get_duration
+
+        for i in range(4):
+            (tmp_path / f"{i:02d}.mp3").write_bytes(b"\0" * (i + 1))
+        with patch("src.lib.ffmpeg_utils.get_file_duration_py", return_value=60.0) as get_file_duration_py:
+            assert get_duration(tmp_path, "seconds") == 240
+            assert get_duration(tmp_path, "seconds") == 240
+            assert get_file_duration_py.call_count == 4
+
+    def test_get_duration_reuses_remembered_durations_for_copies(self, tmp_path: Path):
+        import shutil
+
+        from src.lib.ffmpeg_utils import get_duration, remember_file_durations
+
+        (inbox := tmp_path / "inbox").mkdir()
+        (merge := tmp_path / "merge").mkdir()
+        (inbox / "01.mp3").write_bytes(b"\0" * 7)
+        copy = Path(shutil.copy2(inbox / "01.mp3", merge / "01.mp3"))
+        remember_file_durations([copy], [90.0], copied_from=[inbox / "01.mp3"])
+        with patch("src.lib.ffmpeg_utils.get_file_duration_py") as get_file_duration_py:
+            assert get_duration(inbox, "seconds") == 90
+            assert get_duration(merge, "seconds") == 90
+            get_file_duration_py.assert_not_called()
+
+    def test_files_with_the_same_name_size_and_mtime_dont_share_durations(self, tmp_path: Path):
+        import os
+
+        from src.lib.ffmpeg_utils import get_duration, remember_file_durations
+
+        a, b = tmp_path / "a" / "01.mp3", tmp_path / "b" / "01.mp3"
+        for f in (a, b):
+            f.parent.mkdir()
+            f.write_bytes(b"\0" * 7)
+            os.utime(f, ns=(1_700_000_000 * 10**9, 1_700_000_000 * 10**9))
+        remember_file_durations([a], [90.0])
+        with patch("src.lib.ffmpeg_utils.get_file_duration_py", return_value=30.0) as get_file_duration_py:
+            assert get_duration(a, "seconds") == 90
+            assert get_duration(b, "seconds") == 30
+            assert get_file_duration_py.call_count == 1
@@ -11,6 +11,9 @@ from src.lib.audiobook import Audiobook
 from src.lib.books_tree import BooksTree
 from src.lib.compare import calculate_gcs_percentage, find_greatest_common_string
 from src.lib.fs_utils import (
+    clean_dir,
+    clone_file,
+    cp_dir,
     filter_ignored,
     find_cover_art_file,
 )
@@ -433,3 +436,65 @@ class test_get_similarity:
         from src.lib.compare import get_similarity
 
         assert get_similarity(strings) == pytest.approx(expected, rel=0.01)
+
+
+def test_clone_file_hardlinks_and_replaces_existing_dst(tmp_path: Path):
+    src = tmp_path / "01.mp3"
+    src.write_bytes(b"audio")
+    dst = tmp_path / "merge" / "01.mp3"
+    dst.parent.mkdir()
+    dst.write_bytes(b"stale")
+
+    method = clone_file(src, dst, "hardlink")
+    assert dst.read_bytes() == b"audio"
+    if method == "hardlink":
+        assert dst.stat().st_ino == src.stat().st_ino
+
+    # Replacing a hardlinked dst must not write through to its source
+    (other := tmp_path / "02.mp3").write_bytes(b"other")
+    clone_file(other, dst, "reflink")
+    assert src.read_bytes() == b"audio"
+    assert dst.read_bytes() == b"other"
+
+
+def test_clone_file_reflink_mode_never_hardlinks(tmp_path: Path):
+    src = tmp_path / "01.mp3"
+    src.write_bytes(b"audio")
+    dst = tmp_path / "01 copy.mp3"
+
+    assert clone_file(src, dst, "reflink") in ("reflink", "copy")
+    assert dst.stat().st_ino != src.stat().st_ino
+    assert dst.read_bytes() == b"audio"
+
+
+def test_cp_dir_clones_files_into_working_dir(tmp_path: Path):
+    book = tmp_path / "inbox" / "Book"
+    (book / "Disc 1").mkdir(parents=True)
+    (book / "Disc 1" / "01.mp3").write_bytes(b"one")
+    (book / "cover.jpg").write_bytes(b"jpg")
+    merge = tmp_path / "merge"
+    merge.mkdir()
+
+    cp_dir(book, merge, overwrite_mode="overwrite-silent", clone="hardlink")
+
+    assert (merge / "Book" / "Disc 1" / "01.mp3").read_bytes() == b"one"
+    assert (merge / "Book" / "cover.jpg").read_bytes() == b"jpg"
+    assert (book / "Disc 1" / "01.mp3").is_file()
+
+
+def test_clean_dir_keeps_paths(tmp_path: Path):
+    build = tmp_path / "build"
+    (keep := build / "Book 1" / "~tmpfiles").mkdir(parents=True)
+    (keep / "00000_01.mp4").write_bytes(b"mp4")
+    (build / "Book 1" / "Book 1.m4b").write_bytes(b"m4b")
+    (build / "Book 2" / "~tmpfiles").mkdir(parents=True)
+
+    clean_dir(build, keep=[keep, tmp_path / "gone"])
+
+    assert sorted(p.relative_to(build).as_posix() for p in build.rglob("*")) == [
+        "Book 1",
+        "Book 1/~tmpfiles",
+        "Book 1/~tmpfiles/00000_01.mp4",
+    ]
+    clean_dir(build)
+    assert not any(build.iterdir())
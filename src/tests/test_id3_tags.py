@@ -1,18 +1,22 @@
 import re
+import shutil
 from collections.abc import Callable
+from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 from mutagen.id3._util import ID3NoHeaderError
 from mutagen.mp3 import HeaderNotFoundError
 
 from src.lib.audiobook import Audiobook
-from src.lib.id3_tags import extract_id3_tags
+from src.lib.id3_tags import extract_id3_tags, Id3Tags, read_tags_mutagen
 from src.lib.id3_utils import map_kid3_keys, write_id3_tags_mutagen
 from src.lib.inbox_state import InboxState
 from src.lib.misc import increment
 from src.lib.parsers import (
     has_graphic_audio,
 )
+from src.tests.helpers.pytest_dumps import FIXTURES_ROOT
 from src.tests.helpers.pytest_utils import testutils
 
 
@@ -28,6 +32,54 @@ def test_id3_extract_fails_for_corrupt_file(corrupt_audiobook: Audiobook):
         extract_id3_tags(corrupt_audiobook.sample_audio1, "title", throw=True)
 
 
+@pytest.mark.parametrize(
+    "file, expected",
+    [
+        (
+            FIXTURES_ROOT / "tiny__flat_mp3" / "themission_01_drake_20kb.mp3",
+            {
+                "title": "01 - The Three Strangers",
+                "artist": "Franklin W. Dixon",
+                "album": "The Missing Chums",
+                "track": "1",
+                "comment": "https://archive.org/details/missingchums_2401_librivox",
+            },
+        ),
+        (
+            FIXTURES_ROOT / "basic_with_cover__single_m4b" / "basic_with_cover__single_m4b.m4b",
+            {
+                "title": "Album",
+                "artist": "Author",
+                "album_artist": "Author",
+                "sort_album": "Album",
+                "date": "1970-01-01",
+                "track": "1",
+            },
+        ),
+    ],
+)
+def test_read_tags_mutagen_uses_ffprobe_keys(file: Path, expected: dict[str, str]):
+    tags = read_tags_mutagen(file)
+    assert tags is not None
+    assert {k: tags.get(k) for k in expected} == expected
+
+
+def test_id3_tags_from_files_falls_back_to_ffprobe(tmp_path: Path):
+    mp3 = shutil.copy(FIXTURES_ROOT / "tiny__flat_mp3" / "themission_01_drake_20kb.mp3", tmp_path / "01.mp3")
+    wav = tmp_path / "02.wav"
+    wav.write_bytes(b"RIFF")
+    Id3Tags.clear_cache()
+
+    ffresult = {"format": {"tags": {"TITLE": "Chapter 2", "album_artist": "Someone"}}}
+    with patch("src.lib.id3_tags.ffprobe_file", return_value=ffresult) as ffprobe_file:
+        tags = Id3Tags.from_files([mp3, wav, tmp_path / "missing.mp3"])
+
+    ffprobe_file.assert_called_once()
+    assert tags[mp3] and tags[mp3].title == "01 - The Three Strangers"
+    assert tags[wav] and tags[wav].title == "Chapter 2" and tags[wav].albumartist == "Someone"
+    assert tags[tmp_path / "missing.mp3"] is None
+
+
 @pytest.mark.parametrize(
     "test_dict1, test_dict2, expected",
     [
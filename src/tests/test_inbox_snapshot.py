@@ -0,0 +1,163 @@
+import os
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from src.lib.books_tree import BooksTree
+from src.lib.config import AUDIO_EXTS
+from src.lib.fs_utils import get_size, hash_path, last_updated_at
+from src.lib.inbox_snapshot import InboxSnapshot
+
+FILES = {
+    "book1/01.mp3": 100,
+    "book1/02.mp3": 200,
+    "book1/cover.jpg": 50,
+    "book1/.hidden.mp3": 10,
+    "series/book 2/cd1/01.mp3": 300,
+    "series/book 2/cd2/01.mp3": 400,
+    "series/book 2 extras/notes.txt": 5,
+    "series/book 20/01.m4b": 600,
+    "standalone.m4b": 700,
+    ".DS_Store": 1,
+}
+
+
+@pytest.fixture
+def inbox(tmp_path: Path):
+    for rel, size in FILES.items():
+        f = tmp_path / rel
+        f.parent.mkdir(parents=True, exist_ok=True)
+        f.write_bytes(b"\0" * size)
+    return tmp_path
+
+
+@pytest.fixture
+def snapshot(inbox: Path):
+    return InboxSnapshot(inbox).refresh()
+
+
+def all_dirs(inbox: Path):
+    return [inbox, *sorted(d for d in inbox.rglob("*") if d.is_dir())]
+
+
+def test_snapshot_lists_same_paths_as_rglob(inbox: Path, snapshot: InboxSnapshot):
+    assert sorted(snapshot.paths()) == sorted(inbox.rglob("*"))
+    assert sorted(snapshot.dirs(inbox / "series")) == sorted(d for d in (inbox / "series").rglob("*") if d.is_dir())
+
+
+def test_snapshot_subtree_does_not_leak_into_siblings(inbox: Path, snapshot: InboxSnapshot):
+    # 'book 2' must not pick up 'book 2 extras' or 'book 20'
+    assert sorted(p.relative_to(inbox) for p in snapshot.files(inbox / "series" / "book 2")) == [
+        Path("series/book 2/cd1/01.mp3"),
+        Path("series/book 2/cd2/01.mp3"),
+    ]
+
+
+@pytest.mark.parametrize("only_file_exts", [[], AUDIO_EXTS])
+def test_snapshot_matches_fs_utils(inbox: Path, snapshot: InboxSnapshot, only_file_exts: list[str]):
+    for d in all_dirs(inbox):
+        assert hash_path(d, only_file_exts=only_file_exts, snapshot=snapshot) == hash_path(
+            d, only_file_exts=only_file_exts
+        )
+        assert get_size(d, only_file_exts=only_file_exts, snapshot=snapshot) == get_size(
+            d, only_file_exts=only_file_exts
+        )
+        assert last_updated_at(d, only_file_exts=only_file_exts, snapshot=snapshot) == last_updated_at(
+            d, only_file_exts=only_file_exts
+        )
+
+
+def test_snapshot_is_point_in_time_until_refreshed(inbox: Path, snapshot: InboxSnapshot):
+    before = hash_path(inbox / "book1", snapshot=snapshot)
+    (inbox / "book1" / "03.mp3").write_bytes(b"\0" * 10)
+    assert hash_path(inbox / "book1", snapshot=snapshot) == before
+    assert hash_path(inbox / "book1", snapshot=snapshot.refresh()) != before
+
+
+def test_snapshot_fresh_only_refreshes_when_stale(inbox: Path):
+    snapshot = InboxSnapshot(inbox, max_age=60).fresh()
+    taken_at = snapshot.taken_at
+    assert snapshot.fresh().taken_at == taken_at
+    time.sleep(0.01)
+    assert snapshot.fresh(max_age=0).taken_at > taken_at
+
+
+def test_stale_snapshot_is_only_refreshed_for_the_root(inbox: Path):
+    snapshot = InboxSnapshot(inbox, max_age=60).refresh()
+    taken_at = snapshot.taken_at
+    assert snapshot.for_path(inbox / "book1") is snapshot
+
+    snapshot.max_age = 0
+    time.sleep(0.01)
+    assert snapshot.for_path(inbox / "book1") is None
+    assert snapshot.taken_at == taken_at
+    assert snapshot.for_path(inbox) is snapshot
+    assert snapshot.taken_at > taken_at
+
+
+def test_inbox_item_with_stale_snapshot_only_walks_its_own_dir(inbox: Path):
+    from src.lib.books_tree import BooksTree
+    from src.lib.inbox_item import InboxItem
+
+    snapshot = InboxSnapshot(inbox).refresh()
+    item = InboxItem(BooksTree(inbox / "book1", scan=False), snapshot=snapshot)
+    before = item.hash
+
+    snapshot.taken_at -= 60
+    taken_at = snapshot.taken_at
+    (inbox / "book1" / "03.mp3").write_bytes(b"\0" * 10)
+    with patch.object(InboxSnapshot, "refresh", side_effect=AssertionError("refreshed the whole inbox")):
+        item.set_ok()
+        assert item.hash != before
+        assert item.hash == hash_path(inbox / "book1", only_file_exts=AUDIO_EXTS)
+        assert item.last_updated == last_updated_at(inbox / "book1", only_file_exts=AUDIO_EXTS)
+    assert snapshot.taken_at == taken_at
+
+
+def test_snapshot_falls_back_for_paths_it_does_not_cover(inbox: Path, snapshot: InboxSnapshot):
+    new_dir = inbox / "new book"
+    new_dir.mkdir()
+    (new_dir / "01.mp3").write_bytes(b"\0" * 42)
+    assert not snapshot.covers(new_dir)
+    assert get_size(new_dir, snapshot=snapshot) == 42
+    assert not snapshot.covers(inbox.parent)
+
+
+def test_books_tree_scan_from_snapshot(inbox: Path, snapshot: InboxSnapshot):
+    from_fs = BooksTree(inbox, scan=False).scan(determine_structure=False)
+    from_snapshot = BooksTree(inbox, scan=False).scan(determine_structure=False, snapshot=snapshot)
+    assert [c.path for c in from_snapshot.children_recursive] == [c.path for c in from_fs.children_recursive]
+    assert os.path.basename(from_snapshot.files[0].path) == "standalone.m4b"
+
+
+def test_snapshot_fingerprints_only_change_for_touched_entries(inbox: Path, snapshot: InboxSnapshot):
+    before = snapshot.fingerprints()
+    assert set(before) == {"book1", "series", "standalone.m4b", ".DS_Store"}
+
+    (inbox / "series" / "book 20" / "02.m4b").write_bytes(b"\0" * 10)
+    (inbox / "new book").mkdir()
+    after = snapshot.refresh().fingerprints()
+    assert {k for k in {*before, *after} if before.get(k) != after.get(k)} == {"series", "new book"}
+
+
+@pytest.mark.parametrize("use_snapshot", [True, False])
+def test_books_tree_rescan_matches_full_scan(inbox: Path, use_snapshot: bool):
+    snapshot = InboxSnapshot(inbox).refresh() if use_snapshot else None
+    tree = BooksTree(inbox, scan=False).scan(scan_id3=False, determine_structure=False, snapshot=snapshot)
+
+    (inbox / "book1" / "03.mp3").write_bytes(b"\0" * 300)
+    (inbox / "series" / "book 20" / "01.m4b").unlink()
+    (inbox / "standalone.m4b").rename(inbox / "renamed.m4b")
+    (inbox / "new book").mkdir()
+    (inbox / "new book" / "01.mp3").write_bytes(b"\0" * 10)
+    if snapshot is not None:
+        snapshot.refresh()
+
+    names = {"book1", "series", "standalone.m4b", "renamed.m4b", "new book"}
+    tree.rescan(names, scan_id3=False, determine_structure=False, snapshot=snapshot)
+    full = BooksTree(inbox, scan=False).scan(scan_id3=False, determine_structure=False, snapshot=snapshot)
+    assert tree.to_dict(fs_only=True) == full.to_dict(fs_only=True)
+    assert [c.path for c in tree.children_recursive] == [c.path for c in full.children_recursive]
+    assert all(c.parent is tree for c in tree.children)
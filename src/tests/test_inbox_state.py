@@ -1,9 +1,16 @@
+import os
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch, PropertyMock
+
 import pytest
 
 from src.lib.audiobook import Audiobook
 from src.lib.books_tree import BooksTree
+from src.lib.config import cfg
 from src.lib.fs_utils import hash_path_audio_files
-from src.lib.inbox_state import InboxState
+from src.lib.inbox_state import _sync_failed_to_env, InboxState
 from src.lib.misc import isorted
 from src.tests.helpers.pytest_utils import testutils
 
@@ -88,3 +95,86 @@ class TestInboxState:
 
         for item in inbox.matched_ok_books.values():
             assert item.status == "new"
+
+
+def test_polling_rescans_only_changed_books(tmp_path: Path):
+    for book in ("Author - Book 1", "Author - Book 2"):
+        (d := tmp_path / book).mkdir()
+        for i in range(3):
+            (d / f"{i + 1:02d} - Chapter.mp3").write_bytes(b"\0" * 100)
+
+    with (
+        patch.object(type(cfg), "inbox_dir", new_callable=PropertyMock, return_value=tmp_path),
+        patch.object(type(cfg), "MATCH_FILTER", new_callable=PropertyMock, return_value=None),
+        patch.object(type(cfg), "USE_SCAN_CACHE", new_callable=PropertyMock, return_value=False),
+        patch.object(type(cfg), "WATCH_MODE", new_callable=PropertyMock, return_value="poll"),
+    ):
+        InboxState._instance = None  # type: ignore
+        try:
+            inbox = InboxState()
+            inbox.start_watching()
+            assert not inbox.is_watching
+            book1, book2 = inbox.tree.dirs["Author - Book 1"], inbox.tree.dirs["Author - Book 2"]
+            item1, item2 = inbox.get("Author - Book 1"), inbox.get("Author - Book 2")
+
+            inbox.wait_for_changes(0)
+            (tmp_path / "Author - Book 2" / "04 - Chapter.mp3").write_bytes(b"\0" * 100)
+            with (
+                patch.object(BooksTree, "scan", autospec=True, side_effect=BooksTree.scan) as scan,
+                patch.object(BooksTree, "rescan", autospec=True, side_effect=BooksTree.rescan) as rescan,
+            ):
+                inbox.scan(force=True)
+
+            scan.assert_not_called()
+            assert rescan.call_args.args[1] == {"Author - Book 2"}
+            assert inbox.tree.dirs["Author - Book 1"] is book1
+            assert inbox.tree.dirs["Author - Book 2"] is not book2
+            assert len(inbox.tree.dirs["Author - Book 2"].files) == 4
+            # items are kept, and only the changed one points at a rebuilt tree
+            assert inbox.get("Author - Book 1") is item1 and item1.tree is book1
+            assert inbox.get("Author - Book 2") is item2 and item2.tree is not book2
+        finally:
+            InboxState._instance = None  # type: ignore
+
+
+def test_items_can_be_set_while_another_thread_reads_them(tmp_path: Path):
+    for i in range(3):
+        (d := tmp_path / f"Author - Book {i}").mkdir()
+        (d / "01 - Chapter.mp3").write_bytes(b"\0" * 100)
+
+    reading = threading.Event()
+
+    class SlowToRead:
+        key = "Slow"
+        last_updated = 0.0
+
+        @property
+        def status(self):
+            reading.set()
+            time.sleep(0.2)
+            return "failed"
+
+    with (
+        patch.object(type(cfg), "inbox_dir", new_callable=PropertyMock, return_value=tmp_path),
+        patch.object(type(cfg), "MATCH_FILTER", new_callable=PropertyMock, return_value=None),
+        patch.object(type(cfg), "USE_SCAN_CACHE", new_callable=PropertyMock, return_value=False),
+        patch.dict(os.environ),  # _sync_failed_to_env sets FAILED_BOOKS
+    ):
+        InboxState._instance = None  # type: ignore
+        try:
+            inbox = InboxState()
+            inbox._items = {"Slow": SlowToRead(), **inbox._items}  # type: ignore
+
+            # A new key, like after a standalone file was moved into its own dir, set while iterating
+            def set_new_item():
+                reading.wait()
+                inbox.set("Moved", status="ok")
+
+            writer = threading.Thread(target=set_new_item)
+            writer.start()
+            _sync_failed_to_env()
+            writer.join()
+
+            assert "Moved" in inbox.items
+        finally:
+            InboxState._instance = None  # type: ignore
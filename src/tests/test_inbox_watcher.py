@@ -0,0 +1,51 @@
+import time
+from pathlib import Path
+
+import pytest
+
+from src.lib.inbox_watcher import get_inbox_watcher, InboxWatcher, inotify_available, top_level_names
+
+needs_inotify = pytest.mark.skipif(not inotify_available(), reason="inotify is not available on this system")
+
+
+def test_top_level_names(tmp_path: Path):
+    assert top_level_names(
+        [
+            tmp_path / "Series" / "Book 1" / "01.mp3",
+            tmp_path / "Series" / "Book 2",
+            tmp_path / "standalone.mp3",
+            tmp_path,
+            tmp_path.parent / "elsewhere.mp3",
+        ],
+        tmp_path,
+    ) == {"Series", "standalone.mp3"}
+
+
+def test_poll_watcher_reports_no_changes(tmp_path: Path):
+    watcher = get_inbox_watcher(tmp_path, "poll")
+    assert type(watcher) is InboxWatcher
+    assert watcher.wait(0) == set()
+
+
+@needs_inotify
+def test_inotify_watcher_reports_changed_paths(tmp_path: Path):
+    (tmp_path / "book1").mkdir()
+    with get_inbox_watcher(tmp_path, "inotify") as watcher:
+        assert watcher.mode == "inotify"
+        assert watcher.wait(0) == set()
+
+        (tmp_path / "book1" / "01.mp3").write_bytes(b"\0")
+        changed = watcher.wait(1)
+        assert tmp_path / "book1" / "01.mp3" in changed
+
+
+@needs_inotify
+def test_inotify_watcher_follows_new_dirs(tmp_path: Path):
+    with get_inbox_watcher(tmp_path, "inotify") as watcher:
+        (tmp_path / "new book" / "disc 1").mkdir(parents=True)
+        assert top_level_names(watcher.wait(1) or [], tmp_path) == {"new book"}
+
+        # Files added to a dir that was created after the watcher started are still seen
+        time.sleep(0.05)
+        (tmp_path / "new book" / "disc 1" / "01.mp3").write_bytes(b"\0")
+        assert tmp_path / "new book" / "disc 1" / "01.mp3" in (watcher.wait(1) or set())
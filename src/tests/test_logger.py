@@ -1,12 +1,28 @@
+import json
 import re
+import shutil
+import threading
+import time
 from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
 
 import pytest
 
 from src.auto_m4b import app
 from src.lib.audiobook import Audiobook
-from src.lib.logger import log_global_results
+from src.lib.logger import (
+    _read_log_table,
+    get_log_entry,
+    log_global_results,
+    open_run_log,
+    parse_log_line,
+    render_global_log,
+    run_log_path,
+)
+from src.lib.run_log import RunLog
 from src.tests.conftest import TEST_DIRS
+from src.tests.helpers.pytest_dumps import FIXTURES_ROOT
 
 FIRST_LINE = (
     r"2023-10-21 22:37:37-0700\s{2,}"
@@ -196,3 +212,132 @@ def test_logs_m4b_tool_failures(corrupt_audiobook: Audiobook, global_test_log: P
     assert sample_audio.exists()
     ffprobe_log = corrupt_audiobook.sample_audio1.with_suffix(".ffprobe-error.txt")
     assert ffprobe_log.exists()
+
+
+def fake_book(name: str):
+    return SimpleNamespace(
+        basename=name,
+        bitrate_friendly="64 kb/s",
+        samplerate_friendly="44.1 kHz",
+        orig_file_type="mp3",
+        num_files=lambda *_: 3,
+        size=lambda *_: "120 MB",
+        duration=lambda *_: "4h:01m:02s",
+        inbox_dir=Path("/inbox") / name,
+    )
+
+
+@pytest.fixture
+def sample_log(tmp_path: Path):
+    log_file = tmp_path / "auto-m4b.log"
+    shutil.copy2(FIXTURES_ROOT / "sample-auto-m4b.log", log_file)
+    return log_file
+
+
+def test_log_global_results_appends_without_rewriting(sample_log: Path):
+    orig = sample_log.read_text()
+    log_global_results(fake_book("Terry  Pratchett - Mort"), "success", 163, sample_log)  # type: ignore
+    log_global_results(fake_book("Terry Pratchett - Sourcery"), "failed", 0, sample_log)  # type: ignore
+
+    text = sample_log.read_text()
+    assert text.startswith(orig.rstrip("\n") + "\n")
+    new_lines = text.splitlines()[-2:]
+    assert parse_log_line(new_lines[0])[1:] == [
+        "SUCCESS",
+        "Terry Pratchett - Mort",
+        "64 kb/s",
+        "44.1 kHz",
+        ".mp3",
+        "3 files",
+        "120 MB",
+        "4h:01m:02s",
+        "02:43",
+    ]
+    assert parse_log_line(new_lines[1])[1:3] == ["FAILED", "Terry Pratchett - Sourcery"]
+    # the new rows line up with the existing table
+    header = text.splitlines()[0]
+    assert new_lines[0].index("SUCCESS") == header.index("Result")
+    assert new_lines[0].index("Terry") == header.index("Original Folder")
+    assert new_lines[0].index(" kHz") + 4 == header.index("Sample Rate") + len("Sample Rate")
+
+    # the existing rows were imported into the run log the first time it was written to
+    entries = [json.loads(line) for line in run_log_path(sample_log).read_text().splitlines()]
+    assert len(entries) == len(orig.splitlines()) - 1 + 2
+    assert entries[0]["book_name"] == "Stephen Hawking - A Brief History of Time"
+    assert entries[-2]["elapsed_s"] == 163
+    assert entries[-1]["path"] == "/inbox/Terry Pratchett - Sourcery"
+
+
+def test_log_global_results_starts_a_new_log(tmp_path: Path):
+    log_file = tmp_path / "auto-m4b.log"
+    log_global_results(fake_book("Mort"), "success", 5, log_file)  # type: ignore
+    header, line = log_file.read_text().splitlines()
+    assert list(map(str.strip, re.split(r"\s{2,}", header))) == [
+        "Date",
+        "Result",
+        "Original Folder",
+        "Bitrate",
+        "Sample Rate",
+        "Type",
+        "Files",
+        "Size",
+        "Duration",
+        "Time",
+    ]
+    assert parse_log_line(line)[1:3] == ["SUCCESS", "Mort"]
+
+
+def test_log_table_is_imported_once(sample_log: Path):
+    num_rows = len(sample_log.read_text().splitlines()) - 1
+    barrier = threading.Barrier(4)
+
+    def slow_read(log_file: Path):
+        time.sleep(0.05)
+        return _read_log_table(log_file)
+
+    def log(i: int):
+        barrier.wait()
+        log_global_results(fake_book(f"Book {i}"), "success", 5, sample_log)  # type: ignore
+
+    with patch("src.lib.logger._read_log_table", side_effect=slow_read) as read:
+        threads = [threading.Thread(target=log, args=(i,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert read.call_count == 1
+    assert len(open_run_log(sample_log)) == num_rows + 4
+
+
+def test_get_log_entry_uses_the_run_log(sample_log: Path):
+    assert re.match(
+        r"^2023-10-22 10:11:57-0700\s{2,}SUCCESS\s{2,}Neil Gaiman - The Graveyard Book\s{2,}64 kb/s",
+        get_log_entry(Path("/inbox/Neil Gaiman - The Graveyard Book"), sample_log),
+    )
+    assert get_log_entry(Path("/inbox/Neil Gaiman"), sample_log) == ""
+
+    # books logged by another process are found too
+    RunLog(run_log_path(sample_log)).append({"result": "SUCCESS", "book_name": "Neil Gaiman"})
+    assert "Neil Gaiman" in get_log_entry(Path("/inbox/Neil Gaiman"), sample_log)
+
+
+def test_run_log_index_skips_partial_lines(tmp_path: Path):
+    run_log = RunLog(tmp_path / "run.jsonl")
+    run_log.append({"book_name": "Mort", "result": "FAILED"})
+    with open(run_log.path, "a") as f:
+        f.write('{"book_name": "Mort", "res')
+    assert [e["result"] for e in run_log.find("Mort")] == ["FAILED"]
+
+    with open(run_log.path, "a") as f:
+        f.write('ult": "SUCCESS"}\n')
+    assert run_log.last("Mort") == {"book_name": "Mort", "result": "SUCCESS"}
+    assert len(run_log) == 2
+
+
+def test_render_global_log(sample_log: Path):
+    log_global_results(fake_book("Mort"), "success", 5, sample_log)  # type: ignore
+    rows = [parse_log_line(line) for line in sample_log.read_text().splitlines()[1:]]
+    rendered = render_global_log(sample_log).splitlines()
+    assert rendered[0].split()[:2] == ["Date", "Result"]
+    assert [parse_log_line(line) for line in rendered[1:]] == rows
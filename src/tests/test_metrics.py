@@ -0,0 +1,90 @@
+import json
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch, PropertyMock
+
+import pytest
+
+from src.lib.config import cfg
+from src.lib.metrics import Metrics, METRICS_FILE, PROMETHEUS_FILE
+
+
+@pytest.fixture
+def meta_dir(tmp_path: Path):
+    with patch.object(type(cfg), "META_DIR", new_callable=PropertyMock, return_value=tmp_path):
+        yield tmp_path
+
+
+def test_spans_are_aggregated_per_book_and_exported_per_loop(meta_dir: Path):
+    metrics = Metrics()
+    mort = SimpleNamespace(basename="Mort")
+
+    @metrics.timed("backup")
+    def backup(book):
+        time.sleep(0.01)
+
+    with metrics.loop(3):
+        with metrics.span("scan"):
+            pass
+        backup(mort)
+        threads = [threading.Thread(target=lambda: metrics.record("convert.transcode", 0.5, mort)) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        metrics.record("convert.transcode", 1.0, "Sourcery")
+
+        snapshot = metrics.snapshot()
+        assert snapshot["books"]["Mort"]["backup"]["count"] == 1
+        assert snapshot["books"]["Mort"]["backup"]["seconds"] >= 0.01
+        assert snapshot["books"]["Mort"]["convert.transcode"] == {"count": 4, "seconds": 2.0}
+        assert snapshot["spans"]["convert.transcode"] == {"count": 5, "seconds": 3.0}
+        assert snapshot["spans"]["scan"]["count"] == 1
+
+    rows = [json.loads(line) for line in (meta_dir / METRICS_FILE).read_text().splitlines()]
+    assert [(r["type"], r.get("book")) for r in rows] == [("book", "Mort"), ("book", "Sourcery"), ("loop", None)]
+    assert all(r["loop"] == 3 for r in rows)
+    assert rows[0]["spans"]["convert.transcode"] == {"count": 4, "seconds": 2.0}
+    assert rows[2]["books"] == 2
+    assert "scan" in rows[2]["spans"]
+
+    prom = (meta_dir / PROMETHEUS_FILE).read_text()
+    assert 'auto_m4b_span_seconds_total{span="convert.transcode"} 3.0000' in prom
+    assert 'auto_m4b_span_count_total{span="backup"} 1' in prom
+    assert "auto_m4b_books_total 2" in prom
+    assert "auto_m4b_loops_total 1" in prom
+
+
+def test_loops_without_books_are_not_exported(meta_dir: Path):
+    metrics = Metrics()
+    with metrics.loop(1):
+        with metrics.span("scan"):
+            pass
+    assert not (meta_dir / METRICS_FILE).exists()
+
+    # but their spans still count towards the totals
+    with metrics.loop(2):
+        metrics.record("backup", 1.0, "Mort")
+    assert 'auto_m4b_span_count_total{span="scan"} 1' in (meta_dir / PROMETHEUS_FILE).read_text()
+
+
+def test_spans_are_recorded_when_the_block_raises(meta_dir: Path):
+    metrics = Metrics()
+    with metrics.loop(1):
+        with pytest.raises(ValueError):
+            with metrics.span("convert", "Mort"):
+                raise ValueError("ffmpeg failed")
+        assert metrics.snapshot()["books"]["Mort"]["convert"]["count"] == 1
+
+
+def test_metrics_can_be_disabled(meta_dir: Path):
+    metrics = Metrics()
+    with patch.object(type(cfg), "METRICS", new_callable=PropertyMock, return_value=False):
+        with metrics.loop(1):
+            with metrics.span("backup", "Mort"):
+                pass
+            assert metrics.snapshot() == {"books": {}, "spans": {}}
+    assert not (meta_dir / METRICS_FILE).exists()
+    assert not (meta_dir / PROMETHEUS_FILE).exists()
@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch, PropertyMock
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from src.lib.config import cfg
+from src.lib.ol_client import OpenLibraryClient, RateLimiter
+
+AUTHORS = [
+    {"key": "OL1A", "name": "Terry Pratchett", "type": "author", "work_count": 400, "ratings_count": 10},
+    {"key": "OL2A", "name": "Terry Pratchett Jr", "type": "author", "work_count": 1},
+]
+WORKS = [{"key": "/works/OL1W", "title": "Mort", "author_name": ["Terry Pratchett"], "author_key": ["OL1A"]}]
+
+
+class StandInOpenLibrary(ThreadingHTTPServer):
+    """Answers the Open Library search endpoints like the real API, slowly, and counts the requests."""
+
+    def __init__(self, delay: float = 0.2):
+        self.delay = delay
+        self.requests: Counter[str] = Counter()
+        self.user_agents: set[str] = set()
+        self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), _Handler)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: StandInOpenLibrary
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests[self.path] += 1
+            self.server.user_agents.add(self.headers["User-Agent"])
+        time.sleep(self.server.delay)
+        url = urlparse(self.path)
+        q = " ".join(v[0] for v in parse_qs(url.query).values()).lower()
+        match url.path:
+            case "/search/authors.json":
+                docs = [d for d in AUTHORS if q in d["name"].lower()]
+            case "/search.json":
+                docs = [d for d in WORKS if d["title"].lower() in q]
+            case _:
+                self.send_error(404)
+                return
+        body = json.dumps({"numFound": len(docs), "docs": docs}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = StandInOpenLibrary()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(server: StandInOpenLibrary):
+    client = OpenLibraryClient(server.url, rate_limit=0, cache=False)
+    yield client
+    client.close()
+
+
+def test_identical_requests_in_flight_are_coalesced(server: StandInOpenLibrary, client: OpenLibraryClient):
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: client.get_json("/search/authors.json?q=mort", "test/1.0"), range(8)))
+    assert all(r == {"numFound": 0, "docs": []} for r in results)
+    assert server.requests == {"/search/authors.json?q=mort": 1}
+    assert server.user_agents == {"test/1.0"}
+
+    # Once it's done, the same request is made again
+    client.get_json("/search/authors.json?q=mort", "test/1.0")
+    assert server.requests["/search/authors.json?q=mort"] == 2
+
+
+def test_different_requests_run_concurrently(server: StandInOpenLibrary, client: OpenLibraryClient):
+    start = time.monotonic()
+    futures = [client.submit(f"/search/authors.json?q={q}") for q in ("q1", "q2", "q3", "q4")]
+    assert [f.result()["numFound"] for f in futures] == [0, 0, 0, 0]
+    # Four 0.2s requests on four connections take about as long as one
+    assert time.monotonic() - start < 0.6
+    assert len(server.requests) == 4
+
+
+def test_errors_are_raised(client: OpenLibraryClient):
+    with pytest.raises(Exception, match="404"):
+        client.get_json("/nope.json")
+
+
+def test_rate_limiter_bounds_the_request_rate():
+    limiter = RateLimiter(rate=20, burst=2)
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+    # 2 in the first burst, then 4 more at 20/s
+    assert 0.18 < time.monotonic() - start < 0.5
+
+
+def test_rate_limit_applies_to_requests(server: StandInOpenLibrary):
+    server.delay = 0
+    client = OpenLibraryClient(server.url, max_connections=2, rate_limit=20, cache=False)
+    try:
+        start = time.monotonic()
+        for f in [client.submit(f"/search/authors.json?q={i}") for i in range(6)]:
+            f.result()
+        assert time.monotonic() - start > 0.18
+    finally:
+        client.close()
+
+
+def test_lookups_from_concurrent_books_share_requests(server: StandInOpenLibrary, client: OpenLibraryClient):
+    from src.lib.ol_lookup import open_library_lookup_author, open_library_lookup_title
+
+    with (
+        patch("src.lib.ol_client.olClient", client),
+        patch("src.lib.ol_index.get_ol_index", return_value=None),
+        patch.object(
+            type(cfg), "OPEN_LIBRARY_USER_AGENT", new_callable=PropertyMock, return_value="MyApp/1.0 (me@example.com)"
+        ),
+        ThreadPoolExecutor(max_workers=4) as pool,
+    ):
+        authors = list(pool.map(lambda _: open_library_lookup_author("Terry Pratchett"), range(4)))
+        assert server.requests["/search/authors.json?q=terry+pratchett"] == 1
+        title = open_library_lookup_title("Mort", author="Terry Pratchett")
+
+    assert all(a and a.name == "Terry Pratchett" for a in authors)
+    assert title and title.title == "Mort" and title.author == "Terry Pratchett"
@@ -0,0 +1,102 @@
+import gzip
+import json
+from pathlib import Path
+from unittest.mock import patch, PropertyMock
+
+import pytest
+
+from src.lib.config import cfg
+from src.lib.ol_index import build_index, OL_INDEX_FILE, OpenLibraryIndex
+
+
+def record(type_: str, key: str, **data) -> str:
+    return "\t".join([f"/type/{type_}", key, "1", "2024-01-01T00:00:00", json.dumps({"key": key, **data})])
+
+
+def work(key: str, title: str, *authors: str, **data) -> str:
+    return record(
+        "work", key, title=title, authors=[{"author": {"key": f"/authors/{a}"}} for a in authors], **data
+    )
+
+
+@pytest.fixture
+def ol_index(tmp_path: Path):
+    authors = tmp_path / "ol_dump_authors.txt.gz"
+    with gzip.open(authors, "wt") as f:
+        for line in [
+            record("author", "/authors/OL1A", name="J.R.R. Tolkien", alternate_names=["John Ronald Reuel Tolkien"]),
+            record("author", "/authors/OL2A", name="Christopher Tolkien"),
+            record("author", "/authors/OL3A", name="Terry Pratchett"),
+        ]:
+            f.write(line + "\n")
+    works = tmp_path / "ol_dump_works.txt"
+    works.write_text(
+        "\n".join(
+            [
+                work("/works/OL1W", "The Hobbit", "OL1A", first_publish_date="September 21, 1937"),
+                work("/works/OL2W", "The Silmarillion", "OL1A", "OL2A"),
+                work("/works/OL3W", "Mort", "OL3A"),
+                record("edition", "/books/OL1M", title="The Hobbit"),
+            ]
+        )
+    )
+    ratings = tmp_path / "ol_dump_ratings.txt"
+    ratings.write_text("/works/OL1W\t/books/OL1M\t5\t2024-01-01\n/works/OL1W\t\t4\t2024-01-02\n")
+    reading_log = tmp_path / "ol_dump_reading-log.txt"
+    reading_log.write_text("/works/OL1W\t\tWant to Read\t2024-01-01\n/works/OL2W\t\tAlready Read\t2024-01-01\n")
+
+    db_path = tmp_path / OL_INDEX_FILE
+    assert build_index([authors, works, ratings, reading_log], db_path) == (3, 3)
+    with patch.object(type(cfg), "META_DIR", new_callable=PropertyMock, return_value=tmp_path):
+        yield OpenLibraryIndex(db_path)
+
+
+def test_search_authors(ol_index: OpenLibraryIndex):
+    docs, found = ol_index.search_authors("j.r.r. tolkien")
+    assert found == 1
+    assert docs[0]["key"] == "OL1A"
+    assert docs[0]["name"] == "J.R.R. Tolkien"
+    assert docs[0]["alternate_names"] == ["John Ronald Reuel Tolkien"]
+    assert docs[0]["work_count"] == 2
+    assert docs[0]["ratings_count"] == 2
+    assert docs[0]["want_to_read_count"] == 1
+    assert docs[0]["already_read_count"] == 1
+
+    docs, found = ol_index.search_authors("tolkien")
+    assert [d["key"] for d in docs] == ["OL1A", "OL2A"]
+    assert found == 2
+    assert ol_index.search_authors("john ronald reuel tolkien")[0][0]["key"] == "OL1A"
+    assert ol_index.search_authors("nobody") == ([], 0)
+    assert ol_index.search_authors("*") == ([], 0)
+
+
+def test_search_titles(ol_index: OpenLibraryIndex):
+    docs, found = ol_index.search_titles("the hobbit")
+    assert found == 1
+    assert docs[0]["key"] == "/works/OL1W"
+    assert docs[0]["title"] == "The Hobbit"
+    assert docs[0]["author_name"] == ["J.R.R. Tolkien"]
+    assert docs[0]["author_key"] == ["OL1A"]
+    assert docs[0]["first_publish_year"] == 1937
+    assert docs[0]["ratings_count"] == 2
+
+    docs, _ = ol_index.search_titles("the silmarillion", "christopher tolkien")
+    assert sorted(docs[0]["author_name"]) == ["Christopher Tolkien", "J.R.R. Tolkien"]
+    assert ol_index.search_titles("mort", "tolkien") == ([], 0)
+
+
+def test_lookups_use_the_index_without_requests(ol_index: OpenLibraryIndex):
+    from src.lib.ol_lookup import open_library_lookup_author, open_library_lookup_title
+
+    with (
+        patch.object(type(cfg), "OPEN_LIBRARY_USER_AGENT", new_callable=PropertyMock, return_value=""),
+        patch("src.lib.ol_client.OpenLibraryClient.submit", side_effect=AssertionError("should not make requests")),
+    ):
+        author = open_library_lookup_author("J.R.R. Tolkien")
+        title = open_library_lookup_title("The Hobbit", author="J.R.R. Tolkien")
+
+    assert author and author.name == "J.R.R. Tolkien"
+    assert author.score(fallback=0) > 1
+    assert title and title.title == "The Hobbit"
+    assert title.author == "J.R.R. Tolkien"
+    assert title.date == "1937"
@@ -1,4 +1,8 @@
+import os
+import subprocess
+import sys
 from pathlib import Path
+from unittest.mock import patch, PropertyMock
 
 import pytest
 
@@ -494,3 +498,94 @@ def test_get_nlp_names(test_case, expected):
         assert name == exp_name
         assert label.startswith("PER"), f"{name} does not start with PER____"
         assert score == pytest.approx(exp_score, abs=0.1), f"{name} - score {score} != {exp_score} ±0.1"
+
+
+def test_importing_parsers_does_not_load_nlp_models():
+
+    root = Path(__file__).parent.parent.parent
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys; import src.lib.parsers; "
+            "print([m for m in ('spacy', 'nltk', 'transformers', 'inflect') if m in sys.modules])",
+        ],
+        cwd=root,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join([str(root), str(root / "src")])},
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_get_nlp_names_with_nlp_disabled():
+
+    from src.lib.config import cfg
+    from src.lib.nlp import NLPModels
+    from src.lib.parsers import get_nlp_names, heuristic_score
+
+    orig = cfg.USE_NLP
+    cfg.USE_NLP = False  # type: ignore[assignment]
+    try:
+        models = NLPModels()
+        assert not models.spacy("Stephen King").ents
+        assert models.trf("Stephen King") == []
+        assert models.pos_tag("Stephen King books") == [("Stephen", "NNP"), ("King", "NNP"), ("books", "NN")]
+        assert repr(models) == "NLPModels(nothing loaded)"
+        assert get_nlp_names("Stephen King", no_cache=True) == []
+        assert heuristic_score("Stephen King") > 0
+    finally:
+        cfg.USE_NLP = orig  # type: ignore[assignment]
+
+
+def test_nlp_docs_are_parsed_in_batches():
+
+    from src.lib.config import cfg
+    from src.lib.nlp import NLPModels
+
+    class FakeSpacy:
+        def __init__(self):
+            self.batches: list[list[str]] = []
+
+        def pipe(self, texts, batch_size):
+            self.batches.append(list(texts))
+            return (f"doc:{t}" for t in texts)
+
+    orig = cfg.USE_NLP
+    cfg.USE_NLP = True  # type: ignore[assignment]
+    try:
+        models = NLPModels()
+        models._loaded["spacy model"] = fake = FakeSpacy()
+        assert models.docs(["Stephen King", "Neil Gaiman", "Stephen King"]) == [
+            "doc:Stephen King",
+            "doc:Neil Gaiman",
+            "doc:Stephen King",
+        ]
+        assert models.doc("Neil Gaiman") == "doc:Neil Gaiman"
+        models.docs(["Neil Gaiman", "Terry Pratchett"])
+        assert fake.batches == [["Stephen King", "Neil Gaiman"], ["Terry Pratchett"]]
+    finally:
+        cfg.USE_NLP = orig  # type: ignore[assignment]
+
+
+def test_cached_ner_pipeline_batches_uncached_texts(tmp_path: Path):
+
+    from src.lib.config import cfg
+    from src.lib.nlp import CachedNERPipeline
+
+    calls = []
+
+    def fake_pipeline(texts, batch_size):
+        calls.append(list(texts))
+        return [[{"entity_group": "PER", "score": 0.9, "word": t, "start": 0, "end": len(t)}] for t in texts]
+
+    with patch.object(type(cfg), "META_DIR", new_callable=PropertyMock, return_value=tmp_path):
+        trf = CachedNERPipeline(fake_pipeline, "fake")
+        assert [r[0]["word"] for r in trf.batch(["Stephen King", "Neil Gaiman"])] == ["Stephen King", "Neil Gaiman"]
+        assert trf("Neil Gaiman")[0]["word"] == "Neil Gaiman"
+        # A fresh pipeline reads the results back from the model cache
+        trf = CachedNERPipeline(fake_pipeline, "fake")
+        trf.batch(["Terry Pratchett", "Stephen King"])
+
+    assert calls == [["Stephen King", "Neil Gaiman"], ["Terry Pratchett"]]
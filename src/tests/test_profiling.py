@@ -0,0 +1,88 @@
+import pstats
+from pathlib import Path
+from unittest.mock import patch, PropertyMock
+
+import pytest
+
+from src.lib.config import AutoM4bArgs, cfg
+from src.lib.profiling import profiled, profiles_dir
+
+
+@pytest.fixture
+def meta_dir(tmp_path: Path):
+    with patch.object(type(cfg), "META_DIR", new_callable=PropertyMock, return_value=tmp_path / "meta"):
+        yield tmp_path / "meta"
+
+
+def busy():
+    return sum(i * i for i in range(10_000))
+
+
+def test_profiled_saves_profile_and_summary(meta_dir: Path):
+    with profiled("loop-0001", enabled=True):
+        busy()
+        # nested blocks are part of the outer profile
+        with profiled("loop-0001-scan", enabled=True):
+            busy()
+
+    out_dir = profiles_dir()
+    assert out_dir.parent == meta_dir / "profiles"
+    assert sorted(f.name for f in out_dir.iterdir()) == ["loop-0001.prof", "loop-0001.txt"]
+    summary = (out_dir / "loop-0001.txt").read_text()
+    assert summary.startswith("loop-0001: ")
+    assert "Top 30 by cumulative time" in summary
+    assert "Top 30 by tottime time" in summary
+    assert "busy" in summary
+
+    calls = {f[2]: v[0] for f, v in pstats.Stats(str(out_dir / "loop-0001.prof")).stats.items()}  # type: ignore
+    assert calls["busy"] == 2
+
+
+def test_profiles_with_the_same_name_are_combined(meta_dir: Path):
+    for _ in range(3):
+        with profiled("loop-0002-scan", enabled=True):
+            busy()
+    stats = pstats.Stats(str(profiles_dir() / "loop-0002-scan.prof"))
+    assert {f[2]: v[0] for f, v in stats.stats.items()}["busy"] == 3  # type: ignore
+
+
+def test_profiling_is_off_by_default(meta_dir: Path):
+    with profiled("loop-0001"):
+        busy()
+    assert not (meta_dir / "profiles").exists()
+
+    with patch.object(type(cfg), "PROFILE", new_callable=PropertyMock, return_value=True):
+        with profiled("loop-0001"):
+            busy()
+    assert (profiles_dir() / "loop-0001.prof").exists()
+
+
+def test_scan_inbox_only(tmp_path: Path, meta_dir: Path):
+    from src.lib.run import scan_inbox_only
+
+    inbox = tmp_path / "inbox"
+    for book in ("Author - Book 1", "Author - Book 2"):
+        (d := inbox / book).mkdir(parents=True)
+        for i in range(3):
+            (d / f"{i + 1:02d} - Chapter.mp3").touch()
+    (inbox / "Standalone.mp3").touch()
+
+    with (
+        patch.object(type(cfg), "inbox_dir", new_callable=PropertyMock, return_value=inbox),
+        patch.object(type(cfg), "PROFILE", new_callable=PropertyMock, return_value=True),
+    ):
+        tree = scan_inbox_only(4)
+
+    assert len(tree.files_recursive) == 7
+    assert {b.rel_path for b in tree.books} >= {Path("Author - Book 1"), Path("Author - Book 2")}
+    assert (profiles_dir() / "loop-0004-scan-only.txt").exists()
+    # nothing in the inbox was touched
+    assert sorted(p.name for p in inbox.iterdir()) == ["Author - Book 1", "Author - Book 2", "Standalone.mp3"]
+
+
+def test_args():
+    args = AutoM4bArgs(profile=True, scan_only=True, max_loops=2)
+    assert args.profile is True
+    assert args.scan_only is True
+    assert AutoM4bArgs().profile is None
+    assert AutoM4bArgs().scan_only is False
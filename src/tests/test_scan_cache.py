@@ -0,0 +1,74 @@
+import shutil
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from src.lib.books_tree import BooksTree
+from src.lib.id3_tags import Id3Tags
+from src.lib.inbox_snapshot import InboxSnapshot
+from src.lib.scan_cache import ScanCache
+from src.tests.helpers.pytest_dumps import FIXTURES_ROOT
+
+BOOKS = ["tiny__flat_mp3", "old_mill__multidisc_mp3", "chanur_series__series_mp3", "basic_no_cover__standalone_mp3.mp3"]
+
+
+@pytest.fixture
+def inbox(tmp_path: Path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    for name in BOOKS:
+        src = FIXTURES_ROOT / name
+        shutil.copytree(src, inbox / name) if src.is_dir() else shutil.copy2(src, inbox / name)
+    return inbox
+
+
+def scan(inbox: Path, cache: ScanCache):
+    snapshot = InboxSnapshot(inbox).refresh()
+    fingerprints = snapshot.fingerprints()
+    cache.load(fingerprints)
+    tree = BooksTree(inbox, scan=False).scan(scan_id3=True, snapshot=snapshot, scan_cache=cache)
+    cache.save(tree, fingerprints)
+    return tree
+
+
+def structures(tree: BooksTree):
+    return {str(c.path): (c.structure, c.is_book_root) for c in tree.children_recursive}
+
+
+def test_scan_cache_restores_unchanged_books_without_rescoring(inbox: Path, tmp_path: Path):
+    db = tmp_path / "scan_cache.db"
+    cold = scan(inbox, ScanCache(inbox, db))
+    Id3Tags.clear_cache()
+
+    with (
+        patch("src.lib.scorers.score_flat") as score_flat,
+        patch("src.lib.scorers.score_multi_part_or_disc") as score_multi_part_or_disc,
+        patch("src.lib.id3_tags.ffprobe_file") as ffprobe_file,
+    ):
+        warm = scan(inbox, cache := ScanCache(inbox, db))
+    score_flat.assert_not_called()
+    score_multi_part_or_disc.assert_not_called()
+    ffprobe_file.assert_not_called()
+    assert cache.load(InboxSnapshot(inbox).refresh().fingerprints()) == set(BOOKS)
+    assert structures(warm) == structures(cold)
+
+
+def test_scan_cache_misses_books_that_changed(inbox: Path, tmp_path: Path):
+    db = tmp_path / "scan_cache.db"
+    scan(inbox, ScanCache(inbox, db))
+
+    shutil.rmtree(inbox / "old_mill__multidisc_mp3")
+    (inbox / "tiny__flat_mp3" / "cover.jpg").write_bytes(b"\0")
+    cache = ScanCache(inbox, db)
+    assert cache.load(InboxSnapshot(inbox).refresh().fingerprints()) == {
+        "chanur_series__series_mp3",
+        "basic_no_cover__standalone_mp3.mp3",
+    }
+
+    scan(inbox, cache)
+    assert ScanCache(inbox, db).load(InboxSnapshot(inbox).refresh().fingerprints()) == {
+        "tiny__flat_mp3",
+        "chanur_series__series_mp3",
+        "basic_no_cover__standalone_mp3.mp3",
+    }
@@ -0,0 +1,118 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.lib import term
+from src.lib.config import cfg
+from src.lib.scheduler import book_jobs, ffmpeg_slot, run_book_jobs, run_book_pipeline
+from src.lib.term import buffered_output, smart_print
+
+
+def item(key: str, series_key: str | None = None):
+    return SimpleNamespace(key=key, series_key=series_key)
+
+
+def test_book_jobs_keeps_series_books_together_in_order():
+    items = [
+        item("standalone"),
+        item("Series/Book 1", "Series"),
+        item("other"),
+        item("Series/Book 2", "Series"),
+    ]
+    assert [[i.key for i in job] for job in book_jobs(items)] == [
+        ["standalone"],
+        ["Series/Book 1", "Series/Book 2"],
+        ["other"],
+    ]
+
+
+def test_buffered_output_keeps_each_threads_lines_together():
+    term.PRINT_LOG.clear()
+    barrier = threading.Barrier(2)
+
+    def book(name: str):
+        with buffered_output():
+            for n in range(3):
+                barrier.wait()
+                smart_print(f"{name} {n}")
+
+    threads = [threading.Thread(target=book, args=(name,)) for name in ("a", "b")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    lines = [text for text, _ in term.PRINT_LOG]
+    assert sorted(lines) == ["a 0", "a 1", "a 2", "b 0", "b 1", "b 2"]
+    assert lines in (["a 0", "a 1", "a 2", "b 0", "b 1", "b 2"], ["b 0", "b 1", "b 2", "a 0", "a 1", "a 2"])
+
+
+def test_run_book_jobs_shares_ffmpeg_slots_across_books():
+    orig = (cfg.PARALLEL_BOOKS, cfg.CPU_CORES, cfg.USE_NATIVE_CONVERTER)
+    cfg.PARALLEL_BOOKS, cfg.CPU_CORES, cfg.USE_NATIVE_CONVERTER = 4, 2, True  # type: ignore[assignment]
+    running, peak, lock = 0, 0, threading.Lock()
+
+    def process(_item) -> int:
+        nonlocal running, peak
+        with ffmpeg_slot():
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.05)
+            with lock:
+                running -= 1
+        return 1
+
+    try:
+        assert run_book_jobs([item(str(n)) for n in range(6)], process) == 6
+    finally:
+        cfg.PARALLEL_BOOKS, cfg.CPU_CORES, cfg.USE_NATIVE_CONVERTER = orig  # type: ignore[assignment]
+    assert peak == 2
+
+
+def test_run_book_pipeline_overlaps_stages_in_order():
+    events: list[str] = []
+
+    def copy(i):
+        events.append(f"copy {i.key}")
+        return i.key
+
+    def encode(key):
+        time.sleep(0.05)
+        events.append(f"encode {key}")
+        return key
+
+    def finish(i, key):
+        assert key == i.key
+        events.append(f"finish {key}")
+        return 1
+
+    items = [item(str(n)) for n in range(3)]
+    b, timings = run_book_pipeline(items, [("copy", copy), ("encode", encode)], ("finalize", finish))
+
+    assert b == 3
+    assert list(timings) == ["copy", "encode", "finalize"]
+    assert timings["encode"] >= 0.15
+    # Every stage sees the books in order
+    for stage in ("copy", "encode", "finish"):
+        assert [e for e in events if e.startswith(stage)] == [f"{stage} {n}" for n in range(3)]
+    # The next book is copied before the one before it has finished encoding
+    assert events.index("copy 1") < events.index("encode 0")
+
+
+def test_run_book_pipeline_raises_stage_errors():
+    def copy(i):
+        if i.key == "1":
+            raise RuntimeError("disk full")
+        return i.key
+
+    finished = []
+    with pytest.raises(RuntimeError, match="disk full"):
+        run_book_pipeline(
+            [item(str(n)) for n in range(3)],
+            [("copy", copy), ("encode", lambda key: key)],
+            ("finalize", lambda i, key: finished.append(key) or 1),
+        )
+    assert finished == ["0"]
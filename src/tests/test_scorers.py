@@ -0,0 +1,70 @@
+from pathlib import Path
+
+import pytest
+
+from src.lib.books_tree import BooksTree
+from src.lib.scorers import cached_scorer, scorerCache
+
+calls: list[Path] = []
+
+
+@cached_scorer
+def count_files(tree: BooksTree) -> int:
+    calls.append(tree.path)
+    return len(tree.files_recursive)
+
+
+@pytest.fixture
+def inbox(tmp_path: Path):
+    calls.clear()
+    for book in ("Author - Book 1", "Author - Book 2"):
+        (d := tmp_path / book).mkdir()
+        for i in range(3):
+            (d / f"{i + 1:02d} - Chapter.mp3").touch()
+    return tmp_path
+
+
+def scan(path: Path) -> BooksTree:
+    return BooksTree(path, scan=False).scan(scan_id3=False, determine_structure=False)
+
+
+def test_results_are_cached_per_node(inbox: Path):
+    tree = scan(inbox)
+    book = tree.dirs["Author - Book 1"]
+    assert count_files(book) == 3
+    assert count_files(book) == 3
+    assert calls == [book.path]
+    assert (scorerCache.hits, scorerCache.misses) == (1, 1)
+
+    # another tree's node for the same path is scored on its own
+    assert count_files(scan(inbox).dirs["Author - Book 1"]) == 3
+    assert calls == [book.path, book.path]
+
+
+def test_scanning_invalidates_the_subtree(inbox: Path):
+    tree = scan(inbox)
+    book1, book2 = tree.dirs["Author - Book 1"], tree.dirs["Author - Book 2"]
+    assert [count_files(n) for n in (tree, book1, book2)] == [6, 3, 3]
+
+    (inbox / "Author - Book 2" / "04 - Chapter.mp3").touch()
+    generation = tree.generation
+    tree.rescan(["Author - Book 2"], scan_id3=False, determine_structure=False)
+    assert tree.generation == generation + 1
+    # the root's subtree changed, book 1's didn't, and book 2 is a new node
+    assert [count_files(n) for n in (tree, book1, tree.dirs["Author - Book 2"])] == [7, 3, 4]
+    assert calls == [tree.path, book1.path, book2.path, tree.path, book2.path]
+
+    tree.scan(scan_id3=False, determine_structure=False)
+    assert count_files(tree) == 7
+    assert calls[-1] == tree.path
+
+
+def test_clear(inbox: Path):
+    tree = scan(inbox)
+    count_files(tree)
+    scorerCache.set_checked(tree)
+    scorerCache.clear()
+    assert (scorerCache.hits, scorerCache.misses) == (0, 0)
+    assert not scorerCache.is_checked(tree)
+    count_files(tree)
+    assert calls == [tree.path, tree.path]
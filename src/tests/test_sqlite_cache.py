@@ -0,0 +1,83 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch, PropertyMock
+
+import pytest
+
+from src.lib.config import cfg
+from src.lib.sqlite_cache import SQLiteCache
+
+
+@pytest.fixture
+def meta_dir(tmp_path: Path):
+    with patch.object(type(cfg), "META_DIR", new_callable=PropertyMock, return_value=tmp_path):
+        yield tmp_path
+
+
+def test_sqlite_cache_round_trip(meta_dir: Path):
+    cache = SQLiteCache("test_cache")
+    cache.set("names", "Stephen King", [("Stephen King", "PERSON_SPACY", 0.9)])
+    cache.set_many("names", {"Neil Gaiman": [], "Terry Pratchett": {"score": 1.0}})
+
+    assert cache.get("names", "Stephen King") == [["Stephen King", "PERSON_SPACY", 0.9]]
+    assert cache.get("other", "Stephen King") is None
+    assert cache.get_many("names", ["Neil Gaiman", "Terry Pratchett", "Nobody"]) == {
+        "Neil Gaiman": [],
+        "Terry Pratchett": {"score": 1.0},
+    }
+    # Other instances and threads see the same entries
+    found = []
+    t = threading.Thread(target=lambda: found.append(SQLiteCache("test_cache").get("names", "Neil Gaiman")))
+    t.start()
+    t.join()
+    assert found == [[]]
+
+    conn = sqlite3.connect(meta_dir / "test_cache.db")
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+
+
+def test_sqlite_cache_reuses_its_connection(meta_dir: Path):
+    cache = SQLiteCache("test_cache")
+    with patch("src.lib.sqlite_cache.sqlite3.connect", wraps=sqlite3.connect) as connect:
+        for i in range(5):
+            cache.set("n", str(i), i)
+            cache.get("n", str(i))
+    assert connect.call_count == 1
+    cache.close()
+
+
+def test_sqlite_cache_drops_legacy_table(meta_dir: Path):
+    conn = sqlite3.connect(meta_dir / "nlp_cache.db")
+    conn.execute("CREATE TABLE nlp_cache (input_text TEXT, results BLOB)")
+    conn.commit()
+    conn.close()
+
+    SQLiteCache("nlp_cache").set("names", "x", [])
+
+    conn = sqlite3.connect(meta_dir / "nlp_cache.db")
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    conn.close()
+    assert tables == {"cache"}
+
+
+def test_sqlite_cache_evicts_old_and_excess_entries(meta_dir: Path):
+    cache = SQLiteCache("test_cache", max_age=60, max_entries=3)
+    now = time.time()
+    with patch("src.lib.sqlite_cache.time.time", return_value=now - 120):
+        cache.set("n", "stale", 0)
+    for i in range(4):
+        with patch("src.lib.sqlite_cache.time.time", return_value=now + i):
+            cache.set("n", str(i), i)
+
+    with patch("src.lib.sqlite_cache.time.time", return_value=now + 5):
+        assert cache.prune() == 2
+    assert cache.get_many("n", ["stale", "0", "1", "2", "3"]) == {"1": 1, "2": 2, "3": 3}
+
+
+def test_sqlite_cache_ignores_unencodable_values(meta_dir: Path):
+    cache = SQLiteCache("test_cache")
+    cache.set("n", "bad", object())
+    assert cache.get("n", "bad") is None